@@ -1,3 +1,4 @@
+import os
 import json
 import gzip
 import math
@@ -6,38 +7,1985 @@ import scipy.stats as stats
 import scipy.special as special
 import numpy as np
 import yaml
+from contextlib import contextmanager
+from functools import wraps
+
+#Tracer of the execution of the analysers in this process, see startTracing
+tracer = None
+
+#Tracer recording nested spans of the commons calls and of the Spark actions they run on the driver, saved as a Chrome trace
+#event file (for chrome://tracing or the flame graphs of speedscope). The Spark actions are traced by wrapping the RDD and
+#SparkContext methods all the actions go through, while tracing; the span of an action is named after the outermost PySpark
+#method called and its caller (eg. "count at commons.py:120"). With a profileFile, cProfile stats of the driver are dumped too
+class Tracer(object):
+    def __init__(self, traceFile, profileFile=None):
+        import time
+        
+        self.traceFile = traceFile
+        self.profileFile = profileFile
+        self.startTime = time.time()
+        self.events = []
+        self.actionDepth = 0
+        self.patched = []
+        self.profile = None
+    
+    def start(self):
+        from pyspark import RDD, SparkContext
+        
+        for cls, name in [(RDD, "collect"), (RDD, "toLocalIterator"), (SparkContext, "runJob")]:
+            original = cls.__dict__[name]
+            setattr(cls, name, self.traceAction(original))
+            self.patched.append((cls, name, original))
+        if self.profileFile is not None:
+            import cProfile
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+    
+    def stop(self):
+        for cls, name, original in self.patched:
+            setattr(cls, name, original)
+        self.patched = []
+        if self.profile is not None:
+            self.profile.disable()
+    
+    def addSpan(self, name, category, start, end, args={}):
+        import thread
+        
+        self.events.append({"name":name, "cat":category, "ph":"X", "pid":os.getpid(), "tid":thread.get_ident(), \
+                            "ts":(start - self.startTime) * 1e6, "dur":(end - start) * 1e6, "args":args})
+    
+    @contextmanager
+    def span(self, name, category):
+        import time
+        
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.addSpan(name, category, start, time.time())
+    
+    #Name of a Spark action from the stack: the outermost PySpark method and the line calling it
+    def actionName(self, default):
+        import traceback
+        
+        action = default
+        for filename, line, function, text in reversed(traceback.extract_stack()[:-2]):
+            if "pyspark" in filename:
+                action = function
+            else:
+                return "%s at %s:%d" % (action, os.path.basename(filename), line)
+        return action
+    
+    def traceAction(self, original):
+        import time
+        
+        def tracedAction(*args, **kwargs):
+            #Only the outermost action is traced (eg. first runs take, that runs runJob)
+            if self.actionDepth > 0:
+                return original(*args, **kwargs)
+            name = self.actionName(original.__name__)
+            start = time.time()
+            self.actionDepth += 1
+            try:
+                result = original(*args, **kwargs)
+            finally:
+                self.actionDepth -= 1
+                self.addSpan(name, "spark", start, time.time())
+            if original.__name__ == "toLocalIterator":
+                return self.traceIterator(name, result)
+            return result
+        return tracedAction
+    
+    #The jobs of toLocalIterator run while its iterator is consumed
+    def traceIterator(self, name, iterator):
+        with self.span(name + " (iteration)", "spark"):
+            for value in iterator:
+                yield value
+    
+    #Write the trace and the profile with all the spans so far
+    def save(self):
+        with open(self.traceFile, "w") as f:
+            json.dump({"traceEvents":self.events, "displayTimeUnit":"ms"}, f)
+        if self.profile is not None:
+            self.profile.dump_stats(self.profileFile)
+            self.profile.enable()
+
+#Start tracing the analysers of this process if the arguments of the analyser set trace_file (and profile_file for a cProfile dump).
+#The tracer lasts for the whole process, so the experiment analysers chained after a trial one are in the same trace
+def startTracing(args):
+    global tracer
+    
+    if tracer is None and args is not None and args.get("trace_file") is not None:
+        tracer = Tracer(str(args["trace_file"]), args.get("profile_file"))
+        tracer.start()
+    return tracer
+
+#Record the code in the with block as a span of the trace, if tracing
+@contextmanager
+def traceSpan(name, category="commons"):
+    if tracer is None:
+        yield
+        return
+    with tracer.span(name, category):
+        yield
+
+#Decorator recording the calls of a function as spans of the trace, if tracing
+def tracedFunction(function):
+    @wraps(function)
+    def traced(*args, **kwargs):
+        with traceSpan(function.__name__):
+            return function(*args, **kwargs)
+    return traced
+
+#Cache of the values retrieved by the analysers, with a time to live (in seconds) and a maximum number of entries, evicting
+#the least recently used ones. It lives as long as the Python process, so a resident analyser service reuses it across jobs
+class PropertiesCache(object):
+    missing = object()
+    
+    def __init__(self, ttl=600, maxSize=10000):
+        from collections import OrderedDict
+        self.ttl = ttl
+        self.maxSize = maxSize
+        self.entries = OrderedDict()
+    
+    #Return the cached value of the key, or PropertiesCache.missing if not cached or expired
+    def get(self, key):
+        import time
+        entry = self.entries.pop(key, None)
+        if entry is None or time.time() - entry[0] > self.ttl:
+            return PropertiesCache.missing
+        self.entries[key] = entry
+        return entry[1]
+    
+    def put(self, key, value):
+        import time
+        self.entries.pop(key, None)
+        self.entries[key] = (time.time(), value)
+        while len(self.entries) > self.maxSize:
+            self.entries.popitem(last=False)
+    
+    def clear(self):
+        self.entries.clear()
+
+#Host properties are cached by (host_id), container properties by (experiment_id, trial_id, container_id, host_id)
+propertiesCache = PropertiesCache()
+
+hostPropertiesColumns = ["n_cpu", "mem_total"]
+containerPropertiesColumns = ["cpu_set_cpus", "mem_limit", "name"]
+
+#Retrieve and cache in bulk the properties of all the containers of the given trials of an experiment, and of their hosts.
+#Uses one read of container_properties for all the trials and one read of host_properties for all the hosts
+@tracedFunction
+def loadProperties(sc, cassandraKeyspace, experimentID, trialIDs):
+    trialIDs = list(trialIDs)
+    if len(trialIDs) == 0:
+        return
+    
+    containers = sc.cassandraTable(cassandraKeyspace, "container_properties") \
+            .select("trial_id", "container_id", "host_id", *containerPropertiesColumns) \
+            .where("experiment_id=? AND trial_id IN (" + ",".join(["?"]*len(trialIDs)) + ")", experimentID, *trialIDs) \
+            .collect()
+    
+    hostIDs = set()
+    for c in containers:
+        c = rowToDict(c)
+        propertiesCache.put((experimentID, c["trial_id"], c["container_id"], c["host_id"]), dict((k, c[k]) for k in containerPropertiesColumns))
+        hostIDs.add(c["host_id"])
+    
+    hostIDs = [h for h in hostIDs if propertiesCache.get((h,)) is PropertiesCache.missing]
+    if len(hostIDs) > 0:
+        hosts = sc.cassandraTable(cassandraKeyspace, "host_properties") \
+                .select("host_id", *hostPropertiesColumns) \
+                .where("host_id IN (" + ",".join(["?"]*len(hostIDs)) + ")", *hostIDs) \
+                .collect()
+        for h in hosts:
+            h = rowToDict(h)
+            propertiesCache.put((h["host_id"],), dict((k, h[k]) for k in hostPropertiesColumns))
+
+#Function to retrieve the properties of a host (n_cpu, mem_total), None if the host is unknown
+@tracedFunction
+def getHostProperties(sc, cassandraKeyspace, hostID):
+    hostProperties = propertiesCache.get((hostID,))
+    if hostProperties is PropertiesCache.missing:
+        hosts = sc.cassandraTable(cassandraKeyspace, "host_properties") \
+                .select(*hostPropertiesColumns) \
+                .where("host_id=?", hostID) \
+                .collect()
+        hostProperties = rowToDict(hosts[0]) if len(hosts) > 0 else None
+        propertiesCache.put((hostID,), hostProperties)
+    return hostProperties
+
+#Function to retrieve the properties of a container (cpu_set_cpus, mem_limit, name), None if the container is unknown.
+#On a cache miss the properties of all the containers of the trial are loaded
+@tracedFunction
+def getContainerProperties(sc, cassandraKeyspace, experimentID, trialID, containerID, hostID):
+    key = (experimentID, trialID, containerID, hostID)
+    containerProperties = propertiesCache.get(key)
+    if containerProperties is PropertiesCache.missing:
+        loadProperties(sc, cassandraKeyspace, experimentID, [trialID])
+        containerProperties = propertiesCache.get(key)
+        if containerProperties is PropertiesCache.missing:
+            containerProperties = None
+            propertiesCache.put(key, None)
+    return containerProperties
 
 #Function to retrieve the number of cores of the cpu on the host
+@tracedFunction
 def getHostCores(sc, cassandraKeyspace, hostID):
-    hostProperties = sc.cassandraTable(cassandraKeyspace, "host_properties") \
-                .select("n_cpu") \
-                .where("host_id=?", hostID) \
-                .first()
+    hostProperties = getHostProperties(sc, cassandraKeyspace, hostID)
                 
     nOfCores = hostProperties["n_cpu"]
     
     return nOfCores
 
-#Function to retrieve the configuration file for analysers (YAML format) using the config file name
-def getAnalyserConfiguration(configFile):
+#Table of the local Cassandra stand-in (see localCassandra) read as an RDD, as the one of sc.cassandraTable: the columns and
+#the restrictions are set with select and where, the other methods are the ones of the RDD. The partitions of the table are
+#listed on the driver and each Spark partition reads its Cassandra partitions from the database file
+class LocalCassandraTable(object):
+    def __init__(self, sc, path, keyspace, table, columns=None, where=[], params=[]):
+        self.sc = sc
+        self.path = path
+        self.keyspace = keyspace
+        self.table = table
+        self.columns = columns
+        self.conditions = where
+        self.params = params
+        self.cassandraRDD = None
+    
+    def select(self, *columns):
+        return LocalCassandraTable(self.sc, self.path, self.keyspace, self.table, list(columns), self.conditions, self.params)
+    
+    def where(self, clause, *params):
+        return LocalCassandraTable(self.sc, self.path, self.keyspace, self.table, self.columns, self.conditions + [clause], self.params + list(params))
+    
+    def rdd(self):
+        from localCassandra import LocalCassandra
+        
+        if self.cassandraRDD is None:
+            path, keyspace, table, columns = self.path, self.keyspace, self.table, self.columns
+            where = " AND ".join(self.conditions) if len(self.conditions) > 0 else None
+            params = self.params
+            
+            store = LocalCassandra(path)
+            partitionKeys = store.partitionKeys(keyspace, table, where, params)
+            store.close()
+            
+            def readPartitions(keys):
+                from localCassandra import LocalCassandra
+                store = LocalCassandra(path)
+                for key in keys:
+                    for row in store.select(keyspace, table, columns, where, params, key):
+                        yield row
+                store.close()
+            
+            self.cassandraRDD = self.sc.parallelize(partitionKeys, max(1, min(len(partitionKeys), self.sc.defaultParallelism))) \
+                    .mapPartitions(readPartitions)
+        return self.cassandraRDD
+    
+    def __getattr__(self, name):
+        return getattr(self.rdd(), name)
+
+#Join of an RDD of keys with a table of the local Cassandra stand-in, as the one of joinWithCassandraTable: the join columns
+#(by default the partition key) and the selected columns are set with on and select. Returns the (key, row) pairs
+class LocalCassandraJoin(object):
+    def __init__(self, keysRDD, path, keyspace, table, joinColumns=None, columns=None):
+        self.keysRDD = keysRDD
+        self.path = path
+        self.keyspace = keyspace
+        self.table = table
+        self.joinColumns = joinColumns
+        self.columns = columns
+    
+    def on(self, *columns):
+        return LocalCassandraJoin(self.keysRDD, self.path, self.keyspace, self.table, list(columns), self.columns)
+    
+    def select(self, *columns):
+        return LocalCassandraJoin(self.keysRDD, self.path, self.keyspace, self.table, self.joinColumns, list(columns))
+    
+    def rdd(self):
+        path, keyspace, table, joinColumns, columns = self.path, self.keyspace, self.table, self.joinColumns, self.columns
+        
+        def join(keys):
+            from localCassandra import LocalCassandra
+            store = LocalCassandra(path)
+            on = joinColumns if joinColumns is not None else store.getTable(keyspace, table)["partition_key"]
+            for key in keys:
+                key = rowToDict(key) if not isinstance(key, (tuple, list)) else dict(zip(on, key))
+                for row in store.select(keyspace, table, columns, " AND ".join(c + "=?" for c in on), [key[c] for c in on]):
+                    yield (key, row)
+            store.close()
+        
+        return self.keysRDD.mapPartitions(join)
+    
+    def __getattr__(self, name):
+        return getattr(self.rdd(), name)
+
+#Use the local Cassandra stand-in in the database file at path for the Cassandra tables of the Spark context: sc.cassandraTable,
+#RDD.joinWithCassandraTable and RDD.saveToCassandra read and write the file instead of the cluster
+def useLocalCassandra(sc, path):
+    from pyspark import RDD
+    
+    def saveToCassandra(rdd, keyspace, table, columns=None, *args, **kwargs):
+        def savePartition(rows):
+            from localCassandra import LocalCassandra
+            store = LocalCassandra(path)
+            store.insert(keyspace, table, (rowToDict(r) if columns is None else dict((c, r[c]) for c in columns) for r in rows))
+            store.close()
+        rdd.foreachPartition(savePartition)
+    
+    def joinWithCassandraTable(rdd, keyspace, table, *args, **kwargs):
+        return LocalCassandraJoin(rdd, path, keyspace, table)
+    
+    sc.localCassandraPath = path
+    sc.cassandraTable = lambda keyspace, table, *args, **kwargs: LocalCassandraTable(sc, path, keyspace, table)
+    RDD.saveToCassandra = saveToCassandra
+    RDD.joinWithCassandraTable = joinWithCassandraTable
+    return sc
+
+#Return the Spark context already running in the process (eg. when an experiment analyser is chained after a trial analyser),
+#otherwise create a new one with the given configuration. If spark.benchflow.local_cassandra is set to a database file, the
+#tables are the ones of the local Cassandra stand-in there (see useLocalCassandra, localCassandra.py must be in the py-files)
+def getSparkContext(conf):
     from pyspark_cassandra import CassandraSparkContext
-    from pyspark_cassandra import RowFormat
+    from pyspark import SparkContext
+    
+    sc = SparkContext._active_spark_context
+    if sc is not None and (isinstance(sc, CassandraSparkContext) or hasattr(sc, "localCassandraPath")):
+        return sc
+    localCassandraPath = conf.get("spark.benchflow.local_cassandra")
+    if localCassandraPath is not None:
+        return useLocalCassandra(SparkContext(conf=conf), localCassandraPath)
+    return CassandraSparkContext(conf=conf)
+
+#Retrieve the trials to analyse from the arguments of an analyser: the list in trial_ids, all the trials of the experiment
+#(from the experiment table) if all_trials is set, otherwise the single trial in trial_id
+@tracedFunction
+def getTrialIDs(sc, cassandraKeyspace, experimentID, args):
+    if "trial_ids" in args:
+        return [str(t) for t in args["trial_ids"]]
+    if args.get("all_trials", False) is True:
+        return sc.cassandraTable(cassandraKeyspace, "experiment") \
+                .select("experiment_id", "trial_id") \
+                .filter(lambda r: r["experiment_id"] == experimentID) \
+                .map(lambda r: str(r["trial_id"])) \
+                .distinct() \
+                .collect()
+    return [str(args["trial_id"])]
+
+#Time column of the input tables whose maximum in a partition is part of its fingerprint, the other tables are fingerprinted by
+#their number of rows only (see getInputFingerprints)
+inputFingerprintColumns = {"environment_data":"read_time", "process":"start_time", "construct":"start_time"}
+
+#Columns of the input tables derived by other analysers (eg. the results read by trials/throughput) whose content is part of the
+#fingerprint, as their values change when the upstream analysers run again while their number of rows rarely does
+inputFingerprintContentColumns = {"trial_execution_time":["process_definition_id", "execution_time"], \
+                                  "trial_number_of_process_instances":["process_definition_id", "number_of_process_instances"], \
+                                  "container_properties":["container_id", "host_id"] + containerPropertiesColumns, \
+                                  "trial_steady_state":["container_id", "host_id", "metric", "start_time", "end_time", "num_data_points", "batch_size"]}
+
+#Columns of the input tables not partitioned by trial (eg. the properties of the hosts read by the cpu and ram analysers) whose
+#whole content is part of the fingerprint of every trial
+inputFingerprintTableColumns = {"host_properties":["host_id"] + hostPropertiesColumns}
+
+#Input tables the analysers write themselves (the steady state windows detected by the first run of cpu and ram), fingerprinted
+#again when the run finishes, so that their own writes do not make the next run analyse the trials again
+analyserWrittenInputs = ["trial_steady_state"]
+
+#Arguments of the analysers not affecting their results, left out of the arguments of the fingerprints
+fingerprintIgnoredArguments = ["experiment_id", "trial_id", "trial_ids", "all_trials", "config_file", "analyser_config_file", \
+                               "cassandra_keyspace", "raw_cache_dir", "run_experiment", "trace_file", "profile_file"]
+
+#Return the arguments of an analyser affecting its results, as a canonical JSON string
+def getAnalyserArguments(args):
+    return json.dumps(dict((k, v) for k, v in (args or {}).items() if k not in fingerprintIgnoredArguments), sort_keys=True)
+
+#Return the sources of the local modules an analyser depends on: its own, commons and the ones they import (eg. trials/cpu.py,
+#ram.py and IO.py for trials/resources.py), found next to the analyser or to commons, sorted by path
+def getAnalyserModules(analyserFile):
+    import ast
+    
+    directories = [os.path.dirname(os.path.abspath(analyserFile)), os.path.dirname(os.path.abspath(__file__))]
+    pending = [os.path.splitext(os.path.abspath(analyserFile))[0] + ".py", os.path.splitext(os.path.abspath(__file__))[0] + ".py"]
+    modules = set()
+    while len(pending) > 0:
+        path = pending.pop()
+        if path in modules:
+            continue
+        modules.add(path)
+        with open(path) as f:
+            tree = ast.parse(f.read(), path)
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                names = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and node.module is not None:
+                names = [node.module]
+            else:
+                continue
+            for name in names:
+                for directory in directories:
+                    modulePath = os.path.join(directory, name.split(".")[0] + ".py")
+                    if os.path.isfile(modulePath):
+                        pending.append(modulePath)
+                        break
+    return sorted(modules)
+
+#Return the version of an analyser: a hash of the source of the local modules it depends on (see getAnalyserModules) and of the
+#analyser configuration, so that a deploy changing any of them or a new configuration change the version
+def getAnalyserVersion(analyserFile):
+    import hashlib
+    
+    digest = hashlib.sha1()
+    for path in getAnalyserModules(analyserFile):
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    digest.update(json.dumps(analyserConfiguration, sort_keys=True, default=str))
+    return digest.hexdigest()
+
+#Return the SHA-1 digest of a list of rows given as tuples, independent of their order
+def getRowsDigest(rows):
+    import hashlib
+    
+    return hashlib.sha1(repr(sorted(rows))).hexdigest()
+
+#Return the fingerprints of the partitions of the input tables of the trials of an experiment, as a dictionary from the trial
+#to its fingerprint: the number of rows and the maximum of the time column (see inputFingerprintColumns) of each table, or for
+#the derived tables the digest of their content (see inputFingerprintContentColumns) and for the tables not partitioned by
+#trial the digest of the whole table (see inputFingerprintTableColumns). Each partition of a raw table is
+#aggregated in Cassandra by a single query through the driver session, or without the driver all the partitions of a table are
+#aggregated in one Spark job, as the derived tables always are
+@tracedFunction
+def getInputFingerprints(sc, cassandraKeyspace, experimentID, trialIDs, tables):
+    fingerprints = dict((trialID, []) for trialID in trialIDs)
+    for table in tables:
+        timeColumn = inputFingerprintColumns.get(table)
+        contentColumns = inputFingerprintContentColumns.get(table)
+        tableColumns = inputFingerprintTableColumns.get(table)
+        if tableColumns is not None:
+            rows = sc.cassandraTable(cassandraKeyspace, table) \
+                    .select(*tableColumns) \
+                    .map(lambda r: tuple(r[c] for c in tableColumns)) \
+                    .collect()
+            for trialID in trialIDs:
+                fingerprints[trialID].append("%s:%s:%s" % (table, len(rows), getRowsDigest(rows)))
+            continue
+        if contentColumns is not None:
+            results = dict(readTrials(sc, cassandraKeyspace, table, contentColumns, experimentID, trialIDs) \
+                    .map(lambda r: (r["trial_id"], [tuple(r[c] for c in contentColumns)])) \
+                    .reduceByKey(lambda a, b: a + b) \
+                    .mapValues(lambda rows: (len(rows), getRowsDigest(rows))) \
+                    .collect())
+            for trialID in trialIDs:
+                count, digest = results.get(trialID, (0, None))
+                fingerprints[trialID].append("%s:%s:%s" % (table, count, digest))
+            continue
+        
+        aggregates = [("count", None)] + ([("max", timeColumn)] if timeColumn is not None else [])
+        results = {}
+        for trialID in trialIDs:
+            result = aggregatePartition(sc, cassandraKeyspace, table, aggregates, [("experiment_id", experimentID), ("trial_id", trialID)])
+            if result is None:
+                results = None
+                break
+            results[trialID] = (result[None] + [None])[:2]
+        
+        #Without the driver session
+        if results is None:
+            def maxTime(a, b):
+                return b if a is None or (b is not None and b > a) else a
+            
+            results = dict(readTrials(sc, cassandraKeyspace, table, [timeColumn] if timeColumn is not None else [], experimentID, trialIDs) \
+                    .map(lambda r: (r["trial_id"], (1, r[timeColumn] if timeColumn is not None else None))) \
+                    .reduceByKey(lambda a, b: (a[0] + b[0], maxTime(a[1], b[1]))) \
+                    .collect())
+        
+        for trialID in trialIDs:
+            count, lastTime = results.get(trialID, (0, None))
+            fingerprints[trialID].append("%s:%s:%s" % (table, count, lastTime))
+    
+    return dict((trialID, ";".join(values)) for trialID, values in fingerprints.items())
+
+#Return the fingerprints stored by the last runs of an analyser with the given arguments on the trials of an experiment, as a
+#dictionary from the trial to the (analyser version, fingerprint) pair
+def getStoredFingerprints(sc, cassandraKeyspace, experimentID, trialIDs, analyser, arguments):
+    return dict(readTrials(sc, cassandraKeyspace, "analyser_fingerprints", ["analyser_version", "fingerprint"], experimentID, trialIDs, \
+                           [("analyser", analyser), ("arguments", arguments)]) \
+                .map(lambda r: (r["trial_id"], (r["analyser_version"], r["fingerprint"]))) \
+                .collect())
+
+#Run of an analyser being instrumented in this process, see startAnalyserRun
+analyserRun = None
+#Analyser runs finished in this process, in order (eg. to pace the backfill by the rows they read)
+finishedAnalyserRuns = []
+
+#Instrumentation of a run of an analyser. The run is split in stages (eg. read, mode, metrics, save), the time not spent in any
+#stage being the compute stage. Each stage records its wall time, the Spark jobs, stages and tasks it started (through a job
+#group and the status tracker), the rows read and the bytes shuffled by its Spark stages (from the REST API of the Spark UI,
+#None if not reachable) and the peak RSS of the driver at its end. The times and jobs of a stage exclude the nested stages.
+#Spark reads lazily, so the jobs reading the data are counted in the stage that first uses it. The run is also a cache scope
+#(see CacheScope), recording the peak of the bytes cached while it runs, sampled whenever cached datasets are released, and
+#it counts the rows left unchanged, changed and added by the writers writing only the changed rows (see ResultsWriter). With
+#the fingerprints of its inputs (see fingerprintInputs) the trials whose inputs, analyser and arguments are unchanged since their
+#last run are skipped, and the fingerprints of the analysed trials are saved with the metrics of the run
+class AnalyserRun(object):
+    def __init__(self, sc, cassandraKeyspace, analyser, experimentID, trialIDs):
+        import time
+        import uuid
+        
+        self.sc = sc
+        self.cassandraKeyspace = cassandraKeyspace
+        self.analyser = analyser
+        self.experimentID = experimentID
+        self.trialIDs = list(trialIDs)
+        self.runID = uuid.uuid1()
+        self.startTime = time.time()
+        self.stages = {}
+        self.frames = []
+        self.nestedTime = 0.0
+        self.appURL = None
+        self.startCachedBytes = getCachedBytes(sc)
+        self.peakCachedBytes = 0
+        self.writtenRows = None
+        self.fingerprints = None
+        self.inputs = []
+        self.rowsRead = None
+        self.cacheScope = CacheScope().__enter__()
+        self.setJobGroup("compute")
+    
+    def setJobGroup(self, name):
+        stage = self.stages.setdefault(name, {"wall_time":0.0, "job_groups":[]})
+        group = "%s/%s/%d" % (self.runID, name, len(stage["job_groups"]))
+        stage["job_groups"].append(group)
+        self.sc.setJobGroup(group, self.analyser + " " + name)
+    
+    def enterStage(self, name):
+        import time
+        
+        self.frames.append([name, time.time(), 0.0])
+        self.setJobGroup(name)
+    
+    def exitStage(self):
+        import time
+        
+        name, start, nestedTime = self.frames.pop()
+        elapsed = time.time() - start
+        self.stages[name]["wall_time"] += elapsed - nestedTime
+        if len(self.frames) > 0:
+            self.frames[-1][2] += elapsed
+            self.setJobGroup(self.frames[-1][0])
+        else:
+            self.nestedTime += elapsed
+            self.setJobGroup("compute")
+    
+    #Keep the peak of the bytes cached in the Spark context since the start of the run
+    def sampleCachedBytes(self):
+        self.peakCachedBytes = max(self.peakCachedBytes, getCachedBytes(self.sc) - self.startCachedBytes)
+    
+    #Fingerprint the input tables of the trials of the run, removing from the trials the ones whose fingerprint, analyser version
+    #and arguments are the ones stored by their last run
+    def fingerprintInputs(self, analyserFile, tables, args):
+        with analyserStage("fingerprint"):
+            self.version = getAnalyserVersion(analyserFile)
+            self.arguments = getAnalyserArguments(args)
+            self.inputs = list(tables)
+            self.fingerprints = getInputFingerprints(self.sc, self.cassandraKeyspace, self.experimentID, self.trialIDs, tables)
+            stored = getStoredFingerprints(self.sc, self.cassandraKeyspace, self.experimentID, self.trialIDs, self.analyser, self.arguments)
+        
+        skipped = [t for t in self.trialIDs if stored.get(t) == (self.version, self.fingerprints[t])]
+        if len(skipped) > 0:
+            print "Skipping the trials with unchanged inputs: " + ", ".join(skipped)
+        self.trialIDs = [t for t in self.trialIDs if t not in skipped]
+    
+    #Rows of the analyser_fingerprints table of the analysed trials, if their inputs are fingerprinted, with the fingerprints of the
+    #inputs written by the analyser (see analyserWrittenInputs) taken again
+    def fingerprintRows(self):
+        if self.fingerprints is None:
+            return []
+        written = [t for t in self.inputs if t in analyserWrittenInputs]
+        if len(written) > 0 and len(self.trialIDs) > 0:
+            refreshed = getInputFingerprints(self.sc, self.cassandraKeyspace, self.experimentID, self.trialIDs, written)
+            for trialID in self.trialIDs:
+                parts = dict((p.split(":")[0], p) for p in refreshed[trialID].split(";"))
+                self.fingerprints[trialID] = ";".join(parts.get(p.split(":")[0], p) for p in self.fingerprints[trialID].split(";"))
+        return [{"experiment_id":self.experimentID, "trial_id":trialID, "analyser":self.analyser, "arguments":self.arguments, \
+                 "analyser_version":self.version, "fingerprint":self.fingerprints[trialID], "run_id":self.runID} for trialID in self.trialIDs]
+    
+    #Add the counts of the unchanged, changed and new rows of a ResultsWriter writing only the changed rows
+    def countWrittenRows(self, counts):
+        if self.writtenRows is None:
+            self.writtenRows = {"unchanged":0, "changed":0, "new":0}
+        for name, count in counts.items():
+            self.writtenRows[name] += count
+    
+    #Rows read and bytes shuffled by a Spark stage, None if the REST API of the Spark UI is not reachable
+    def getStageMetrics(self, stageID):
+        import urllib2
+        
+        if self.appURL is None:
+            return None
+        try:
+            attempts = json.load(urllib2.urlopen("%s/stages/%d" % (self.appURL, stageID), timeout=5))
+        except Exception:
+            self.appURL = None
+            return None
+        return [sum(a.get(m, 0) for a in attempts) for m in ["inputRecords", "shuffleReadBytes", "shuffleWriteBytes"]]
+    
+    #Rows read by the finished run: the input records of its Spark stages, or if the Spark UI was not reachable the rows of the
+    #fingerprinted inputs of the analysed trials, None if neither is known
+    def getRowsRead(self):
+        if self.rowsRead is not None:
+            return self.rowsRead
+        if self.fingerprints is None:
+            return None
+        return sum(int(p.split(":")[1]) for trialID in self.trialIDs for p in self.fingerprints[trialID].split(";"))
+    
+    #Return the metrics of each stage of the run, as rows of the analyser_runs table of each trial of the run. The whole run is
+    #in the "run" stage
+    def summary(self):
+        import time
+        import resource
+        
+        tracker = self.sc.statusTracker()
+        uiWebUrl = getattr(self.sc, "uiWebUrl", None)
+        self.appURL = "%s/api/v1/applications/%s" % (uiWebUrl, self.sc.applicationId) if uiWebUrl else None
+        peakRSS = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+        self.sampleCachedBytes()
+        
+        wallTime = time.time() - self.startTime
+        self.stages["compute"]["wall_time"] = wallTime - self.nestedTime
+        stageMetrics = {"run":{"wall_time":wallTime, "jobs":0, "stages":0, "tasks":0, "rows_read":0, "shuffle_read_bytes":0, "shuffle_write_bytes":0}}
+        for name, stage in self.stages.items():
+            metrics = {"wall_time":stage["wall_time"], "jobs":0, "stages":0, "tasks":0, "rows_read":0, "shuffle_read_bytes":0, "shuffle_write_bytes":0}
+            for group in stage["job_groups"]:
+                for jobID in tracker.getJobIdsForGroup(group):
+                    metrics["jobs"] += 1
+                    jobInfo = tracker.getJobInfo(jobID)
+                    for stageID in (jobInfo.stageIds if jobInfo is not None else []):
+                        metrics["stages"] += 1
+                        stageInfo = tracker.getStageInfo(stageID)
+                        metrics["tasks"] += stageInfo.numTasks if stageInfo is not None else 0
+                        values = self.getStageMetrics(stageID)
+                        for m, v in zip(["rows_read", "shuffle_read_bytes", "shuffle_write_bytes"], values or [None] * 3):
+                            metrics[m] = metrics[m] + v if metrics[m] is not None and v is not None else None
+            stageMetrics[name] = metrics
+            for m in ["jobs", "stages", "tasks", "rows_read", "shuffle_read_bytes", "shuffle_write_bytes"]:
+                total = stageMetrics["run"][m]
+                stageMetrics["run"][m] = total + metrics[m] if total is not None and metrics[m] is not None else None
+        self.rowsRead = stageMetrics["run"]["rows_read"]
+        
+        rows = []
+        for trialID in self.trialIDs or [""]:
+            for name, metrics in stageMetrics.items():
+                row = {"experiment_id":self.experimentID, "trial_id":trialID, "analyser":self.analyser, "run_id":self.runID, "stage":name, \
+                       "trials":len(self.trialIDs), "driver_peak_rss":peakRSS, "cached_bytes":self.peakCachedBytes}
+                for name in ["unchanged", "changed", "new"]:
+                    row["rows_" + name] = self.writtenRows[name] if self.writtenRows is not None else None
+                row.update(metrics)
+                rows.append(row)
+        return rows
+    
+    #End the run and save its metrics to the analyser_runs table. A failure to save them is reported, not raised, as the results
+    #of the analyser are already saved
+    def finish(self):
+        global analyserRun
+        
+        self.cacheScope.close()
+        if analyserRun is self:
+            analyserRun = None
+        finishedAnalyserRuns.append(self)
+        if tracer is not None:
+            import time
+            tracer.addSpan(self.analyser, "analyser", self.startTime, time.time(), {"run_id":str(self.runID)})
+        self.sc.setJobGroup(str(self.runID) + "/finish", self.analyser + " finish")
+        try:
+            writer = ResultsWriter(self.sc, self.cassandraKeyspace)
+            writer.add("analyser_runs", self.summary())
+            writer.add("analyser_fingerprints", self.fingerprintRows())
+            writer.wait()
+        except Exception as e:
+            print "Could not save the run of " + self.analyser + ": " + str(e)
+        if tracer is not None:
+            tracer.save()
+
+#Start the instrumented run of the analyser in analyserFile (eg. __file__ of the analyser, giving "trials/cpu") on the trials
+#of an experiment (none for the experiment analysers), tracing it if the arguments of the analyser ask so (see startTracing).
+#The run is saved by its finish method. With skip_unchanged_inputs in the configuration and the input tables of the analyser
+#(partitioned by experiment_id and trial_id) the trials with unchanged inputs are skipped, the ones to analyse being in the
+#trialIDs of the returned run
+def startAnalyserRun(sc, cassandraKeyspace, analyserFile, experimentID, trialIDs=[], args=None, inputs=None):
+    global analyserRun
+    
+    startTracing(args)
+    analyserRun = AnalyserRun(sc, cassandraKeyspace, getAnalyserName(analyserFile), experimentID, trialIDs)
+    if inputs is not None and analyserConfiguration["skip_unchanged_inputs"]:
+        analyserRun.fingerprintInputs(analyserFile, inputs, args)
+    return analyserRun
+
+#Record the code in the with block as a stage of the current analyser run, if any (eg. not in the executors)
+@contextmanager
+def analyserStage(name):
+    run = analyserRun
+    if run is None:
+        yield
+        return
+    run.enterStage(name)
+    try:
+        yield
+    finally:
+        run.exitStage()
+
+#Decorator recording the calls of a function as a stage of the current analyser run
+def analyserStageFunction(name):
+    def decorate(function):
+        @wraps(function)
+        def stageFunction(*args, **kwargs):
+            with analyserStage(name), traceSpan(function.__name__):
+                return function(*args, **kwargs)
+        return stageFunction
+    return decorate
+
+#Version of the layout of the raw cache, caches written with another version are ignored
+rawCacheVersion = 2
+
+#Directory of the raw cache of a table of a trial: <cacheDir>/<experiment_id>/<trial_id>/<table>, with NumPy files for each chunk
+#of rows of each column (see writeRawCache) and a manifest.json written last
+def getRawCachePath(cacheDir, experimentID, trialID, table):
+    return os.path.join(cacheDir, experimentID, trialID, table)
+
+#Return the manifest of the raw cache of a table of a trial, or None if it is not cached
+def readRawCacheManifest(cacheDir, experimentID, trialID, table):
+    manifestPath = os.path.join(getRawCachePath(cacheDir, experimentID, trialID, table), "manifest.json")
+    if not os.path.exists(manifestPath):
+        return None
+    with open(manifestPath) as f:
+        manifest = json.load(f)
+    if manifest.get("version") != rawCacheVersion:
+        return None
+    return manifest
+
+#Encode the values of a chunk of a column of the raw cache as a NumPy array, returning the (encoding, array) pair. The encoding
+#is the NumPy type of numbers, "bytes" and "text" for strings (stored as fixed width UTF-8 bytes), "uuid" for UUIDs (16 bytes a
+#row), "time" for times (microseconds since the epoch) and "object" for the other values (eg. lists and maps), the only ones
+#pickled. Nulls are stored as zeros, see writeRawCache
+def encodeRawCacheChunk(values):
+    import numbers
+    import uuid
+    from datetime import datetime
+    
+    present = [v for v in values if v is not None]
+    
+    def allOf(types, exclude=()):
+        return all(isinstance(v, types) and not isinstance(v, exclude) for v in present)
+    
+    if allOf(bool) or allOf(numbers.Number, bool):
+        array = np.array([v if v is not None else type(present[0])() for v in values])
+        if array.dtype != np.dtype(object):
+            return (array.dtype.str, array)
+    elif allOf(str) or allOf(unicode):
+        text = allOf(unicode)
+        encoded = [(v.encode("utf-8") if text else v) if v is not None else "" for v in values]
+        #Fixed width arrays drop the trailing NUL characters
+        if not any(v.endswith("\0") for v in encoded):
+            return ("text" if text else "bytes", np.array(encoded, dtype="S%d" % max([1] + [len(v) for v in encoded])))
+    elif allOf(uuid.UUID):
+        return ("uuid", np.array([np.frombuffer(v.bytes if v is not None else "\0" * 16, dtype=np.uint8) for v in values]).reshape(len(values), 16))
+    elif allOf(datetime) and all(v.tzinfo is None for v in present):
+        def microseconds(v):
+            t = v - datetime(1970, 1, 1)
+            return (t.days * 86400 + t.seconds) * 1000000 + t.microseconds
+        return ("time", np.array([microseconds(v) if v is not None else 0 for v in values], dtype=np.int64))
+    
+    array = np.empty(len(values), dtype=object)
+    for i, v in enumerate(values):
+        array[i] = v
+    return ("object", array)
+
+#Return the function decoding a value of a chunk of a column of the raw cache with the given encoding (see encodeRawCacheChunk)
+def getRawCacheDecoder(encoding):
+    import uuid
+    from datetime import datetime, timedelta
+    
+    if encoding == "text":
+        return lambda v: v.decode("utf-8")
+    if encoding == "bytes":
+        return lambda v: v
+    if encoding == "uuid":
+        return lambda v: uuid.UUID(bytes=v.tostring())
+    if encoding == "time":
+        return lambda v: datetime(1970, 1, 1) + timedelta(microseconds=int(v))
+    return lambda v: v.item() if isinstance(v, np.generic) else v
+
+#Write the rows of a table of a trial to the raw cache, replacing the cached ones. The rows are streamed and written in chunks of
+#chunkRows rows (raw_cache_slice_size of the configuration if None), with a NumPy file for each chunk of each column, so that
+#neither the writer nor the readers of a slice hold more than a chunk of a column. Numbers, strings, UUIDs and times are stored
+#in native arrays, that are memory-mapped when read (see encodeRawCacheChunk), with a mask of their nulls if any. The encoding of
+#each chunk of each column is in the manifest, None for the chunks without values, with the fingerprint of the partition the rows
+#come from (see getInputFingerprints), taken before reading them, that readRawCache compares with the current one
+def writeRawCache(cacheDir, experimentID, trialID, table, rows, chunkRows=None, fingerprint=None):
+    import shutil
+    import time
+    
+    chunkRows = chunkRows or analyserConfiguration["raw_cache_slice_size"]
+    
+    path = getRawCachePath(cacheDir, experimentID, trialID, table)
+    tmpPath = path + ".tmp-" + str(os.getpid())
+    if os.path.exists(tmpPath):
+        shutil.rmtree(tmpPath)
+    os.makedirs(tmpPath)
+    
+    columns = {}
+    chunks = []
+    
+    def writeChunk(chunk):
+        k = len(chunks)
+        for c in set(c for row in chunk for c in row.keys()):
+            values = [row.get(c) for row in chunk]
+            if all(v is None for v in values):
+                columns.setdefault(c, [[None, True]] * k).append([None, True])
+                continue
+            encoding, array = encodeRawCacheChunk(values)
+            np.save(os.path.join(tmpPath, "%s.%d.npy" % (c, k)), array)
+            nulls = np.array([v is None for v in values])
+            if encoding != "object" and nulls.any():
+                np.save(os.path.join(tmpPath, "%s.%d.nulls.npy" % (c, k)), nulls)
+            columns.setdefault(c, [[None, True]] * k).append([encoding, encoding != "object" and bool(nulls.any())])
+        chunks.append(len(chunk))
+        for encodings in columns.values():
+            if len(encodings) < len(chunks):
+                encodings.append([None, True])
+    
+    chunk = []
+    for row in rows:
+        chunk.append(rowToDict(row))
+        if len(chunk) == chunkRows:
+            writeChunk(chunk)
+            chunk = []
+    if len(chunk) > 0:
+        writeChunk(chunk)
+    
+    manifest = {"version":rawCacheVersion, "experiment_id":experimentID, "trial_id":trialID, "table":table, \
+                "rows":sum(chunks), "chunk_rows":chunkRows, "columns":columns, "fingerprint":fingerprint, "created":time.time()}
+    with open(os.path.join(tmpPath, "manifest.json"), "w") as f:
+        json.dump(manifest, f)
+    
+    #Replace the cached table only when the new one is complete
+    invalidateRawCache(cacheDir, experimentID, trialID, table)
+    os.rename(tmpPath, path)
+    return manifest
+
+#Remove the raw cache of a table of a trial, of all the tables of a trial, or of all the trials of an experiment
+def invalidateRawCache(cacheDir, experimentID, trialID=None, table=None):
+    import shutil
+    
+    path = os.path.join(cacheDir, experimentID)
+    if trialID is not None:
+        path = os.path.join(path, trialID)
+        if table is not None:
+            path = os.path.join(path, table)
+    if os.path.exists(path):
+        shutil.rmtree(path)
+
+#Return the rows from start to end of a raw cache directory with the given columns, skipping the rows that do not match the
+#filters (a dictionary from column to value). Only the chunks holding the rows are loaded, and only the ones of the columns of
+#objects are read in memory, the others are memory-mapped
+def loadRawCacheSlice(path, manifest, start, end, columns, filters={}):
+    chunkRows = manifest["chunk_rows"]
+    needed = set(columns) | set(filters.keys())
+    if end <= start:
+        return
+    
+    for k in range(start // chunkRows, (end - 1) // chunkRows + 1):
+        arrays = {}
+        for c in needed:
+            encoding, hasNulls = manifest["columns"][c][k]
+            if encoding is None:
+                arrays[c] = (None, None, None)
+                continue
+            chunkPath = os.path.join(path, "%s.%d.npy" % (c, k))
+            array = np.load(chunkPath, allow_pickle=True) if encoding == "object" else np.load(chunkPath, mmap_mode="r")
+            nulls = np.load(os.path.join(path, "%s.%d.nulls.npy" % (c, k)), mmap_mode="r") if hasNulls else None
+            arrays[c] = (array, nulls, getRawCacheDecoder(encoding))
+        
+        def value(c, i):
+            array, nulls, decode = arrays[c]
+            if array is None or (nulls is not None and nulls[i]):
+                return None
+            return decode(array[i])
+        
+        for i in range(max(start - k * chunkRows, 0), min(end - k * chunkRows, chunkRows)):
+            if any(value(c, i) != v for c, v in filters.items()):
+                continue
+            yield dict((c, value(c, i)) for c in columns)
+
+#Read the given columns of a table for many trials from the raw cache, loading slices of the cached files in parallel (the cache
+#directory has to be reachable by the executors), of sliceSize rows (the chunks of the cache if None). Returns None if any of the
+#trials or of the columns is not cached, or if the fingerprint of the partition of any of the trials in Cassandra (its number of
+#rows and last time, see getInputFingerprints) is not the one of the cached rows, so that stale caches are never read
+def readRawCache(sc, cassandraKeyspace, cacheDir, table, columns, experimentID, trialIDs, clusteringKeys=[], sliceSize=None):
+    filters = dict(clusteringKeys)
+    
+    manifests = {}
+    for trialID in trialIDs:
+        manifest = readRawCacheManifest(cacheDir, experimentID, trialID, table)
+        if manifest is None or manifest.get("fingerprint") is None or \
+                any(c not in manifest["columns"] for c in list(columns) + list(filters.keys())):
+            return None
+        manifests[trialID] = manifest
+    
+    fingerprints = getInputFingerprints(sc, cassandraKeyspace, experimentID, trialIDs, [table])
+    stale = [t for t in trialIDs if fingerprints[t] != manifests[t]["fingerprint"]]
+    if len(stale) > 0:
+        print "Reading " + table + " from Cassandra, the raw cache of the trials changed since: " + ", ".join(stale)
+        return None
+    
+    slices = []
+    for trialID in trialIDs:
+        manifest = manifests[trialID]
+        path = getRawCachePath(cacheDir, experimentID, trialID, table)
+        size = sliceSize or manifest["chunk_rows"]
+        for start in range(0, manifest["rows"], size):
+            slices.append((path, manifest, start, min(start + size, manifest["rows"])))
+    
+    return sc.parallelize(slices, max(len(slices), 1)) \
+            .flatMap(lambda s: loadRawCacheSlice(s[0], s[1], s[2], s[3], columns, filters))
+
+#Bucketed variants of the raw data tables (see benchflow.cql), partitioned by (experiment_id, trial_id, bucket), and the time
+#column giving the bucket of their rows. The rows of io_data have no time, so they are spread over hash buckets of their id
+bucketedRawTables = {"environment_data":("environment_data_bucketed", "read_time"), "io_data":("io_data_bucketed", None), \
+                     "process":("process_bucketed", "start_time"), "construct":("construct_bucketed", "start_time")}
+
+#Bucket of a row of a raw data table in its bucketed variant: the time bucket of bucketSeconds seconds of its time column (-1 if
+#the time is missing), or for the tables without time one of hashBuckets buckets by the hash of its id
+def getRawDataBucket(table, row, bucketSeconds, hashBuckets):
+    import zlib
+    import calendar
+    
+    timeColumn = bucketedRawTables[table][1]
+    if timeColumn is None:
+        return (zlib.crc32(str(row[table + "_id"])) & 0xffffffff) % hashBuckets
+    value = row[timeColumn]
+    if value is None:
+        return -1
+    seconds = parseReadTime(value) if isinstance(value, basestring) else calendar.timegm(value.utctimetuple())
+    return int(seconds // bucketSeconds)
+
+#Buckets of the bucketed variant of a raw data table holding data of the trials, as (trial_id, bucket, source_rows) triples,
+#from the raw_data_buckets index written with the bucketed data, source_rows being the rows of the raw data partition copied
+@tracedFunction
+def getRawDataBuckets(sc, cassandraKeyspace, table, experimentID, trialIDs):
+    keys = [{"experiment_id":experimentID, "trial_id":trialID, "table_name":table} for trialID in trialIDs]
+    return sc.parallelize(keys, len(keys)) \
+            .joinWithCassandraTable(cassandraKeyspace, "raw_data_buckets") \
+            .on("experiment_id", "trial_id", "table_name") \
+            .select("trial_id", "bucket", "source_rows") \
+            .map(lambda x: (str(x[1]["trial_id"]), x[1]["bucket"], x[1]["source_rows"])) \
+            .collect()
+
+#Return the number of rows of the partitions of a table of the trials, as a dictionary from the trial to its rows: counted in
+#Cassandra through the driver session, or without it by a Spark job reading the keys of the rows
+@tracedFunction
+def countTrialRows(sc, cassandraKeyspace, table, experimentID, trialIDs):
+    counts = {}
+    for trialID in trialIDs:
+        result = aggregatePartition(sc, cassandraKeyspace, table, [("count", None)], [("experiment_id", experimentID), ("trial_id", trialID)])
+        if result is None:
+            break
+        counts[trialID] = result[None][0]
+    else:
+        return counts
+    
+    keys = [{"experiment_id":experimentID, "trial_id":trialID} for trialID in trialIDs]
+    counts = dict(sc.parallelize(keys, len(keys)) \
+            .joinWithCassandraTable(cassandraKeyspace, table) \
+            .on("experiment_id", "trial_id") \
+            .select("trial_id") \
+            .map(lambda x: (str(x[1]["trial_id"]), 1)) \
+            .reduceByKey(lambda a, b: a + b) \
+            .collect())
+    return dict((trialID, counts.get(trialID, 0)) for trialID in trialIDs)
+
+#Delete the rows of a table selected by each of the keys (dictionaries from the columns of the partition key, and of a prefix
+#of the clustering key, to their values), through the driver session or in the local Cassandra stand-in. Returns False if
+#neither is available, as the connector can not delete
+def deleteRows(sc, cassandraKeyspace, table, keys):
+    if len(keys) == 0:
+        return True
+    if hasattr(sc, "localCassandraPath"):
+        from localCassandra import LocalCassandra
+        store = LocalCassandra(sc.localCassandraPath)
+        store.delete(cassandraKeyspace, table, keys)
+        store.close()
+        return True
+    session = getCassandraSession(sc)
+    if session is None:
+        return False
+    for key in keys:
+        columns = sorted(key.keys())
+        statement = session.prepare("DELETE FROM %s.%s WHERE %s" % (cassandraKeyspace, table, " AND ".join(c + "=?" for c in columns)))
+        session.execute(statement, [key[c] for c in columns])
+    return True
+
+#Read the given columns of a raw data table for many trials from its bucketed variant, joining the keys of all the buckets of
+#the trials with it, so that every bucket is read by its own task and the read parallelism grows with the length of the
+#trials. The clustering keys restrict the rows read as in readTrials. Returns None if any of the trials is not bucketed, or if
+#the partition of any of the trials in the raw data table has not the number of rows copied (eg. data arrived after bucketing)
+def readBucketedTrials(sc, cassandraKeyspace, table, columns, experimentID, trialIDs, clusteringKeys=[]):
+    buckets = getRawDataBuckets(sc, cassandraKeyspace, table, experimentID, trialIDs)
+    if len(set(trialID for trialID, bucket, sourceRows in buckets)) < len(set(trialIDs)):
+        return None
+    
+    sourceRows = dict((trialID, rows) for trialID, bucket, rows in buckets)
+    counts = countTrialRows(sc, cassandraKeyspace, table, experimentID, trialIDs)
+    changed = [t for t in trialIDs if counts[t] != sourceRows[t]]
+    if len(changed) > 0:
+        print "Reading " + table + " from the raw data table, the trials changed since bucketed: " + ", ".join(changed)
+        return None
+    
+    keys = []
+    for trialID, bucket, rows in buckets:
+        key = {"experiment_id":experimentID, "trial_id":trialID, "bucket":bucket}
+        key.update(dict(clusteringKeys))
+        keys.append(key)
+    
+    return sc.parallelize(keys, len(keys)) \
+            .joinWithCassandraTable(cassandraKeyspace, bucketedRawTables[table][0]) \
+            .on("experiment_id", "trial_id", "bucket", *[k for k, v in clusteringKeys]) \
+            .select(*columns) \
+            .map(lambda x: x[1])
+
+#Read the given columns (and trial_id) of a table partitioned by (experiment_id, trial_id) for many trials of an experiment.
+#The partitions of more than one trial are read in parallel joining their keys with the table. The clustering keys, a list of
+#(column, value) pairs in clustering order (eg. container_id and host_id), restrict the rows read in every partition.
+#If cacheDir is given and all the trials are in the raw cache there and unchanged in Cassandra since, they are read from the
+#cache instead of Cassandra. With raw_data_bucketed in the configuration, the raw data tables of bucketed trials are read from
+#their bucketed variants
+@analyserStageFunction("read")
+def readTrials(sc, cassandraKeyspace, table, columns, experimentID, trialIDs, clusteringKeys=[], cacheDir=None):
+    columns = ["trial_id"] + [c for c in columns if c != "trial_id"]
+    
+    if cacheDir is not None:
+        cachedRDD = readRawCache(sc, cassandraKeyspace, cacheDir, table, columns, experimentID, trialIDs, clusteringKeys)
+        if cachedRDD is not None:
+            return cachedRDD
+    
+    if analyserConfiguration["raw_data_bucketed"] and table in bucketedRawTables:
+        bucketedRDD = readBucketedTrials(sc, cassandraKeyspace, table, columns, experimentID, trialIDs, clusteringKeys)
+        if bucketedRDD is not None:
+            return bucketedRDD
+    
+    if len(trialIDs) == 1:
+        where = " AND ".join(["trial_id=?", "experiment_id=?"] + [k + "=?" for k, v in clusteringKeys])
+        return sc.cassandraTable(cassandraKeyspace, table) \
+                .select(*columns) \
+                .where(where, trialIDs[0], experimentID, *[v for k, v in clusteringKeys])
+    
+    keys = []
+    for trialID in trialIDs:
+        key = {"experiment_id":experimentID, "trial_id":trialID}
+        key.update(dict(clusteringKeys))
+        keys.append(key)
+    
+    return sc.parallelize(keys, len(keys)) \
+            .joinWithCassandraTable(cassandraKeyspace, table) \
+            .on("experiment_id", "trial_id", *[k for k, v in clusteringKeys]) \
+            .select(*columns) \
+            .map(lambda x: x[1])
+
+#Obtain the SQL context of the Spark context, to work with DataFrames
+def getSQLContext(sc):
+    from pyspark.sql import SQLContext
+    return SQLContext.getOrCreate(sc)
+
+#Read the given columns (and trial_id) of a table for many trials of an experiment as a DataFrame through the Cassandra data
+#source. The restrictions on the keys and the column selection are pushed down to Cassandra, and the rows stay in the JVM
+@analyserStageFunction("read")
+def readTrialsDataFrame(sc, cassandraKeyspace, table, columns, experimentID, trialIDs, clusteringKeys=[]):
+    from pyspark.sql import functions as F
+    
+    columns = ["trial_id"] + [c for c in columns if c != "trial_id"]
+    
+    df = getSQLContext(sc).read \
+            .format("org.apache.spark.sql.cassandra") \
+            .options(keyspace=cassandraKeyspace, table=table) \
+            .load() \
+            .filter(F.col("experiment_id") == experimentID) \
+            .filter(F.col("trial_id").isin(trialIDs))
+    for k, v in clusteringKeys:
+        df = df.filter(F.col(k) == v)
+    return df.select(*columns)
+
+#Compute the metrics of computeMetrics of a column of a DataFrame for every group of the groupBy columns. The aggregations run in
+#the JVM and only one row per group reaches Python. The percentiles are approximated by percentile_approx (Spark 2.1, or a
+#HiveContext) with the given accuracy (quantile_accuracy of the configuration if None). The integral needs the order of the
+#data, given by the orderBy column, otherwise it is None. Returns a dictionary from the tuple of the group values to the
+#metrics, groups without values are missing
+@analyserStageFunction("metrics")
+def computeMetricsDataFrame(df, column, groupBy=[], orderBy=None, accuracy=None):
+    from pyspark.sql import functions as F
+    
+    accuracy = accuracy or analyserConfiguration["quantile_accuracy"]
+    value = F.col(column).cast("double")
+    percentiles = "array(%s)" % ", ".join([repr(p / 100.0) for p in range(0, 101)])
+    aggregations = [F.count(value).alias("num_data_points"), F.min(column).alias("min"), F.max(column).alias("max"), \
+                    F.avg(value).alias("mean"), F.var_pop(value).alias("variance"), F.sum(value).alias("sum"), \
+                    F.expr("percentile_approx(cast(%s as double), %s, %d)" % (column, percentiles, accuracy)).alias("percentiles")]
+    if orderBy is not None:
+        aggregations += [F.min(F.struct(orderBy, column)).alias("first"), F.max(F.struct(orderBy, column)).alias("last")]
+    
+    rows = df.filter(F.col(column).isNotNull()) \
+            .groupBy(*groupBy) \
+            .agg(*aggregations) \
+            .collect()
+    
+    metrics = {}
+    for row in rows:
+        dataLength = row["num_data_points"]
+        mean = row["mean"]
+        stdD = math.sqrt(row["variance"])
+        marginError = stdD/float(math.sqrt(dataLength)) * 2
+        percentilesList = [float(p) for p in row["percentiles"]]
+        dataIntegral = None
+        if orderBy is not None:
+            dataIntegral = row["sum"] - (row["first"][column] + row["last"][column]) / 2.0 if dataLength > 1 else 0.0
+        
+        metrics[tuple(row[g] for g in groupBy)] = {"mean":mean, "integral":dataIntegral, "num_data_points":dataLength, \
+                "min":row["min"], "max":row["max"], "sd":stdD, "variance":row["variance"], "q1":percentilesList[25], "q2":percentilesList[50], \
+                "q3":percentilesList[75], "p95":percentilesList[95], "me":marginError, "ci095_min":mean - marginError, "ci095_max":mean + marginError, \
+                "p90":percentilesList[90], "p99":percentilesList[99], "percentiles":percentilesList, "duration":None}
+    return metrics
+
+#Compute the mode (as computeMode) of a column of a DataFrame for every group of the groupBy columns, counting in the JVM.
+#Returns a dictionary from the tuple of the group values to the list of modes and their frequency
+@analyserStageFunction("mode")
+def computeModeDataFrame(df, column, groupBy=[]):
+    from pyspark.sql import functions as F
+    
+    counts = df.filter(F.col(column).isNotNull()) \
+            .groupBy(*(groupBy + [column])) \
+            .count()
+    highestCounts = counts.groupBy(*groupBy) \
+            .agg(F.max("count").alias("count"))
+    
+    modes = {}
+    for row in counts.join(highestCounts, groupBy + ["count"]).collect():
+        modes.setdefault(tuple(row[g] for g in groupBy), ([], row["count"]))[0].append(row[column])
+    return modes
+
+#Compute the mode (as computeMode) of an array of values with NumPy. Returns the list of modes and their frequency
+@tracedFunction
+def computeValuesMode(data):
+    data = np.asarray(data)
+    if len(data) == 0:
+        return (None, None)
+    values, counts = np.unique(data, return_counts=True)
+    highestCount = counts.max()
+    return ([v.item() for v in values[counts == highestCount]], highestCount.item())
+
+#Compute the mode and the metrics of computeMetrics of a field for many groups of rows in one pass. groupsFunction returns the
+#list of the groups of a row (a row can be in many groups, eg. in a group of its own and in the group of all the rows). The rows
+#are keyed by group and the values of each group are summarised together with NumPy, instead of filtering and collecting the
+#data once per group. Groups whose values are all None get no mode and empty metrics.
+#Returns a dictionary from the group to the (mode, metrics) pair
+@analyserStageFunction("metrics")
+def computeGroupedMetrics(dataRDD, groupsFunction, valueField):
+    def summarise(values):
+        data = [v for v in values if v is not None]
+        return (computeValuesMode(data), computeMetrics(data))
+    
+    return dataRDD.flatMap(lambda r: [(g, r[valueField]) for g in groupsFunction(r)]) \
+            .groupByKey() \
+            .mapValues(summarise) \
+            .collectAsMap()
+
+#Compute the mode and the metrics of computeMetrics of a column of a DataFrame for every group of the groupBy columns, with a
+#grouped map pandas UDF (Spark 2.3, with pandas and pyarrow). The values of each group reach Python as Arrow batches and are
+#summarised with NumPy, so the percentiles are exact. Returns a dictionary from the tuple of the group values to the
+#(mode, metrics) pair
+@analyserStageFunction("metrics")
+def computeGroupedMetricsDataFrame(df, column, groupBy):
+    from pyspark.sql.functions import pandas_udf, PandasUDFType
+    from pyspark.sql.types import StructType, StructField, ArrayType, LongType, StringType
+    
+    schema = StructType([df.schema[g] for g in groupBy] + \
+                        [StructField("mode", ArrayType(df.schema[column].dataType)), StructField("mode_freq", LongType()), \
+                         StructField("metrics", StringType())])
+    
+    def summarise(pdf):
+        import pandas as pd
+        
+        data = pdf[column].dropna().values
+        mode = computeValuesMode(data)
+        row = [pdf[g].iloc[0] for g in groupBy] + [mode[0], mode[1], json.dumps(computeMetrics(data))]
+        return pd.DataFrame([row], columns=schema.names)
+    
+    rows = df.groupby(*groupBy) \
+            .apply(pandas_udf(summarise, schema, PandasUDFType.GROUPED_MAP)) \
+            .collect()
+    
+    results = {}
+    for r in rows:
+        mode = (list(r["mode"]), r["mode_freq"]) if r["mode"] is not None else (None, None)
+        results[tuple(r[g] for g in groupBy)] = (mode, json.loads(r["metrics"]))
+    return results
+
+#Create the queries of all the trials of an RDD read with readTrials, calling createTrialQueries(trialID, trialRDD) with the
+#rows of each trial and concatenating the returned queries
+@tracedFunction
+def createTrialsQueries(dataRDD, trialIDs, createTrialQueries):
+    queries = []
+    for trialID in trialIDs:
+        if len(trialIDs) == 1:
+            trialRDD = dataRDD
+        else:
+            trialRDD = dataRDD.filter(lambda r: r["trial_id"] == trialID)
+        queries += createTrialQueries(trialID, trialRDD)
+    return queries
+
+#Run in the same process the experiment analyser matching the running trial analyser (analysers/experiments/<name>.py
+#for analysers/trials/<name>.py), with the same arguments. It reuses the running Spark context
+def runExperimentAnalyser(trialScript):
+    import imp
+    import os
+    
+    name = os.path.basename(trialScript)
+    path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(trialScript))), "experiments", name)
+    experimentAnalyser = imp.load_source("experiment_" + os.path.splitext(name)[0], path)
+    experimentAnalyser.main()
+
+#Run in the same process the analyser in the script at path, with the given arguments (as if passed on the command line). It
+#reuses the running Spark context
+def runAnalyserScript(path, args):
+    import imp
+    import sys
+    
+    name = os.path.splitext(os.path.basename(path))[0]
+    analyser = imp.load_source(os.path.basename(os.path.dirname(os.path.abspath(path))) + "_" + name, path)
+    sys.argv = [path, json.dumps(args)]
+    analyser.main()
+
+#Checkpoint of a backfill, in a JSON file: the steps done, as tuples (the analyser, experiment and trial of the trial analysers,
+#the steps of getBackfillExperimentRuns for the experiment analysers). The file is replaced only when complete, after every batch, so an
+#interrupted backfill resumes from its last completed batch. Without a path the checkpoint is only kept in memory
+class BackfillCheckpoint(object):
+    def __init__(self, path=None):
+        self.path = path
+        self.done = set()
+        if path is not None and os.path.exists(path):
+            with open(path) as f:
+                self.done = set(tuple(str(v) for v in step) for step in json.load(f)["done"])
+    
+    def isDone(self, *step):
+        return tuple(step) in self.done
+    
+    #Mark the steps as done and save the checkpoint
+    def markDone(self, steps):
+        self.done.update(tuple(step) for step in steps)
+        if self.path is None:
+            return
+        tmpPath = self.path + ".tmp"
+        with open(tmpPath, "w") as f:
+            json.dump({"done":sorted(list(step) for step in self.done)}, f)
+        os.rename(tmpPath, self.path)
+
+#Split the trials of the experiments (a dictionary from the experiment to its trials) not yet backfilled by the analyser in
+#batches of at most batchSize trials of the same experiment. Returns the list of (experiment, trials) pairs, in order of
+#experiment and trial
+def getBackfillBatches(experiments, analyser, checkpoint, batchSize):
+    batches = []
+    for experimentID in sorted(experiments.keys()):
+        trialIDs = [t for t in sorted(experiments[experimentID]) if not checkpoint.isDone(analyser, experimentID, t)]
+        for i in range(0, len(trialIDs), batchSize):
+            batches.append((experimentID, trialIDs[i:i + batchSize]))
+    return batches
+
+#Seconds to pause after a backfill batch that read rowsRead rows in elapsed seconds, so that the batches read at most
+#rowsPerSecond rows per second on average (no pause if either is None)
+def getBackfillPause(rowsRead, elapsed, rowsPerSecond):
+    if rowsRead is None or rowsPerSecond is None:
+        return 0.0
+    return max(0.0, rowsRead / float(rowsPerSecond) - elapsed)
+
+#Experiment analysers run by the backfill once a trial analyser is done with an experiment, the one of the same name (if any)
+#for the trial analysers not listed. resources computes the cpu, ram and IO results of all the containers at once
+backfillExperimentAnalysers = {"resources":["cpu", "ram", "IO"]}
+
+#Analysers of a single container, given by the container_id, container_name and host_id arguments. The backfill runs their
+#experiment analysers once for each container of the experiment, while their trial analysers can not be backfilled
+backfillContainerAnalysers = ["cpu", "ram", "IO", "network", "environment", "faban"]
+
+#Return the runs of the experiment analysers following the trial analyser in the backfill of an experiment, skipping the ones
+#done in the checkpoint. getContainers returns the containers of the experiment (dictionaries with container_id, container_name
+#and host_id), and is only called for the analysers of a single container. Each run is an (experiment analyser, arguments,
+#checkpoint step) triple, the arguments being the container ones of the analysers of a single container and empty for the others
+def getBackfillExperimentRuns(analyser, experimentID, getContainers, checkpoint):
+    runs = []
+    for experimentAnalyser in backfillExperimentAnalysers.get(analyser, [analyser]):
+        if experimentAnalyser in backfillContainerAnalysers:
+            steps = [(dict(c), ("experiments/" + experimentAnalyser, experimentID, c["container_name"], c["host_id"])) for c in getContainers()]
+        else:
+            steps = [({}, ("experiments/" + experimentAnalyser, experimentID))]
+        runs += [(experimentAnalyser, args, step) for args, step in steps if not checkpoint.isDone(*step)]
+    return runs
+
+#Pooled sessions of the Cassandra driver, one per cluster and user, shared by all the analysers running in the process
+cassandraSessions = {}
+
+#Return the SSL context of the Cassandra driver from the SSL settings of the connector in the Spark configuration
+#(spark.cassandra.connection.ssl.*), or None if SSL is not enabled. The driver can not read Java key stores, so the trust store
+#is used only with the PEM type, otherwise the certificates are verified with the default ones of the system
+def getCassandraSSLContext(conf):
+    import ssl
+    
+    if conf.get("spark.cassandra.connection.ssl.enabled", "false").lower() != "true":
+        return None
+    trustStore = conf.get("spark.cassandra.connection.ssl.trustStore.path", None)
+    if trustStore is not None and conf.get("spark.cassandra.connection.ssl.trustStore.type", "JKS").upper() == "PEM":
+        return ssl.create_default_context(cafile=trustStore)
+    return ssl.create_default_context()
+
+#Return the session of the Cassandra driver connected to the hosts of the Spark context (spark.cassandra.connection.host),
+#opening it on the first use with the credentials (spark.cassandra.auth.*) and the SSL settings of the connector. Returns None
+#if the Cassandra driver is not installed or the local Cassandra stand-in is used
+def getCassandraSession(sc):
+    try:
+        from cassandra.cluster import Cluster
+        from cassandra.auth import PlainTextAuthProvider
+    except ImportError:
+        return None
+    if hasattr(sc, "localCassandraPath"):
+        return None
+    
+    conf = sc.getConf()
+    hosts = conf.get("spark.cassandra.connection.host", "localhost")
+    port = int(conf.get("spark.cassandra.connection.port", "9042"))
+    username = conf.get("spark.cassandra.auth.username", None)
+    if (hosts, port, username) not in cassandraSessions:
+        authProvider = None
+        if username is not None:
+            authProvider = PlainTextAuthProvider(username=username, password=conf.get("spark.cassandra.auth.password", None))
+        cluster = Cluster([h.strip() for h in hosts.split(",")], port=port, auth_provider=authProvider, ssl_context=getCassandraSSLContext(conf))
+        cassandraSessions[(hosts, port, username)] = cluster.connect()
+    return cassandraSessions[(hosts, port, username)]
+
+#Compute count, sum, min and max aggregates of the rows of a partition in Cassandra, through the driver session and without Spark.
+#aggregates is a list of (function, column) pairs (column None for count(*)), keys the (column, value) pairs of the partition key
+#and of the restricted clustering keys. Rows can be grouped by the next clustering key (GROUP BY needs Cassandra 3.10). Returns a
+#dictionary from the group (None if not grouped) to the list of the aggregated values, or None if the Cassandra driver is not
+#installed or the aggregates can not run in a single CQL query, in which case the rows are to be read with Spark
+@tracedFunction
+def aggregatePartition(sc, cassandraKeyspace, table, aggregates, keys, groupBy=None):
+    session = getCassandraSession(sc)
+    if session is None:
+        return None
+    
+    tableMetadata = session.cluster.metadata.keyspaces[cassandraKeyspace].tables[table]
+    nextClusteringKeys = [c.name for c in tableMetadata.clustering_key][len(keys) - len(tableMetadata.partition_key):]
+    if groupBy is not None and nextClusteringKeys[:1] != [groupBy]:
+        return None
+    
+    selected = ["%s(%s)" % (f, "*" if c is None else c) for f, c in aggregates]
+    if groupBy is not None:
+        selected = [groupBy] + selected
+    statement = "SELECT %s FROM %s.%s WHERE %s" % (", ".join(selected), cassandraKeyspace, table, " AND ".join([k + "=?" for k, v in keys]))
+    if groupBy is not None:
+        statement += " GROUP BY " + groupBy
+    
+    result = {}
+    for row in session.execute(session.prepare(statement), [v for k, v in keys]):
+        if groupBy is None:
+            result[None] = list(row)
+        else:
+            result[row[0]] = list(row[1:])
+    return result
+
+#Version of the packed arrays of encodePackedArray, and the little endian NumPy types of their values by type code
+packedArrayVersion = 1
+packedArrayTypes = {0:"<f8", 1:"<f4"}
+
+#Tables whose list columns are all stored packed (in the <column>_packed blob column) with packed_result_lists, in addition to
+#the percentiles columns of every table (see packResultLists)
+packedResultTables = ["trial_cpu_core", "exp_cpu_core"]
+
+#Encode a list of numbers as a packed array: a header of 8 bytes (version, type code, unused, number of values as a little
+#endian unsigned int) followed by the values as little endian float64 or float32, None being stored as NaN. The blob is
+#written in a single cell, so rewriting it does not leave the tombstones of the elements of a CQL list
+def encodePackedArray(values, dtype="float64"):
+    import struct
+    
+    typeCode = 0 if dtype == "float64" else 1
+    data = np.array([np.nan if v is None else v for v in values], dtype=packedArrayTypes[typeCode])
+    return bytearray(struct.pack("<BBHI", packedArrayVersion, typeCode, 0, len(data)) + data.tostring())
+
+#Decode a packed array of encodePackedArray as a read only NumPy array sharing the memory of the blob (None for None), with NaN
+#for the missing values
+def decodePackedArray(blob):
+    import struct
+    
+    if blob is None:
+        return None
+    version, typeCode, unused, length = struct.unpack_from("<BBHI", blob)
+    if version != packedArrayVersion or typeCode not in packedArrayTypes:
+        raise ValueError("Unsupported packed array version %d or type %d" % (version, typeCode))
+    return np.frombuffer(blob, dtype=packedArrayTypes[typeCode], count=length, offset=8)
+
+#Replace the list values of the rows of a table to be stored packed (the percentiles columns, and all the lists of the tables
+#in packedResultTables) with their packed arrays in the <column>_packed columns. The list columns are not written, and
+#the readers prefer the packed columns (see decodeResultRow)
+def packResultLists(table, rows, dtype="float64"):
+    packedRows = []
+    for row in rows:
+        packedRow = {}
+        for column, value in row.items():
+            if isinstance(value, list) and (table in packedResultTables or column.endswith("_percentiles")):
+                packedRow[column + "_packed"] = encodePackedArray(value, dtype)
+            else:
+                packedRow[column] = value
+        packedRows.append(packedRow)
+    return packedRows
+
+#Return a dictionary copy of a row of a result table with the lists as NumPy float64 arrays (None being NaN). The packed
+#arrays of the <column>_packed columns are decoded without copies and replace the lists of their columns
+def decodeResultRow(row):
+    row = rowToDict(row)
+    result = {}
+    for column, value in row.items():
+        if column.endswith("_packed"):
+            continue
+        if isinstance(value, (list, tuple)):
+            value = np.array([np.nan if v is None else v for v in value], dtype=np.float64)
+        result[column] = value
+    for column, value in row.items():
+        if column.endswith("_packed") and value is not None:
+            result[column[:-len("_packed")]] = decodePackedArray(value)
+    return result
+
+#Primary key of a table, as the lists of the partition key and of the clustering columns, from the metadata of the driver
+#session or from the definition of the local Cassandra stand-in. None if neither is available
+def getTableKey(sc, cassandraKeyspace, table):
+    if hasattr(sc, "localCassandraPath"):
+        from localCassandra import LocalCassandra
+        store = LocalCassandra(sc.localCassandraPath)
+        definition = store.getTable(cassandraKeyspace, table)
+        store.close()
+        return (definition["partition_key"], definition["clustering_key"])
+    session = getCassandraSession(sc)
+    if session is None:
+        return None
+    tableMetadata = session.cluster.metadata.keyspaces[cassandraKeyspace].tables[table]
+    return ([c.name for c in tableMetadata.partition_key], [c.name for c in tableMetadata.clustering_key])
+
+#Whether two values of a result column are equal: numbers within the relative tolerance (absolute below 1), NaN being equal to
+#NaN, collections element by element, and empty collections being equal to None (as Cassandra reads them back)
+def resultValuesEqual(a, b, tolerance):
+    import numbers
+    
+    if isinstance(a, (list, tuple, set, dict, np.ndarray)) and len(a) == 0:
+        a = None
+    if isinstance(b, (list, tuple, set, dict, np.ndarray)) and len(b) == 0:
+        b = None
+    if a is None or b is None:
+        return a is None and b is None
+    if isinstance(a, numbers.Number) and isinstance(b, numbers.Number) and not isinstance(a, bool) and not isinstance(b, bool):
+        if math.isnan(a) or math.isnan(b):
+            return math.isnan(a) and math.isnan(b)
+        return abs(a - b) <= tolerance * max(1.0, abs(a), abs(b))
+    if isinstance(a, (list, tuple, np.ndarray)) and isinstance(b, (list, tuple, np.ndarray)):
+        return len(a) == len(b) and all(resultValuesEqual(x, y, tolerance) for x, y in zip(a, b))
+    if isinstance(a, dict) and isinstance(b, dict):
+        return sorted(a.keys()) == sorted(b.keys()) and all(resultValuesEqual(a[k], b[k], tolerance) for k in a)
+    return a == b or str(a) == str(b)
+
+#Whether the columns of a computed result row are equal to the ones of the row already stored (see resultValuesEqual). The
+#packed arrays are compared decoded
+def resultRowsEqual(row, storedRow, tolerance):
+    for column, value in row.items():
+        storedValue = storedRow.get(column)
+        if column.endswith("_packed"):
+            value = decodePackedArray(value) if value is not None else None
+            storedValue = decodePackedArray(storedValue) if storedValue is not None else None
+        if not resultValuesEqual(value, storedValue, tolerance):
+            return False
+    return True
+
+#Writer of the rows computed by an analyser. Rows are buffered per destination table by add and written by flush through the
+#pooled driver session, in unlogged batches of rows of the same partition. Without the driver every table is written by Spark
+#in a single task. If asynchronous, flush only starts the writes, so they overlap with the next computation; wait flushes and
+#blocks until everything is written, and must be called at the end of main(). The batch size and asynchronous default to
+#write_batch_size and write_asynchronous of the analyser configuration. With write_changed_only (or changedOnly) the rows of
+#the result tables (trial_* and exp_*) are first compared with the stored ones, read in one Spark job per table and flush,
+#and only the changed and new rows are written. The counts of unchanged, changed and new rows are kept in counts (and in the
+#current analyser run)
+class ResultsWriter(object):
+    def __init__(self, sc, cassandraKeyspace, asynchronous=None, batchSize=None, changedOnly=None):
+        self.sc = sc
+        self.cassandraKeyspace = cassandraKeyspace
+        self.asynchronous = asynchronous if asynchronous is not None else analyserConfiguration["write_asynchronous"]
+        self.batchSize = batchSize if batchSize is not None else analyserConfiguration["write_batch_size"]
+        self.changedOnly = changedOnly if changedOnly is not None else analyserConfiguration["write_changed_only"]
+        self.tolerance = analyserConfiguration["write_tolerance"]
+        self.counts = {"unchanged":0, "changed":0, "new":0}
+        self.tableKeys = {}
+        self.session = getCassandraSession(sc)
+        self.rows = {}
+        self.statements = {}
+        self.pending = []
+        self.pool = None
+    
+    #Buffer the rows to write to the table, packing their lists if packed_result_lists is configured (see packResultLists)
+    def add(self, table, rows):
+        if analyserConfiguration["packed_result_lists"]:
+            rows = packResultLists(table, rows, analyserConfiguration["packed_result_dtype"])
+        self.rows.setdefault(table, []).extend(rows)
+    
+    #Write all the buffered rows
+    def flush(self):
+        rows = self.rows
+        self.rows = {}
+        for table, tableRows in rows.items():
+            if self.changedOnly and table.startswith(("trial_", "exp_")):
+                tableRows = self.changedRows(table, tableRows)
+            if len(tableRows) == 0:
+                continue
+            if self.session is not None:
+                self.pending += self.writeBatches(table, tableRows)
+            else:
+                self.pending.append(self.writeSpark(table, tableRows))
+        if not self.asynchronous:
+            self.waitPending()
+    
+    #Write all the buffered rows and wait until all the writes are completed, raising the error of a failed write
+    def wait(self):
+        with analyserStage("save"), traceSpan("ResultsWriter.wait"):
+            self.flush()
+            self.waitPending()
+    
+    def waitPending(self):
+        pending = self.pending
+        self.pending = []
+        for result in pending:
+            result()
+    
+    #Return the rows that differ from the stored ones or are new, counting them. All the rows are returned if the primary key of
+    #the table is not known (without the Cassandra driver) or not set in every row
+    def changedRows(self, table, rows):
+        import uuid
+        
+        if table not in self.tableKeys:
+            self.tableKeys[table] = getTableKey(self.sc, self.cassandraKeyspace, table)
+        if self.tableKeys[table] is None:
+            print "Writing all the rows of " + table + ", its primary key is not known"
+            return rows
+        partitionKey, clusteringKey = self.tableKeys[table]
+        primaryKey = partitionKey + clusteringKey
+        if any(c not in row for row in rows for c in primaryKey):
+            return rows
+        
+        def keyOf(row):
+            return tuple(str(row[c]) if isinstance(row[c], uuid.UUID) else row[c] for c in primaryKey)
+        
+        #Read the stored rows of all the partitions of the rows at once
+        partitions = dict((tuple(keyOf(r)[:len(partitionKey)]), dict((c, r[c]) for c in partitionKey)) for r in rows).values()
+        columns = sorted(set(c for r in rows for c in r.keys()))
+        with analyserStage("diff"), traceSpan("ResultsWriter.changedRows"):
+            storedRows = self.sc.parallelize(partitions, max(1, min(len(partitions), self.sc.defaultParallelism))) \
+                    .joinWithCassandraTable(self.cassandraKeyspace, table) \
+                    .on(*partitionKey) \
+                    .select(*columns) \
+                    .map(lambda x: rowToDict(x[1])) \
+                    .collect()
+        stored = dict((keyOf(r), r) for r in storedRows)
+        
+        changedRows = []
+        counts = {"unchanged":0, "changed":0, "new":0}
+        for row in rows:
+            storedRow = stored.get(keyOf(row))
+            if storedRow is None:
+                counts["new"] += 1
+                changedRows.append(row)
+            elif resultRowsEqual(row, storedRow, self.tolerance):
+                counts["unchanged"] += 1
+            else:
+                counts["changed"] += 1
+                changedRows.append(row)
+        
+        for name, count in counts.items():
+            self.counts[name] += count
+        if analyserRun is not None:
+            analyserRun.countWrittenRows(counts)
+        print "Rows of " + table + ": " + str(counts["unchanged"]) + " unchanged, " + str(counts["changed"]) + " changed, " + str(counts["new"]) + " new"
+        return changedRows
+    
+    def prepare(self, table, columns):
+        if (table, columns) not in self.statements:
+            self.statements[(table, columns)] = self.session.prepare("INSERT INTO %s.%s (%s) VALUES (%s)" % \
+                    (self.cassandraKeyspace, table, ", ".join(columns), ", ".join(["?"] * len(columns))))
+        return self.statements[(table, columns)]
+    
+    def writeBatches(self, table, rows):
+        from cassandra.query import BatchStatement, BatchType
+        
+        tableMetadata = self.session.cluster.metadata.keyspaces[self.cassandraKeyspace].tables[table]
+        partitionKey = [c.name for c in tableMetadata.partition_key]
+        
+        #Group the rows by partition and by the columns they set, that share the prepared statement
+        groups = {}
+        for row in rows:
+            key = (tuple(row.get(c) for c in partitionKey), tuple(sorted(row.keys())))
+            groups.setdefault(key, []).append(row)
+        
+        results = []
+        for (partition, columns), partitionRows in groups.items():
+            statement = self.prepare(table, columns)
+            for i in range(0, len(partitionRows), self.batchSize):
+                batch = BatchStatement(batch_type=BatchType.UNLOGGED)
+                for row in partitionRows[i:i + self.batchSize]:
+                    batch.add(statement, [row[c] for c in columns])
+                results.append(self.session.execute_async(batch).result)
+        return results
+    
+    def writeSpark(self, table, rows):
+        from multiprocessing.pool import ThreadPool
+        
+        write = lambda: self.sc.parallelize(rows, 1).saveToCassandra(self.cassandraKeyspace, table)
+        if not self.asynchronous:
+            write()
+            return lambda: None
+        if self.pool is None:
+            self.pool = ThreadPool(1)
+        return self.pool.apply_async(write).get
+
+#Default analyser configuration, overridden by the defaults section of the configuration file and then by the section of the
+#analyser (see getAnalyserConfiguration and analysers.configuration.yml for the meaning of the keys)
+analyserConfigurationDefaults = {
+    "app_name": None,
+    "partitions_per_core": 5,
+    "engine": "rdd",
+    "quantile_accuracy": 10000,
+    "storage_level": "auto",
+    "cache_memory_budget": None,
+    "collect_spill_threshold": 10000000,
+    "raw_cache_slice_size": 100000,
+    "raw_data_bucketed": False,
+    "raw_data_bucket_seconds": 300,
+    "raw_data_hash_buckets": 16,
+    "steady_state_batch_size": 5,
+    "write_batch_size": 20,
+    "write_asynchronous": False,
+    "packed_result_lists": False,
+    "packed_result_dtype": "float64",
+    "write_changed_only": False,
+    "skip_unchanged_inputs": False,
+    "backfill_batch_trials": 50,
+    "backfill_reads_per_second": None,
+    "backfill_rows_per_second": None,
+    "write_tolerance": 1e-09,
+    "local_cassandra": None,
+    "spark": {}
+}
+
+#Type of every key of the analyser configuration, and its allowed values if restricted. Integers must be positive
+analyserConfigurationSchema = {
+    "app_name": (basestring, None),
+    "partitions_per_core": (int, None),
+    "engine": (basestring, ["rdd", "dataframe", "pandas"]),
+    "quantile_accuracy": (int, None),
+    "storage_level": (basestring, ["auto", "MEMORY_ONLY", "MEMORY_ONLY_2", "MEMORY_AND_DISK", "MEMORY_AND_DISK_2", "DISK_ONLY", "DISK_ONLY_2", "OFF_HEAP"]),
+    "cache_memory_budget": (int, None),
+    "collect_spill_threshold": (int, None),
+    "raw_cache_slice_size": (int, None),
+    "raw_data_bucketed": (bool, None),
+    "raw_data_bucket_seconds": (int, None),
+    "raw_data_hash_buckets": (int, None),
+    "steady_state_batch_size": (int, None),
+    "write_batch_size": (int, None),
+    "write_asynchronous": (bool, None),
+    "packed_result_lists": (bool, None),
+    "packed_result_dtype": (basestring, ["float64", "float32"]),
+    "write_changed_only": (bool, None),
+    "skip_unchanged_inputs": (bool, None),
+    "backfill_batch_trials": (int, None),
+    "backfill_reads_per_second": (int, None),
+    "backfill_rows_per_second": (int, None),
+    "write_tolerance": (float, None),
+    "local_cassandra": (basestring, None),
+    "spark": (dict, None)
+}
+
+#Configuration of the analyser running in this process, the defaults until getAnalyserConfiguration loads it
+analyserConfiguration = dict(analyserConfigurationDefaults)
+
+#Name of the analyser in analyserFile (eg. __file__ of the analyser), as its directory and script name (eg. "trials/cpu")
+def getAnalyserName(analyserFile):
+    path = os.path.splitext(os.path.abspath(analyserFile))[0]
+    return os.path.basename(os.path.dirname(path)) + "/" + os.path.basename(path)
+
+#Check a section of the analyser configuration against analyserConfigurationSchema, raising a ValueError naming the section
+#and the key for unknown keys and wrong values. None is allowed for the keys without a default
+def validateAnalyserConfiguration(conf, section):
+    if not isinstance(conf, dict):
+        raise ValueError("Section %s of the analyser configuration is not a mapping" % section)
+    for key, value in conf.items():
+        if key not in analyserConfigurationSchema:
+            raise ValueError("Unknown key %s in section %s of the analyser configuration" % (key, section))
+        valueType, allowed = analyserConfigurationSchema[key]
+        if value is None and analyserConfigurationDefaults[key] is None:
+            continue
+        if not isinstance(value, valueType) or (valueType is int and isinstance(value, bool)):
+            raise ValueError("Key %s in section %s of the analyser configuration must be a %s, not %r" % (key, section, valueType.__name__, value))
+        if valueType is int and value <= 0:
+            raise ValueError("Key %s in section %s of the analyser configuration must be positive, not %r" % (key, section, value))
+        if allowed is not None and value not in allowed:
+            raise ValueError("Key %s in section %s of the analyser configuration must be one of %s, not %r" % (key, section, ", ".join(allowed), value))
+        if key == "spark":
+            for name, setting in value.items():
+                if not isinstance(name, basestring) or not name.startswith("spark."):
+                    raise ValueError("Spark setting %r in section %s of the analyser configuration is not a spark. property" % (name, section))
+                if not isinstance(setting, (basestring, int, float, bool)):
+                    raise ValueError("Spark setting %s in section %s of the analyser configuration must be a scalar, not %r" % (name, section, setting))
+
+#Return the path of the analyser configuration file analyserConfigFile on the driver: the path itself, the file shipped with
+#--files in the working directory of the driver, or the one in SparkFiles once the Spark context exists. Returns None if the file
+#is not found
+def findAnalyserConfigurationFile(analyserConfigFile):
+    paths = [analyserConfigFile, os.path.basename(analyserConfigFile)]
+    try:
+        from pyspark import SparkFiles
+        paths.append(SparkFiles.get(analyserConfigFile))
+    except Exception:
+        pass
+    for path in paths:
+        if os.path.isfile(path):
+            return path
+    return None
+
+#Load the configuration of an analyser from the analyserConfigFile (YAML format, see analysers.configuration.yml), the
+#analyser_config_file argument of the analysers, separate from the configuration of the SUT in config_file. The defaults
+#section and the section of the analyser in analyserFile (eg. __file__ of the analyser, giving the section "trials/cpu") are
+#merged over analyserConfigurationDefaults. Without an analyserConfigFile, or if it is not found (see
+#findAnalyserConfigurationFile), the defaults are used. The configuration is validated, raising a ValueError before any work
+#starts, and becomes the one of the process (analyserConfiguration)
+def getAnalyserConfiguration(analyserConfigFile, analyserFile=None):
+    global analyserConfiguration
+    
+    fileConf = {}
+    configFile = findAnalyserConfigurationFile(analyserConfigFile) if analyserConfigFile else None
+    if configFile is not None:
+        with open(configFile) as f:
+            fileConf = yaml.safe_load(f) or {}
+        if not isinstance(fileConf, dict) or any(k not in ["defaults", "analysers"] for k in fileConf.keys()):
+            raise ValueError("The analyser configuration file %s must only have the defaults and analysers sections" % configFile)
+    
+    sections = [("defaults", fileConf.get("defaults") or {})]
+    analysers = fileConf.get("analysers") or {}
+    if not isinstance(analysers, dict):
+        raise ValueError("The analysers section of the analyser configuration file %s is not a mapping" % configFile)
+    if analyserFile is not None:
+        name = getAnalyserName(analyserFile)
+        sections.append((name, analysers.get(name) or {}))
+    
+    conf = dict(analyserConfigurationDefaults)
+    conf["spark"] = dict(conf["spark"])
+    for section, sectionConf in sections:
+        validateAnalyserConfiguration(sectionConf, section)
+        for key, value in sectionConf.items():
+            if key == "spark":
+                conf["spark"].update(value)
+            else:
+                conf[key] = value
+    
+    analyserConfiguration = conf
+    return conf
+
+#Create the configuration of the Spark context of the analyser with the given app name (unless app_name is configured), the
+#Spark properties of the spark section (eg. spark.serializer) and the local Cassandra stand-in if local_cassandra is set
+def getSparkConf(appName, configuration=None):
     from pyspark import SparkConf
-    from pyspark import SparkFiles
-      
-    analyserConf = {}
-    confPath = SparkFiles.get(configFile)
-    with open(confPath) as f:
-        SUTConf = yaml.load(f)
-    return analyserConf
-
-#Function to compute the trial level metrics given an array containing the data
-def computeMetrics(data):
+    
+    configuration = configuration or analyserConfiguration
+    conf = SparkConf().setAppName(configuration["app_name"] or appName)
+    for key, value in sorted(configuration["spark"].items()):
+        conf.set(key, str(value).lower() if isinstance(value, bool) else str(value))
+    if configuration["local_cassandra"] is not None:
+        conf.set("spark.benchflow.local_cassandra", configuration["local_cassandra"])
+    return conf
+
+#Storage level of the configuration (storage_level) for the datasets the analysers cache. With auto the level is MEMORY_ONLY
+#(the data of PySpark is always stored serialized) while the data cached in the Spark context is below cache_memory_budget
+#bytes, MEMORY_AND_DISK from then on, so that new datasets go to disk instead of evicting the ones cached before
+def getStorageLevel(configuration=None):
+    from pyspark import SparkContext
+    from pyspark import StorageLevel
+    
+    configuration = configuration or analyserConfiguration
+    name = configuration["storage_level"]
+    if name == "auto":
+        budget = configuration["cache_memory_budget"]
+        sc = SparkContext._active_spark_context
+        name = "MEMORY_AND_DISK" if budget is not None and sc is not None and getCachedBytes(sc) >= budget else "MEMORY_ONLY"
+    return getattr(StorageLevel, name)
+
+#Bytes of the cached data (in memory and on disk) of the Spark context, 0 if the storage information is not available
+def getCachedBytes(sc):
+    try:
+        return sum(info.memSize() + info.diskSize() for info in sc._jsc.sc().getRDDStorageInfo())
+    except Exception:
+        return 0
+
+#Open cache scopes of the process, the innermost last, see CacheScope
+cacheScopes = []
+
+#Scope of the datasets (RDDs or DataFrames) cached by an analyser, used as a context manager. The datasets cached by
+#cacheDataset while the scope is the innermost open one are unpersisted when it exits, also on errors, so no cached data
+#outlives the computation using it in a long lived Spark context. Every analyser run is a scope until it finishes, and
+#samples the cached bytes before the datasets are unpersisted (see AnalyserRun)
+class CacheScope(object):
+    def __init__(self):
+        self.datasets = []
+    
+    def __enter__(self):
+        cacheScopes.append(self)
+        return self
+    
+    def __exit__(self, excType, excValue, traceback):
+        self.close()
+        return False
+    
+    #Persist a dataset with the given storage level (see getStorageLevel if None) until the scope exits
+    def persist(self, dataset, storageLevel=None):
+        dataset.persist(storageLevel or getStorageLevel())
+        self.datasets.append(dataset)
+        return dataset
+    
+    #Unpersist a dataset of the scope before the scope exits
+    def unpersist(self, dataset):
+        if analyserRun is not None:
+            analyserRun.sampleCachedBytes()
+        dataset.unpersist()
+        self.datasets = [d for d in self.datasets if d is not dataset]
+    
+    #Unpersist all the datasets of the scope and close it
+    def close(self):
+        if self in cacheScopes:
+            cacheScopes.remove(self)
+        if len(self.datasets) > 0 and analyserRun is not None:
+            analyserRun.sampleCachedBytes()
+        for dataset in reversed(self.datasets):
+            dataset.unpersist()
+        self.datasets = []
+
+#Cache a dataset in the innermost open cache scope with the given storage level (see getStorageLevel if None). Outside of any
+#scope the dataset is just persisted. Returns the dataset
+def cacheDataset(dataset, storageLevel=None):
+    if len(cacheScopes) == 0:
+        return dataset.persist(storageLevel or getStorageLevel())
+    return cacheScopes[-1].persist(dataset, storageLevel)
+
+#Unpersist a dataset cached by cacheDataset as soon as it is not needed anymore, without waiting for the end of its scope
+def uncacheDataset(dataset):
+    for scope in cacheScopes:
+        if any(d is dataset for d in scope.datasets):
+            scope.unpersist(dataset)
+            return
+    dataset.unpersist()
+
+#Growable buffer of numeric values for the driver side computations. The values are stored unboxed in an array (8 bytes each,
+#instead of a Python object each), and moved to a memory mapped temporary file in spillDir (the default temporary directory
+#if None) when they are more than spillThreshold (collect_spill_threshold of the configuration if None). The buffer holds
+#integers until a non integer value is appended
+class ValuesBuffer(object):
+    def __init__(self, spillThreshold=None, spillDir=None):
+        self.spillThreshold = spillThreshold if spillThreshold is not None else analyserConfiguration["collect_spill_threshold"]
+        self.spillDir = spillDir
+        self.typecode = None
+        self.chunk = None
+        self.chunkSize = 65536
+        self.spilled = None
+        self.length = 0
+    
+    def append(self, value):
+        from array import array
+        if self.typecode is None:
+            self.typecode = "l" if isinstance(value, (int, long)) and not isinstance(value, bool) else "d"
+            self.chunk = array(self.typecode)
+        try:
+            self.chunk.append(value)
+        except TypeError:
+            self.toFloat()
+            self.chunk.append(value)
+        if self.spilled is None and len(self.chunk) > self.spillThreshold:
+            self.spill()
+        elif self.spilled is not None and len(self.chunk) >= self.chunkSize:
+            self.flushChunk()
+    
+    def extend(self, values):
+        for v in values:
+            self.append(v)
+    
+    def dtype(self):
+        return np.int64 if self.typecode == "l" else np.float64
+    
+    #Switch the buffer to float values
+    def toFloat(self):
+        from array import array
+        if self.spilled is not None:
+            self.flushChunk()
+            floats = self.mapFile(np.float64, len(self.spilled))
+            floats[:self.length] = self.spilled[:self.length]
+            self.spilled = floats
+        self.typecode = "d"
+        self.chunk = array("d", self.chunk)
+    
+    def mapFile(self, dtype, capacity):
+        import tempfile
+        f = tempfile.TemporaryFile(dir=self.spillDir)
+        return np.memmap(f, dtype=dtype, mode="w+", shape=(capacity,))
+    
+    def spill(self):
+        from array import array
+        self.spilled = self.mapFile(self.dtype(), 2 * len(self.chunk))
+        self.spilled[:len(self.chunk)] = np.frombuffer(self.chunk, dtype=self.dtype())
+        self.length = len(self.chunk)
+        self.chunk = array(self.typecode)
+    
+    #Move the chunk to the memory mapped file, doubling its size when full
+    def flushChunk(self):
+        from array import array
+        end = self.length + len(self.chunk)
+        if end > len(self.spilled):
+            grown = self.mapFile(self.dtype(), max(2 * len(self.spilled), end))
+            grown[:self.length] = self.spilled[:self.length]
+            self.spilled = grown
+        self.spilled[self.length:end] = np.frombuffer(self.chunk, dtype=self.dtype())
+        self.length = end
+        self.chunk = array(self.typecode)
+    
+    #Return the values as a NumPy array (a memory mapped one if spilled), without copying the buffer
+    def toArray(self):
+        if self.typecode is None:
+            return np.array([], dtype=np.float64)
+        if self.spilled is None:
+            return np.frombuffer(self.chunk, dtype=self.dtype())
+        self.flushChunk()
+        return self.spilled[:self.length]
+
+#Collect an RDD of numbers into a NumPy array, streaming the partitions to the driver one at a time with toLocalIterator
+#instead of building a list of Python objects with collect. None values are skipped, as computeMetrics cannot use them
+@tracedFunction
+def collectArray(dataRDD, spillThreshold=None, spillDir=None):
+    values = ValuesBuffer(spillThreshold, spillDir)
+    for v in dataRDD.toLocalIterator():
+        if v is not None:
+            values.append(v)
+    return values.toArray()
+
+#Function to compute the trial level metrics given an array containing the data. If the times of the data points (in seconds,
+#sorted as the data) are given, the integral is computed over the real sampling intervals instead of a unit spacing
+@analyserStageFunction("metrics")
+def computeMetrics(data, times=None):
     #Return None if there is no data to work with
     if len(data) == 0:
         return {"median":None, "mean":None, "integral":None, "num_data_points":0, \
               "min":None, "max":None, "sd":None, "q1":None, "q2":None, "q3":None, "p90":None, "p95":None, "p99":None, "me":None, \
-              "ci095_min":None, "ci095_max":None, "percentiles":None, "variance":None}   
+              "ci095_min":None, "ci095_max":None, "percentiles":None, "variance":None, "duration":None}   
     
     dataMin = np.min(data).item()
     dataMax = np.max(data).item()
@@ -61,27 +2009,36 @@ def computeMetrics(data):
     marginError = stdE * 2
     CILow = mean - marginError
     CIHigh = mean + marginError
-    dataIntegral = integrate.trapz(data).item()
+    if times is None:
+        dataIntegral = integrate.trapz(data).item()
+        duration = None
+    else:
+        dataIntegral = integrate.trapz(data, x=times).item()
+        duration = float(times[-1] - times[0])
 
     #Returns a dictionary with the computed metrics
     return {"mean":mean, "integral":dataIntegral, "num_data_points":dataLength, \
               "min":dataMin, "max":dataMax, "sd":stdD, "variance": variance, "q1":q1, "q2":q2, "q3":q3, "p95":p95, "me":marginError, \
-              "ci095_min":CILow, "ci095_max":CIHigh, "p90":p90, "p99":p99, "percentiles": percentiles}
+              "ci095_min":CILow, "ci095_max":CIHigh, "p90":p90, "p99":p99, "percentiles": percentiles, "duration":duration}
     
+#Experiment level metrics of an experiment without data
+emptyExperimentMetrics = {"median_min":None, "median_max":None, \
+                          "mean_min":None, "mean_max":None, \
+                          "min":None, "max":None, "q1_min":None, \
+                          "q1_max":None, "q2_min":None, "q2_max":None, \
+                          "p95_max":None, "p95_min":None, \
+                          "p90_max":None, "p90_min":None, \
+                          "p99_max":None, "p99_min":None, \
+                          "q3_min":None, "q3_max":None, "weighted_avg":None, \
+                          "best": None, "worst": None, "average": None, \
+                          "variation_coefficient": None}
+
 #Computing the experiment level metrics, given the RDD containing the data, and the name of the data (eg. ram, cpu, ...)
+@analyserStageFunction("metrics")
 def computeExperimentMetrics(CassandraRDD, dataName):
     #If there is no data to work with return None
     if CassandraRDD.isEmpty():
-        return {"median_min":None, "median_max":None, \
-              "mean_min":None, "mean_max":None, \
-              "min":None, "max":None, "q1_min":None, \
-              "q1_max":None, "q2_min":None, "q2_max":None, \
-              "p95_max":None, "p95_min":None, \
-              "p90_max":None, "p90_min":None, \
-              "p99_max":None, "p99_min":None, \
-              "q3_min":None, "q3_max":None, "weighted_avg":None, \
-              "best": None, "worst": None, "average": None, \
-              "variation_coefficient": None}
+        return dict(emptyExperimentMetrics)
     
     #Function for sorting and getting the min or max, using RDD with the data, the data field to retrieve, 
     #and the way to sort (ascending or not)
@@ -110,7 +2067,7 @@ def computeExperimentMetrics(CassandraRDD, dataName):
     p99Max = sortAndGet(CassandraRDD, dataName+"_p99", 0)
     
     #Computations of the coefficient of variation
-    means = CassandraRDD.map(lambda a: a[dataName+'_mean']).collect()
+    means = collectArray(CassandraRDD.map(lambda a: a[dataName+'_mean']))
     coefficientOfVariation = stats.variation(means).item()*100
     
     #Computations of the weighted mean
@@ -176,8 +2133,87 @@ def computeExperimentMetrics(CassandraRDD, dataName):
               "best": bestTrials, "worst": worstTrials, "average": averageTrials, \
               "variation_coefficient": coefficientOfVariation}
 
+#Computing the experiment level metrics as computeExperimentMetrics, given the rows of the trials already collected (eg. the
+#few rows of a group of the trials of the experiment), without running Spark jobs
+def computeTrialsExperimentMetrics(trials, dataName):
+    if len(trials) == 0:
+        return computeExperimentMetrics.__wrapped__(EmptyRows(), dataName)
+    
+    metrics = {}
+    for name in ["q1", "q2", "q3", "p90", "p95", "p99"]:
+        values = [t[dataName+"_"+name] for t in trials]
+        metrics[name + "_min"] = min(values)
+        metrics[name + "_max"] = max(values)
+    metrics["min"] = min(t[dataName+"_min"] for t in trials)
+    metrics["max"] = max(t[dataName+"_max"] for t in trials)
+    
+    #Computations of the coefficient of variation, over the means that are not missing
+    means = [t[dataName+"_mean"] for t in trials]
+    metrics["variation_coefficient"] = stats.variation(np.array([m for m in means if m is not None])).item()*100
+    
+    #Computations of the weighted mean
+    weightSum = sum(t[dataName+"_num_data_points"] for t in trials)
+    metrics["weighted_avg"] = sum(t[dataName+"_mean"]*t[dataName+"_num_data_points"] for t in trials)/float(weightSum)
+    
+    #Computations of the best and worst trials: the ones with the extreme mean and, among them, the extreme margin of error
+    meanMin = min(means)
+    meMin = min(t[dataName+"_me"] for t in trials if t[dataName+"_mean"] == meanMin)
+    metrics["best"] = [t["trial_id"] for t in trials if t[dataName+"_mean"] == meanMin and t[dataName+"_me"] == meMin]
+    meanMax = max(means)
+    meMax = max(t[dataName+"_me"] for t in trials if t[dataName+"_mean"] == meanMax)
+    metrics["worst"] = [t["trial_id"] for t in trials if t[dataName+"_mean"] == meanMax and t[dataName+"_me"] == meMax]
+    metrics["mean_min"] = meanMin
+    metrics["mean_max"] = meanMax
+    
+    #Computations of the average trials: the ones with the closest means above and below the average of the means
+    meanAverage = sum(means)/float(len(means))
+    averageTrialsUpperMean = min(m for m in means if m >= meanAverage)
+    averageTrialsLowerMean = max(m for m in means if m <= meanAverage)
+    metrics["average"] = [t["trial_id"] for t in trials if t[dataName+"_mean"] == averageTrialsUpperMean or t[dataName+"_mean"] == averageTrialsLowerMean]
+    return metrics
+
+#Computing the experiment level metrics as computeExperimentMetrics, given the rows of the trials already collected (eg. the
+#few rows of a group of the trials of the experiment), without running Spark jobs
+def computeTrialsExperimentMetrics(trials, dataName):
+    if len(trials) == 0:
+        return dict(emptyExperimentMetrics)
+    
+    metrics = {}
+    for name in ["q1", "q2", "q3", "p90", "p95", "p99"]:
+        values = [t[dataName+"_"+name] for t in trials]
+        metrics[name + "_min"] = min(values)
+        metrics[name + "_max"] = max(values)
+    metrics["min"] = min(t[dataName+"_min"] for t in trials)
+    metrics["max"] = max(t[dataName+"_max"] for t in trials)
+    
+    #Computations of the coefficient of variation, over the means that are not missing
+    means = [t[dataName+"_mean"] for t in trials]
+    metrics["variation_coefficient"] = stats.variation(np.array([m for m in means if m is not None])).item()*100
+    
+    #Computations of the weighted mean
+    weightSum = sum(t[dataName+"_num_data_points"] for t in trials)
+    metrics["weighted_avg"] = sum(t[dataName+"_mean"]*t[dataName+"_num_data_points"] for t in trials)/float(weightSum)
+    
+    #Computations of the best and worst trials: the ones with the extreme mean and, among them, the extreme margin of error
+    meanMin = min(means)
+    meMin = min(t[dataName+"_me"] for t in trials if t[dataName+"_mean"] == meanMin)
+    metrics["best"] = [t["trial_id"] for t in trials if t[dataName+"_mean"] == meanMin and t[dataName+"_me"] == meMin]
+    meanMax = max(means)
+    meMax = max(t[dataName+"_me"] for t in trials if t[dataName+"_mean"] == meanMax)
+    metrics["worst"] = [t["trial_id"] for t in trials if t[dataName+"_mean"] == meanMax and t[dataName+"_me"] == meMax]
+    metrics["mean_min"] = meanMin
+    metrics["mean_max"] = meanMax
+    
+    #Computations of the average trials: the ones with the closest means above and below the average of the means
+    meanAverage = sum(means)/float(len(means))
+    averageTrialsUpperMean = min(m for m in means if m >= meanAverage)
+    averageTrialsLowerMean = max(m for m in means if m <= meanAverage)
+    metrics["average"] = [t["trial_id"] for t in trials if t[dataName+"_mean"] == averageTrialsUpperMean or t[dataName+"_mean"] == averageTrialsLowerMean]
+    return metrics
+
 #Perform Levene's test for homogeneity of variances, given Spark Context, Cassandra keyspace, the experiment table of the data, the raw data table,
 #experiment id, container name, host id and name of the data
+@analyserStageFunction("metrics")
 def computeLevene(sc, cassandraKeyspace, expTable, dataTable, experimentID, containerName, hostID, dataName):
     #Get list of trials
     trials = sc.cassandraTable(cassandraKeyspace, expTable) \
@@ -197,9 +2233,8 @@ def computeLevene(sc, cassandraKeyspace, expTable, dataTable, experimentID, cont
             sample = sc.cassandraTable(cassandraKeyspace, dataTable) \
                 .select(dataName) \
                 .where("trial_id=? AND experiment_id=? AND container_name=? AND host_id=?", trial, experimentID, containerName, hostID) \
-                .map(lambda a: a[dataName]) \
-                .collect()
-            samples.append(sample)
+                .map(lambda a: a[dataName])
+            samples.append(collectArray(sample))
         levResultMean = stats.levene(*samples, center='mean')
         levResultMedian = stats.levene(*samples, center='median')
         levResultTrimmed = stats.levene(*samples, center='trimmed')
@@ -211,6 +2246,7 @@ def computeLevene(sc, cassandraKeyspace, expTable, dataTable, experimentID, cont
                 "levene_mean_stat":None, "levene_median_stat":None, "levene_trimmed_stat":None}
  
 #Compute the mode, which can be either one value or more, using the RDD containing the data   
+@analyserStageFunction("mode")
 def computeMode(dataRDD):
     from pyspark_cassandra import CassandraSparkContext
     from pyspark_cassandra import RowFormat
@@ -235,6 +2271,7 @@ def computeMode(dataRDD):
     return (mode, highestCount)
 
 #Compute the minimum and maximum modes, given the data RDD and the name of the data
+@analyserStageFunction("mode")
 def computeModeMinMax(CassandraRDD, dataName):
     #If no data return None values
     if CassandraRDD.isEmpty():
@@ -260,6 +2297,7 @@ def computeModeMinMax(CassandraRDD, dataName):
 
 # The combined variance is calculated the same way as the fishmethod package from R computes it 
 # (see this thread for the formula: http://stackoverflow.com/questions/9222056/existing-function-to-combine-standard-deviations-in-r)
+@tracedFunction
 def computeCombinedVar(dataRDD, dataName, i=None):
     sumN = dataRDD.map(lambda x: x[dataName+"_num_data_points"]).sum()
     if sumN-1 == 0:
@@ -275,50 +2313,243 @@ def computeCombinedVar(dataRDD, dataName, i=None):
     combinedVar = (sumOfSquares - sumN * grandMean**2)/(sumN - 1)
     return combinedVar
 
-#Function previously used to cut N initial processes before analysis for processes.
-#NO LONGER BEING USED, LEFT HERE JUST IN CASE
-def cutNInitialProcesses(dataRDD, nToIgnore):
-    from pyspark_cassandra import CassandraSparkContext
-    from pyspark_cassandra import RowFormat
-    from pyspark import SparkConf
+#The combined variance of computeCombinedVar, given the rows of the trials already collected
+def computeTrialsCombinedVar(trials, dataName):
+    sumN = sum(t[dataName+"_num_data_points"] for t in trials)
+    if sumN-1 == 0:
+        return float("NaN")
+    sumOfSquares = sum((t[dataName+"_num_data_points"]-1)*t[dataName+"_variance"]+t[dataName+"_num_data_points"]*t[dataName+"_mean"]**2 for t in trials)
+    grandMean = sum(t[dataName+"_num_data_points"]*t[dataName+"_mean"] for t in trials)/float(sumN)
+    return (sumOfSquares - sumN * grandMean**2)/(sumN - 1)
+
+#Return a dictionary copy of a row (pyspark_cassandra rows or plain dictionaries)
+def rowToDict(row):
+    if hasattr(row, "asDict"):
+        return row.asDict()
+    return dict(row)
+
+#Key ordering the process instances: their start time and source process instance id
+def processInstanceKey(r):
+    return (r["start_time"], r["source_process_instance_id"])
+
+#Return the keys (see processInstanceKey) of the first nToIgnore instances of each process definition (of each trial if trialField
+#is given), as a list of ((trial, process definition), keys) pairs. The keyed partial top-N is computed per partition and then
+#merged per process definition, so only these instances reach the driver
+def getFirstProcessInstances(dataRDD, nToIgnore, processField="process_definition_id", trialField=None):
+    import heapq
     
-    if dataRDD.isEmpty():
-        return []
+    def partitionFirstInstances(rows):
+        instances = {}
+        for r in rows:
+            if r["start_time"] is None:
+                continue
+            instances.setdefault((r[trialField] if trialField is not None else None, r[processField]), []).append(processInstanceKey(r))
+        for p, keys in instances.items():
+            yield (p, heapq.nsmallest(nToIgnore, keys))
     
-    processes = dataRDD.map(lambda r: r["process_definition_id"]) \
-            .distinct() \
+    return dataRDD.mapPartitions(partitionFirstInstances) \
+            .reduceByKey(lambda a, b: heapq.nsmallest(nToIgnore, a + b)) \
             .collect()
+
+#Mark as to_ignore the warm-up processes, that are all the processes started up to the moment in which every process definition
+#completed its first nToIgnore instances. Only the nToIgnore earliest instances of each process definition reach the driver,
+#the marking itself is a single pass over the data. Processes are ordered by start time and source process instance id.
+#If trialField is given the warm-up is computed separately for each trial of the RDD
+@tracedFunction
+def markNInitialProcesses(dataRDD, nToIgnore, processField="process_definition_id", trialField=None):
+    if nToIgnore is None or nToIgnore < 1:
+        return dataRDD
     
-    maxTime = None
-    maxID = None
-    for p in processes:
-        time = dataRDD.filter(lambda r: r["process_definition_id"] == p) \
-            .map(lambda r: (r["start_time"], r["source_process_instance_id"])) \
-            .sortByKey(1, 1) \
-            .take(nToIgnore)
-        if len(time) < nToIgnore:
-            continue
-        else:
-            time = time[-1]
-        if maxTime is None or time[0] > maxTime:
-            maxTime = time[0]
-            defId = dataRDD.filter(lambda r: r["process_definition_id"] == p and r["start_time"] == maxTime) \
-                .map(lambda r: (r["source_process_instance_id"], 0)) \
-                .sortByKey(1, 1) \
-                .first()
-            maxID = defId[0]
-    
-    data = dataRDD.map(lambda r: (r["start_time"], r)) \
-            .sortByKey(1, 1) \
-            .map(lambda r: r[1]) \
+    def trialOf(r):
+        return r[trialField] if trialField is not None else None
+    
+    #The warm-up ends with the latest among the nToIgnore-th instances, definitions with less instances are not considered
+    cutKeys = {}
+    for (trial, p), keys in getFirstProcessInstances(dataRDD, nToIgnore, processField, trialField):
+        if len(keys) == nToIgnore:
+            cutKeys[trial] = max(cutKeys.get(trial, keys[-1]), keys[-1])
+    if len(cutKeys) == 0:
+        return dataRDD
+    
+    def markRow(r):
+        row = rowToDict(r)
+        toIgnore = row.get("to_ignore") is True
+        cutKey = cutKeys.get(trialOf(r))
+        if r["start_time"] is not None and cutKey is not None and processInstanceKey(r) <= cutKey:
+            toIgnore = True
+        row["to_ignore"] = toIgnore
+        return row
+    
+    return dataRDD.map(markRow)
+
+#Cut the N initial processes, returning the RDD of the remaining processes ordered by start time. As in the original
+#implementation, the cut ends with the nToIgnore-th instance of the first process definition (in start time order) reaching
+#the latest nToIgnore-th start time, and only the processes before it and that instance itself are cut. The analysers mark
+#the warm-up with markNInitialProcesses instead, which keeps the processes
+def cutNInitialProcesses(dataRDD, nToIgnore, processField="process_definition_id"):
+    cutKey = None
+    for p, keys in getFirstProcessInstances(dataRDD, nToIgnore, processField):
+        if len(keys) == nToIgnore and (cutKey is None or keys[-1][0] > cutKey[0] or (keys[-1][0] == cutKey[0] and keys[-1] < cutKey)):
+            cutKey = keys[-1]
+    
+    remainingRDD = dataRDD
+    if cutKey is not None:
+        #Duplicates of the instance ending the warm-up are kept
+        duplicatesRDD = dataRDD.filter(lambda r: r["start_time"] is not None and processInstanceKey(r) == cutKey) \
+                .zipWithIndex() \
+                .filter(lambda x: x[1] > 0) \
+                .keys()
+        remainingRDD = dataRDD.filter(lambda r: r["start_time"] is None or processInstanceKey(r) > cutKey) \
+                .union(duplicatesRDD)
+    return remainingRDD.map(rowToDict) \
+            .sortBy(processInstanceKey)
+
+#Parse the read_time of the environment data (RFC 3339, eg. 2016-03-18T13:01:05.517955063+01:00) to seconds since epoch
+def parseReadTime(readTime):
+    import calendar
+    from datetime import datetime
+    
+    if readTime is None:
+        return None
+    
+    t = readTime.strip().replace(" ", "T")
+    offset = 0
+    if t[-1] in "Zz":
+        t = t[:-1]
+    elif len(t) > 6 and t[-6] in "+-" and t[-3] == ":":
+        sign = 1 if t[-6] == "+" else -1
+        offset = sign * (int(t[-5:-3])*3600 + int(t[-2:])*60)
+        t = t[:-6]
+    
+    #The fraction of seconds can have up to nanoseconds, which strptime does not handle
+    fraction = 0.0
+    if "." in t:
+        t, digits = t.split(".")
+        fraction = float("0." + digits)
+    
+    parsed = datetime.strptime(t, "%Y-%m-%dT%H:%M:%S")
+    return calendar.timegm(parsed.timetuple()) + fraction - offset
+
+#Compute the truncation point of the initial transient of a time series with MSER (MSER-5 with the default batch size).
+#Returns the number of initial data points to discard. Uses suffix sums of the batch means, so it runs in O(n)
+def computeMSER(data, batchSize=5):
+    values = np.asarray(data, dtype=np.float64)
+    nOfBatches = len(values) // batchSize
+    if nOfBatches < 2:
+        return 0
+    
+    batches = values[:nOfBatches*batchSize].reshape(nOfBatches, batchSize).mean(axis=1)
+    
+    #Sum and sum of squares of the batch means from every batch d up to the end
+    suffixSum = np.cumsum(batches[::-1])[::-1]
+    suffixSquares = np.cumsum((batches**2)[::-1])[::-1]
+    remaining = np.arange(nOfBatches, 0, -1, dtype=np.float64)
+    
+    squaredErrors = suffixSquares - suffixSum**2/remaining
+    mser = squaredErrors/remaining**2
+    
+    #The truncation point is searched only in the first half of the series
+    truncation = int(np.argmin(mser[:nOfBatches//2 + 1]))
+    return truncation * batchSize
+
+#Detect the steady state window of a time series ordered by time, cutting both the warm-up (MSER on the series) and
+#the cool-down (MSER on the reversed remainder). The warm-up is then searched again without the cool-down, which
+#otherwise inflates the variance of the tail. Returns the start index and the end index (excluded) of the window
+def detectSteadyState(data, batchSize=5):
+    data = list(data)
+    start = computeMSER(data, batchSize)
+    remainder = data[start:]
+    remainder.reverse()
+    end = len(data) - computeMSER(remainder, batchSize)
+    start = computeMSER(data[:end], batchSize)
+    return (start, end)
+
+#Sort the time series in an RDD of (key, (read_time, value)) pairs by read time. Each series is moved to a single partition
+#and sorted there, so no global sort is needed. Returns an RDD of (key, (times, values)), with the times in seconds since epoch
+def sortTimeSeries(seriesRDD, numPartitions=None):
+    import itertools
+    
+    if numPartitions is None:
+        numPartitions = seriesRDD.getNumPartitions()
+    
+    def sortPartition(points):
+        points = sorted(((p[0], parseReadTime(p[1][0]), p[1][1]) for p in points), key=lambda p: (p[0], p[1]))
+        for key, series in itertools.groupby(points, key=lambda p: p[0]):
+            series = list(series)
+            yield (key, (np.array([p[1] for p in series], dtype=np.float64), [p[2] for p in series]))
+    
+    return seriesRDD.partitionBy(numPartitions) \
+            .mapPartitions(sortPartition)
+
+#Collect a single time series sorted by time, given the RDD of its rows and the time and value fields. Every partition is
+#sorted on the executors and the sorted runs are merged on the driver. Returns the times in seconds since epoch and the values
+@tracedFunction
+def collectTimeSeries(dataRDD, timeField, valueField):
+    import heapq
+    
+    def sortPartition(rows):
+        yield sorted((parseReadTime(r[timeField]), r[valueField]) for r in rows)
+    
+    runs = dataRDD.filter(lambda r: r[timeField] is not None) \
+            .mapPartitions(sortPartition) \
             .collect()
+    series = list(heapq.merge(*runs))
     
-    index = -1
-    if maxID is not None:
-        for i in range(len(data)):
-            if data[i]["source_process_instance_id"] == maxID:
-                index = i
-                break
+    times = np.array([p[0] for p in series], dtype=np.float64)
+    values = [p[1] for p in series]
+    return (times, values)
+
+#Detect the steady state windows of the time series in an RDD of (key, (read_time, value)) pairs. Each series is sorted by
+#read time and analysed on the executors, with MSER batches of batchSize points (steady_state_batch_size of the configuration
+#if None). Returns a dictionary with the window of each key, with times in seconds since epoch and the batch size used
+def detectSteadyStateWindows(seriesRDD, batchSize=None):
+    batchSize = batchSize or analyserConfiguration["steady_state_batch_size"]
+    
+    def steadyStateWindow(series):
+        times, values = series
+        start, end = detectSteadyState(values, batchSize)
+        if start >= end:
+            return None
+        return {"start_time":times[start].item(), "end_time":times[end-1].item(), "warm_up_points":start, \
+                "cool_down_points":len(values)-end, "num_data_points":len(values), "batch_size":batchSize}
+    
+    return sortTimeSeries(seriesRDD) \
+            .mapValues(steadyStateWindow) \
+            .filter(lambda x: x[1] is not None) \
+            .collectAsMap()
+
+#Retrieve the stored steady state window of a metric of a container, None if it was not detected yet
+@tracedFunction
+def getSteadyStateWindow(sc, cassandraKeyspace, experimentID, trialID, containerID, hostID, metric):
+    windowRDD = sc.cassandraTable(cassandraKeyspace, "trial_steady_state") \
+            .select("start_time", "end_time", "warm_up_points", "cool_down_points", "num_data_points", "batch_size") \
+            .where("trial_id=? AND experiment_id=? AND container_id=? AND host_id=? AND metric=?", trialID, experimentID, containerID, hostID, metric)
+    if windowRDD.isEmpty():
+        return None
+    return rowToDict(windowRDD.first())
+
+#Restrict the rows (containing read_time and the metric) of the time series of a container to its steady state window.
+#The window stored in trial_steady_state is reused if it was detected with the configured steady_state_batch_size on the same
+#number of data points, otherwise it is detected (again) and stored
+@tracedFunction
+def filterSteadyState(sc, cassandraKeyspace, dataRDD, experimentID, trialID, containerID, hostID, metric):
+    batchSize = analyserConfiguration["steady_state_batch_size"]
+    seriesRDD = dataRDD.filter(lambda r: r[metric] is not None and r["read_time"] is not None)
+    window = getSteadyStateWindow(sc, cassandraKeyspace, experimentID, trialID, containerID, hostID, metric)
+    if window is not None and (window["batch_size"] != batchSize or window["num_data_points"] != seriesRDD.count()):
+        print "Detecting again the steady state of " + metric + " of " + containerID + ", its data points or batch size changed"
+        window = None
+    
+    if window is None:
+        windows = detectSteadyStateWindows(seriesRDD.map(lambda r: (metric, (r["read_time"], r[metric]))), batchSize)
+        if metric not in windows:
+            return dataRDD
+        window = windows[metric]
+        window.update({"experiment_id":experimentID, "trial_id":trialID, "container_id":containerID, "host_id":hostID, "metric":metric})
+        writer = ResultsWriter(sc, cassandraKeyspace)
+        writer.add("trial_steady_state", [window])
+        writer.wait()
     
-    data = data[index+1:]
-    return data
\ No newline at end of file
+    startTime = window["start_time"]
+    endTime = window["end_time"]
+    return dataRDD.filter(lambda r: r["read_time"] is not None and startTime <= parseReadTime(r["read_time"]) <= endTime)
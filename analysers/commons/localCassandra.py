@@ -0,0 +1,400 @@
+import re
+import sys
+import json
+import uuid
+import pickle
+import sqlite3
+import datetime
+
+#In-process stand-in of Cassandra for offline runs and benchmarks, storing the tables in a SQLite file. It implements the subset
+#of CQL used by the analysers: the schema of CREATE TABLE statements, upserts and selections restricted by the partition key and
+#the clustering keys (=, <, <=, >, >= and IN) returned in clustering order. The collections are stored pickled and cannot be
+#restricted. The Spark side (cassandraTable, joinWithCassandraTable and saveToCassandra) is in commons (useLocalCassandra).
+#SQLite stores NaN as NULL, so the NaN values of the float columns are stored as the text nanText (the infinities are stored
+#as they are)
+
+epoch = datetime.datetime(1970, 1, 1)
+integerTypes = ["int", "bigint", "varint", "counter", "smallint", "tinyint"]
+floatTypes = ["double", "float", "decimal"]
+nanText = "NaN"
+
+#Row returned by the selections, accessible by column name as the rows of pyspark_cassandra
+class LocalRow(dict):
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def asDict(self):
+        return dict(self)
+
+def parseTimestamp(value):
+    if isinstance(value, datetime.datetime):
+        return value
+    if isinstance(value, (int, long, float)):
+        return epoch + datetime.timedelta(milliseconds=value)
+    match = re.match(r"^(\d{4}-\d{2}-\d{2})[ T](\d{2}:\d{2}(?::\d{2})?)(\.\d+)?(?:([+-])(\d{2}):?(\d{2})|Z)?$", value.strip())
+    if match is None:
+        raise ValueError("Invalid timestamp " + value)
+    date, time, fraction, sign, hours, minutes = match.groups()
+    result = datetime.datetime.strptime(date + " " + (time if time.count(":") == 2 else time + ":00"), "%Y-%m-%d %H:%M:%S")
+    if fraction is not None:
+        result += datetime.timedelta(seconds=float(fraction))
+    if sign is not None:
+        offset = datetime.timedelta(hours=int(hours), minutes=int(minutes))
+        result = result - offset if sign == "+" else result + offset
+    return result
+
+def isCollection(cqlType):
+    return "<" in cqlType
+
+#Convert a value of a CQL type to the value stored in SQLite
+def encodeValue(cqlType, value):
+    if value is None:
+        return None
+    if isCollection(cqlType):
+        return sqlite3.Binary(pickle.dumps(value, 2))
+    if cqlType == "timestamp":
+        return (parseTimestamp(value) - epoch).total_seconds()
+    if cqlType in ["uuid", "timeuuid"]:
+        return str(value)
+    if cqlType == "boolean":
+        return 1 if value else 0
+    if cqlType == "blob":
+        return sqlite3.Binary(str(value))
+    if cqlType in floatTypes and value != value:
+        return nanText
+    return value
+
+#Convert a value stored in SQLite to the value of its CQL type
+def decodeValue(cqlType, value):
+    if value is None:
+        return None
+    if isCollection(cqlType):
+        return pickle.loads(str(value))
+    if cqlType == "timestamp":
+        return epoch + datetime.timedelta(seconds=value)
+    if cqlType in ["uuid", "timeuuid"]:
+        return uuid.UUID(value)
+    if cqlType == "boolean":
+        return value == 1
+    if cqlType == "blob":
+        return bytearray(value)
+    if cqlType in floatTypes and value == nanText:
+        return float("nan")
+    return value
+
+def sqliteType(cqlType):
+    if isCollection(cqlType) or cqlType == "blob":
+        return "BLOB"
+    if cqlType in integerTypes or cqlType == "boolean":
+        return "INTEGER"
+    if cqlType in floatTypes or cqlType == "timestamp":
+        return "REAL"
+    return "TEXT"
+
+def quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+#Split a CQL script in statements, without the comments
+def splitStatements(script):
+    statements = []
+    statement = []
+    inString = False
+    i = 0
+    while i < len(script):
+        c = script[i]
+        if inString:
+            statement.append(c)
+            if c == "'":
+                inString = False
+        elif c == "'":
+            statement.append(c)
+            inString = True
+        elif script.startswith("--", i) or script.startswith("//", i):
+            end = script.find("\n", i)
+            i = len(script) if end == -1 else end
+            continue
+        elif c == ";":
+            statements.append("".join(statement).strip())
+            statement = []
+        else:
+            statement.append(c)
+        i += 1
+    if "".join(statement).strip() != "":
+        statements.append("".join(statement).strip())
+    return [s for s in statements if s != ""]
+
+#Parse the CQL literals of the VALUES of an INSERT statement
+def parseLiterals(text):
+    tokens = re.findall(r"'(?:[^']|'')*'|[\[\]{}(),:]|[^\s\[\]{}(),:']+", text)
+    position = [0]
+
+    def parseValue():
+        token = tokens[position[0]]
+        position[0] += 1
+        if token.startswith("'"):
+            return token[1:-1].replace("''", "'")
+        if token in ["[", "{", "("]:
+            closing = {"[":"]", "{":"}", "(":")"}[token]
+            items = []
+            isMap = False
+            while tokens[position[0]] != closing:
+                key = parseValue()
+                if tokens[position[0]] == ":":
+                    position[0] += 1
+                    items.append((key, parseValue()))
+                    isMap = True
+                else:
+                    items.append(key)
+                if tokens[position[0]] == ",":
+                    position[0] += 1
+            position[0] += 1
+            if isMap:
+                return dict(items)
+            return set(items) if token == "{" else items
+        if token.lower() in ["true", "false"]:
+            return token.lower() == "true"
+        if token.lower() == "null":
+            return None
+        if re.match(r"^-?\d+$", token):
+            return int(token)
+        if re.match(r"^-?(\d+\.?\d*|\.\d+)([eE][-+]?\d+)?$", token) or token in ["NaN", "Infinity", "-Infinity"]:
+            return float(token)
+        return token
+
+    return parseValue()
+
+#Parse the restrictions of a CQL where clause ("a=? AND b IN (?,?)") in a list of (column, operator, number of parameters)
+def parseWhere(clause):
+    conditions = []
+    for condition in re.split(r"\s+AND\s+", clause.strip(), flags=re.IGNORECASE):
+        match = re.match(r"^(\w+)\s+IN\s*\(([?,\s]*)\)$", condition.strip(), re.IGNORECASE)
+        if match is not None:
+            conditions.append((match.group(1), "IN", match.group(2).count("?")))
+            continue
+        match = re.match(r"^(\w+)\s*(<=|>=|=|<|>)\s*\?$", condition.strip())
+        if match is None:
+            raise ValueError("Unsupported restriction " + condition)
+        conditions.append((match.group(1), match.group(2), 1))
+    return conditions
+
+class LocalCassandra(object):
+    def __init__(self, path):
+        self.path = path
+        self.connection = sqlite3.connect(path, timeout=60)
+        self.connection.execute("CREATE TABLE IF NOT EXISTS local_cassandra_tables (keyspace TEXT, name TEXT, definition TEXT, PRIMARY KEY (keyspace, name))")
+        self.connection.commit()
+        self.keyspace = None
+        self.tables = {}
+
+    def close(self):
+        self.connection.close()
+
+    #Return the definition of a table: the columns with their type, the partition and clustering keys and the clustering order
+    def getTable(self, keyspace, table):
+        if (keyspace, table) not in self.tables:
+            row = self.connection.execute("SELECT definition FROM local_cassandra_tables WHERE keyspace=? AND name=?", (keyspace, table)).fetchone()
+            if row is None:
+                raise KeyError("Unknown table %s.%s" % (keyspace, table))
+            self.tables[(keyspace, table)] = json.loads(row[0])
+        return self.tables[(keyspace, table)]
+
+    def tableName(self, keyspace, table):
+        return quote(keyspace + "." + table)
+
+    def createTable(self, keyspace, table, columns, partitionKey, clusteringKey=[], descending=[]):
+        definition = {"columns":dict(columns), "partition_key":list(partitionKey), "clustering_key":list(clusteringKey), "descending":list(descending)}
+        key = ", ".join(quote(c) for c in list(partitionKey) + list(clusteringKey))
+        self.connection.execute("CREATE TABLE IF NOT EXISTS %s (%s, PRIMARY KEY (%s))" % \
+                (self.tableName(keyspace, table), ", ".join("%s %s" % (quote(c), sqliteType(t)) for c, t in columns), key))
+        self.connection.execute("INSERT OR REPLACE INTO local_cassandra_tables VALUES (?, ?, ?)", (keyspace, table, json.dumps(definition)))
+        self.connection.commit()
+        self.tables[(keyspace, table)] = definition
+
+    def dropKeyspace(self, keyspace):
+        for (table,) in self.connection.execute("SELECT name FROM local_cassandra_tables WHERE keyspace=?", (keyspace,)).fetchall():
+            self.connection.execute("DROP TABLE IF EXISTS %s" % self.tableName(keyspace, table))
+            self.tables.pop((keyspace, table), None)
+        self.connection.execute("DELETE FROM local_cassandra_tables WHERE keyspace=?", (keyspace,))
+        self.connection.commit()
+
+    #Delete the rows of the table selected by each of the keys (dictionaries from the columns of the partition key, and of a
+    #prefix of the clustering key, to their values), as the DELETE of Cassandra restricted by them
+    def delete(self, keyspace, table, keys):
+        definition = self.getTable(keyspace, table)
+        deleted = 0
+        for key in keys:
+            columns = sorted(key.keys())
+            whereSQL, values = self.whereSQL(definition, " AND ".join(c + "=?" for c in columns), [key[c] for c in columns])
+            deleted += self.connection.execute("DELETE FROM %s%s" % (self.tableName(keyspace, table), whereSQL), values).rowcount
+        self.connection.commit()
+        return deleted
+
+    #Upsert the rows (dictionaries) in the table: as in Cassandra, the columns missing in a row keep their value. The rows can
+    #be any iterable (eg. a generator of synthetic data), they are written in chunks
+    def insert(self, keyspace, table, rows, chunkSize=10000):
+        definition = self.getTable(keyspace, table)
+        key = definition["partition_key"] + definition["clustering_key"]
+        tableName = self.tableName(keyspace, table)
+        inserted = 0
+
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= chunkSize:
+                inserted += self.insertChunk(tableName, definition, key, chunk)
+                chunk = []
+        inserted += self.insertChunk(tableName, definition, key, chunk)
+        self.connection.commit()
+        return inserted
+
+    def insertChunk(self, tableName, definition, key, rows):
+        groups = {}
+        for row in rows:
+            columns = tuple(sorted(c for c in row.keys() if c in definition["columns"]))
+            groups.setdefault(columns, []).append(tuple(encodeValue(definition["columns"][c], row.get(c)) for c in key) + \
+                                                   tuple(encodeValue(definition["columns"][c], row[c]) for c in columns if c not in key))
+        for columns, values in groups.items():
+            others = [c for c in columns if c not in key]
+            self.connection.executemany("INSERT OR IGNORE INTO %s (%s) VALUES (%s)" % (tableName, ", ".join(quote(c) for c in key), \
+                    ", ".join(["?"] * len(key))), [v[:len(key)] for v in values])
+            if len(others) > 0:
+                self.connection.executemany("UPDATE %s SET %s WHERE %s" % (tableName, ", ".join(quote(c) + "=?" for c in others), \
+                        " AND ".join(quote(c) + "=?" for c in key)), [v[len(key):] + v[:len(key)] for v in values])
+        return len(rows)
+
+    def whereSQL(self, definition, where, params):
+        if where is None:
+            return ("", [])
+        conditions = []
+        values = []
+        params = list(params)
+        for column, operator, n in parseWhere(where):
+            if column not in definition["columns"]:
+                raise KeyError("Unknown column " + column)
+            columnValues = [encodeValue(definition["columns"][column], v) for v in params[:n]]
+            params = params[n:]
+            if operator == "IN":
+                conditions.append("%s IN (%s)" % (quote(column), ", ".join(["?"] * n)))
+            else:
+                conditions.append("%s %s ?" % (quote(column), operator))
+            values += columnValues
+        return (" WHERE " + " AND ".join(conditions), values)
+
+    #Return the partition keys of the table with rows selected by the where clause
+    def partitionKeys(self, keyspace, table, where=None, params=()):
+        definition = self.getTable(keyspace, table)
+        whereSQL, values = self.whereSQL(definition, where, params)
+        partitionKey = definition["partition_key"]
+        rows = self.connection.execute("SELECT DISTINCT %s FROM %s%s" % (", ".join(quote(c) for c in partitionKey), \
+                self.tableName(keyspace, table), whereSQL), values).fetchall()
+        return [tuple(decodeValue(definition["columns"][c], v) for c, v in zip(partitionKey, r)) for r in rows]
+
+    #Select the columns (all if None) of the rows of the table restricted by the where clause (and to a partition if the
+    #partitionKey values are given), in partition and clustering order
+    def select(self, keyspace, table, columns=None, where=None, params=(), partitionKey=None):
+        definition = self.getTable(keyspace, table)
+        columns = list(columns) if columns is not None else sorted(definition["columns"].keys())
+        whereSQL, values = self.whereSQL(definition, where, params)
+        if partitionKey is not None:
+            keyWhere = " AND ".join(quote(c) + "=?" for c in definition["partition_key"])
+            whereSQL = whereSQL + " AND " + keyWhere if whereSQL != "" else " WHERE " + keyWhere
+            values = values + [encodeValue(definition["columns"][c], v) for c, v in zip(definition["partition_key"], partitionKey)]
+        order = [quote(c) for c in definition["partition_key"]] + \
+                [quote(c) + (" DESC" if c in definition["descending"] else "") for c in definition["clustering_key"]]
+        cursor = self.connection.execute("SELECT %s FROM %s%s ORDER BY %s" % (", ".join(quote(c) for c in columns), \
+                self.tableName(keyspace, table), whereSQL, ", ".join(order)), values)
+        types = [definition["columns"][c] for c in columns]
+        for row in cursor:
+            yield LocalRow((c, decodeValue(t, v)) for c, t, v in zip(columns, types, row))
+
+    def createTableStatement(self, statement):
+        match = re.match(r"^CREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?(?:(\w+)\.)?(\w+)\s*\(", statement, re.IGNORECASE)
+        keyspace = match.group(1) or self.keyspace
+
+        #Split the definitions of the columns and of the key, up to the parenthesis closing them
+        parts = []
+        depth = 0
+        part = ""
+        for i in range(match.end(), len(statement)):
+            c = statement[i]
+            if c in "(<":
+                depth += 1
+            elif c in ")>":
+                depth -= 1
+            if depth < 0:
+                break
+            if c == "," and depth == 0:
+                parts.append(part.strip())
+                part = ""
+            else:
+                part += c
+        parts.append(part.strip())
+        options = statement[i + 1:]
+
+        columns = []
+        partitionKey = []
+        clusteringKey = []
+        for part in parts:
+            keyMatch = re.match(r"^PRIMARY\s+KEY\s*\((.*)\)$", part, re.IGNORECASE | re.DOTALL)
+            if keyMatch is not None:
+                key = keyMatch.group(1).strip()
+                if key.startswith("("):
+                    partitionKey = [c.strip() for c in key[1:key.index(")")].split(",")]
+                    clusteringKey = [c.strip() for c in key[key.index(")") + 1:].split(",") if c.strip() != ""]
+                else:
+                    names = [c.strip() for c in key.split(",")]
+                    partitionKey = names[:1]
+                    clusteringKey = names[1:]
+                continue
+            name, cqlType = part.split(None, 1)
+            cqlType = re.sub(r"\s+", "", cqlType)
+            if cqlType.upper().endswith("PRIMARYKEY"):
+                cqlType = cqlType[:-len("PRIMARYKEY")]
+                partitionKey = [name]
+            columns.append((name, cqlType.lower()))
+
+        descending = []
+        orderMatch = re.search(r"CLUSTERING\s+ORDER\s+BY\s*\(([^)]*)\)", options, re.IGNORECASE)
+        if orderMatch is not None:
+            descending = [o.split()[0] for o in orderMatch.group(1).split(",") if o.strip().upper().endswith("DESC")]
+        self.createTable(keyspace, match.group(2), columns, partitionKey, clusteringKey, descending)
+
+    def insertStatement(self, statement):
+        match = re.match(r"^INSERT\s+INTO\s+(?:(\w+)\.)?(\w+)\s*\(([^)]*)\)\s*VALUES\s*(\(.*\))$", statement, re.IGNORECASE | re.DOTALL)
+        keyspace = match.group(1) or self.keyspace
+        columns = [c.strip() for c in match.group(3).split(",")]
+        self.insert(keyspace, match.group(2), [dict(zip(columns, parseLiterals(match.group(4))))])
+
+    #Execute the statements of a CQL script (eg. test/data/benchflow.cql and loadMockData.cql): keyspaces, USE, tables and inserts
+    def executeScript(self, script):
+        for statement in splitStatements(script):
+            words = statement.split()
+            command = " ".join(words[:2]).upper()
+            if command == "CREATE TABLE":
+                self.createTableStatement(statement)
+            elif command == "INSERT INTO":
+                self.insertStatement(statement)
+            elif command == "CREATE KEYSPACE":
+                continue
+            elif command == "DROP KEYSPACE":
+                self.dropKeyspace(words[-1])
+            elif words[0].upper() == "USE":
+                self.keyspace = words[1]
+            else:
+                raise ValueError("Unsupported statement " + statement)
+
+    def executeFile(self, path):
+        with open(path) as f:
+            self.executeScript(f.read())
+
+#Load CQL scripts in a local Cassandra file: python localCassandra.py <database file> <cql file>...
+def main():
+    store = LocalCassandra(sys.argv[1])
+    for path in sys.argv[2:]:
+        store.executeFile(path)
+    store.close()
+
+if __name__ == '__main__': main()
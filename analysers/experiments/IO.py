@@ -13,41 +13,42 @@ import numpy as np
 
 from pyspark_cassandra import CassandraSparkContext
 from pyspark_cassandra import RowFormat
-from pyspark import SparkConf
 
 #Create the queries containg the results of the computations to pass to Cassandra
 def createQuery(op, dev, sc, cassandraKeyspace, srcTable, experimentID, containerName, hostID):
-    from commons import computeMode, computeMetrics
+    from commons import computeMode, computeMetrics, collectArray, cacheDataset, CacheScope
     
-    #Retrieve data for the computations
-    dataRDD = sc.cassandraTable(cassandraKeyspace, srcTable) \
-            .select("device", op) \
-            .where("experiment_id=? AND container_name=? AND host_id=?", experimentID, containerName, hostID) \
-            .filter(lambda a: a["device"] == dev and a[op] is not None) \
-            .map(lambda a: (a[op], 1)) \
-            .cache()
-    
-    #If no data return no values
-    if len(dataRDD.collect()) == 0:
-        return {"experiment_id":experimentID, "container_name":containerName, "host_id":hostID, "device":dev}
+    with CacheScope():
+        #Retrieve data for the computations
+        dataRDD = sc.cassandraTable(cassandraKeyspace, srcTable) \
+                .select("device", op) \
+                .where("experiment_id=? AND container_name=? AND host_id=?", experimentID, containerName, hostID) \
+                .filter(lambda a: a["device"] == dev and a[op] is not None) \
+                .map(lambda a: (a[op], 1))
+        cacheDataset(dataRDD)
         
-    mode = computeMode(dataRDD)
-    
-    data = dataRDD.map(lambda x: x[0]) \
-            .collect()
-     
-    metrics = computeMetrics(data)
+        #If no data return no values
+        if dataRDD.isEmpty():
+            return {"experiment_id":experimentID, "container_name":containerName, "host_id":hostID, "device":dev}
+            
+        mode = computeMode(dataRDD)
+        
+        data = collectArray(dataRDD.map(lambda x: x[0]))
+         
+        metrics = computeMetrics(data)
 
-    query = {"experiment_id":experimentID, "container_name":containerName, "host_id":hostID, "device":dev, op+"_mode":mode[0], \
-              op+"_mode_freq":mode[1], op+"_mean":metrics["mean"], \
-              op+"_min":metrics["min"], op+"_max":metrics["max"], op+"_sd":metrics["sd"], op+"_variance":metrics["variance"], \
-              op+"_q1":metrics["q1"], op+"_q2":metrics["q2"], op+"_q3":metrics["q3"], op+"_p95":metrics["p95"], \
-              op+"_p90":metrics["p90"], op+"_p99":metrics["p99"], op+"_percentiles":metrics["percentiles"], \
-              op+"_me":metrics["me"], op+"_ci095_min":metrics["ci095_min"], op+"_ci095_max":metrics["ci095_max"]}
-    
-    return query
+        query = {"experiment_id":experimentID, "container_name":containerName, "host_id":hostID, "device":dev, op+"_mode":mode[0], \
+                  op+"_mode_freq":mode[1], op+"_mean":metrics["mean"], \
+                  op+"_min":metrics["min"], op+"_max":metrics["max"], op+"_sd":metrics["sd"], op+"_variance":metrics["variance"], \
+                  op+"_q1":metrics["q1"], op+"_q2":metrics["q2"], op+"_q3":metrics["q3"], op+"_p95":metrics["p95"], \
+                  op+"_p90":metrics["p90"], op+"_p99":metrics["p99"], op+"_percentiles":metrics["percentiles"], \
+                  op+"_me":metrics["me"], op+"_ci095_min":metrics["ci095_min"], op+"_ci095_max":metrics["ci095_max"]}
+        
+        return query
 
 def main():        
+    from commons import getSparkContext, ResultsWriter, startAnalyserRun, getAnalyserConfiguration, getSparkConf
+    
     # Takes arguments
     args = json.loads(sys.argv[1])
     experimentID = str(args["experiment_id"])
@@ -55,10 +56,12 @@ def main():
     containerName = str(args["container_name"])
     hostID = str(args["host_id"])
     cassandraKeyspace = str(args["cassandra_keyspace"])
+    getAnalyserConfiguration(args.get("analyser_config_file"), __file__)
     
     # Set configuration for spark context
-    conf = SparkConf().setAppName("IO analyser")
-    sc = CassandraSparkContext(conf=conf)
+    conf = getSparkConf("IO analyser")
+    sc = getSparkContext(conf)
+    run = startAnalyserRun(sc, cassandraKeyspace, __file__, experimentID, args=args)
 
     #Source and destination tables
     srcTable = "trial_io"
@@ -86,7 +89,10 @@ def main():
         queries.append(query)
     
     #Save to Cassandra
-    sc.parallelize(queries).saveToCassandra(cassandraKeyspace, destTable)
+    writer = ResultsWriter(sc, cassandraKeyspace)
+    writer.add(destTable, queries)
+    writer.wait()
+    run.finish()
     
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -4,7 +4,6 @@ import json
 from datetime import timedelta
 
 from pyspark_cassandra import CassandraSparkContext
-from pyspark import SparkConf
 
 #Create the queries containg the results of the computations to pass to Cassandra
 def createQuery(CassandraRDD, experimentID):
@@ -53,15 +52,19 @@ def createQuery(CassandraRDD, experimentID):
     return queries
 
 def main():
+    from commons import getSparkContext, ResultsWriter, startAnalyserRun, getAnalyserConfiguration, getSparkConf, cacheDataset
+    
     # Takes arguments
     args = json.loads(sys.argv[1])
     experimentID = str(args["experiment_id"])
     configFile = str(args["config_file"])
     cassandraKeyspace = str(args["cassandra_keyspace"])
+    getAnalyserConfiguration(args.get("analyser_config_file"), __file__)
     
     # Set configuration for spark context
-    conf = SparkConf().setAppName("Construct duration analyser")
-    sc = CassandraSparkContext(conf=conf)
+    conf = getSparkConf("Construct duration analyser")
+    sc = getSparkContext(conf)
+    run = startAnalyserRun(sc, cassandraKeyspace, __file__, experimentID, args=args)
 
     # Source and destination tables
     srcTable = "trial_construct_duration"
@@ -74,13 +77,16 @@ def main():
                 "construct_duration_p90", "construct_duration_p99", "construct_type", "construct_name", "construct_duration_variance", \
                 "construct_duration_me", "trial_id", "construct_duration_mode", "construct_duration_mode_freq") \
         .where("experiment_id=?", experimentID)
-    CassandraRDD.cache()
+    cacheDataset(CassandraRDD)
     
     #Create the queries for Cassandra
     query = createQuery(CassandraRDD, experimentID)
 
     #Save to Cassandra
-    sc.parallelize(query).saveToCassandra(cassandraKeyspace, destTable)
+    writer = ResultsWriter(sc, cassandraKeyspace)
+    writer.add(destTable, query)
+    writer.wait()
+    run.finish()
     
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -13,161 +13,158 @@ import numpy as np
 
 from pyspark_cassandra import CassandraSparkContext
 from pyspark_cassandra import RowFormat
-from pyspark import SparkConf
 
-#Function for sorting and retrieving the min and max values for the cpu usage of a given core i, given RDD of the data, the data field,
-#and the order (ascending or not ascending)
-def sortAndGetCore(CassandraRDD, field, asc, i):
-        if asc == 1:
-            v = CassandraRDD.map(lambda x: x[field][i]) \
-                .min()
-        else:
-            v = CassandraRDD.map(lambda x: x[field][i]) \
-                .max()
-        return v
+#Fields of the per core cpu usage whose min and max over the trials are computed, by name of the metric
+coreFields = {"min":"cpu_min", "max":"cpu_max", "q1":"cpu_q1", "q2":"cpu_q2", "q3":"cpu_q3", "p90":"cpu_p90", "p95":"cpu_p95", "p99":"cpu_p99"}
 
-#Compute experiment metrics for CPU core i
-def computeExperimentCoreMetrics(CassandraRDD, i):
+#Stack the per core values of a field of the trials in a (trials x cores) matrix, padding missing values with NaN
+def stackCores(trials, field, nOfCores):
+    matrix = np.full((len(trials), nOfCores), np.nan)
+    for t, trial in enumerate(trials):
+        values = trial.get(field)
+        if values is not None:
+            n = min(len(values), nOfCores)
+            matrix[t, :n] = values[:n]
+    return matrix
+
+#Convert the NaN values of a per core metric to None
+def nanToNone(values):
+    return [None if np.isnan(v) else float(v) for v in values]
+
+#Compute experiment metrics for all the nOfCores CPU cores at once, given the rows of the trials decoded by decodeResultRow.
+#Returns a dictionary with a list of values, one per core, for each metric. As with the min and max of the values in Python 2,
+#where None is smaller than any number, the minimums of a core are None if the value of some trial is missing and the maximums
+#skip the missing values. The weighted average of a core is None if the mean of some trial is missing
+def computeExperimentCoresMetrics(trials, nOfCores):
+    import warnings
+    
     #If no data return None values
-    if CassandraRDD.isEmpty():
-        return {"min":None, "max":None, "q1_min":None, \
-              "q1_max":None, "q2_min":None, "q2_max":None, \
-              "p90_max":None, "p90_min":None, \
-              "p95_max":None, "p95_min":None, \
-              "p99_max":None, "p99_min":None, \
-              "q3_min":None, "q3_max":None, "weighted_avg":None}
-    
-    dataMin = sortAndGetCore(CassandraRDD, "cpu_min", 1, i)
-    dataMax = sortAndGetCore(CassandraRDD, "cpu_max", 0, i)
-    q1Min = sortAndGetCore(CassandraRDD, "cpu_q1", 1, i)
-    q1Max = sortAndGetCore(CassandraRDD, "cpu_q1", 0, i)
-    q2Min = sortAndGetCore(CassandraRDD, "cpu_q2", 1, i)
-    q2Max = sortAndGetCore(CassandraRDD, "cpu_q2", 0, i)
-    q3Min = sortAndGetCore(CassandraRDD, "cpu_q3", 1, i)
-    q3Max = sortAndGetCore(CassandraRDD, "cpu_q3", 0, i)
-    p90Min = sortAndGetCore(CassandraRDD, "cpu_p90", 1, i)
-    p90Max = sortAndGetCore(CassandraRDD, "cpu_p90", 0, i)
-    p95Min = sortAndGetCore(CassandraRDD, "cpu_p95", 1, i)
-    p95Max = sortAndGetCore(CassandraRDD, "cpu_p95", 0, i)
-    p99Min = sortAndGetCore(CassandraRDD, "cpu_p99", 1, i)
-    p99Max = sortAndGetCore(CassandraRDD, "cpu_p99", 0, i)
-    
-    someMeanIsNull = CassandraRDD.map(lambda x: x["cpu_mean"][i] is None) \
-        .reduce(lambda a, b: a or b)
+    if len(trials) == 0:
+        metrics = {"weighted_avg":[None]*nOfCores, "combined_variance":[None]*nOfCores}
+        for name in coreFields:
+            metrics[name if name in ["min", "max"] else name + "_min"] = [None]*nOfCores
+            metrics[name if name in ["min", "max"] else name + "_max"] = [None]*nOfCores
+        return metrics
+    
+    with warnings.catch_warnings(), np.errstate(invalid="ignore", divide="ignore"):
+        #All NaN cores and NaN minimums are expected
+        warnings.simplefilter("ignore", RuntimeWarning)
+        
+        metrics = {}
+        for name, field in coreFields.items():
+            matrix = stackCores(trials, field, nOfCores)
+            if name != "max":
+                metrics[name if name == "min" else name + "_min"] = nanToNone(np.min(matrix, axis=0))
+            if name != "min":
+                metrics[name if name == "max" else name + "_max"] = nanToNone(np.nanmax(matrix, axis=0))
         
-    if someMeanIsNull:
-        weightedMean = None
-    else:
-        weightSum = CassandraRDD.map(lambda x: x["cpu_num_data_points"]) \
-            .reduce(lambda a, b: a+b)
-            
-        weightedSum = CassandraRDD.map(lambda x: x["cpu_mean"][i]*x["cpu_num_data_points"]) \
-            .reduce(lambda a, b: a+b)
+        #NaN means propagate, so the weighted average is None as soon as a mean is missing
+        weights = np.array([trial["cpu_num_data_points"] for trial in trials], dtype=np.float64)[:, np.newaxis]
+        means = stackCores(trials, "cpu_mean", nOfCores)
+        sumN = weights.sum()
+        metrics["weighted_avg"] = nanToNone((means*weights).sum(axis=0)/sumN)
         
-        weightedMean = weightedSum/float(weightSum)
+        #Combined variance of each core, NaN if there is a single data point (see computeCombinedVar)
+        if sumN-1 == 0:
+            metrics["combined_variance"] = [float("NaN")]*nOfCores
+        else:
+            variances = stackCores(trials, "cpu_variance", nOfCores)
+            sumOfSquares = ((weights-1)*variances + weights*means**2).sum(axis=0)
+            grandMean = (weights*means).sum(axis=0)/sumN
+            metrics["combined_variance"] = nanToNone((sumOfSquares - sumN*grandMean**2)/(sumN-1))
+    
+    return metrics
+
+#Compute experiment metrics for CPU core i, given the RDD of the rows of the trials
+def computeExperimentCoreMetrics(CassandraRDD, i):
+    from commons import decodeResultRow
     
-    return {"min":dataMin, "max":dataMax, "q1_min":q1Min, \
-              "q1_max":q1Max, "q2_min":q2Min, "q2_max":q2Max, \
-              "p90_max":p90Max, "p90_min":p90Min, \
-              "p95_max":p95Max, "p95_min":p95Min, \
-              "p99_max":p99Max, "p99_min":p99Min, \
-              "q3_min":q3Min, "q3_max":q3Max, "weighted_avg":weightedMean}
+    trials = CassandraRDD.map(decodeResultRow).collect()
+    metrics = computeExperimentCoresMetrics(trials, i+1)
+    return dict((name, values[i]) for name, values in metrics.items() if name != "combined_variance")
     
 #Create the queries containg the results of the computations to pass to Cassandra
 def createQuery(sc, cassandraKeyspace, srcTable, dataTable, experimentID, containerName, hostID):
-    from commons import computeExperimentMetrics, computeMetrics, computeLevene, computeCombinedVar
-    
-    #Retrieve the data for the computations
-    CassandraRDD = sc.cassandraTable(cassandraKeyspace, srcTable) \
-        .select("cpu_min", "cpu_max", "cpu_q1", "cpu_q2", "cpu_q3", "cpu_p90", "cpu_p95", "cpu_p99", "cpu_num_data_points", "cpu_mean", "cpu_variance", "cpu_me", "trial_id", "cpu_integral", "cpu_cores") \
-        .where("experiment_id=? AND container_name=? AND host_id=?", experimentID, containerName, hostID)
-    CassandraRDD.cache()
-    
-    #Get number of active cpu cores
-    CassandraRDDFirst = CassandraRDD.first()
-    
-    #Get number of total cpu cores
-    nOfActiveCores = CassandraRDDFirst["cpu_cores"]
-    
-    #Compute metrics
-    metrics = computeExperimentMetrics(CassandraRDD, "cpu")
-    
-    #Compute integral metrics
-    data = CassandraRDD.map(lambda x: x["cpu_integral"]).collect()
+    from commons import computeExperimentMetrics, computeMetrics, computeLevene, computeCombinedVar, collectArray, cacheDataset, CacheScope
+    
+    with CacheScope():
+        #Retrieve the data for the computations
+        CassandraRDD = sc.cassandraTable(cassandraKeyspace, srcTable) \
+            .select("cpu_min", "cpu_max", "cpu_q1", "cpu_q2", "cpu_q3", "cpu_p90", "cpu_p95", "cpu_p99", "cpu_num_data_points", "cpu_mean", "cpu_variance", "cpu_me", "trial_id", "cpu_integral", "cpu_cores") \
+            .where("experiment_id=? AND container_name=? AND host_id=?", experimentID, containerName, hostID)
+        cacheDataset(CassandraRDD)
+        
+        #Get number of active cpu cores
+        CassandraRDDFirst = CassandraRDD.first()
+        
+        #Get number of total cpu cores
+        nOfActiveCores = CassandraRDDFirst["cpu_cores"]
+        
+        #Compute metrics
+        metrics = computeExperimentMetrics(CassandraRDD, "cpu")
+        
+        #Compute integral metrics
+        data = collectArray(CassandraRDD.map(lambda x: x["cpu_integral"]))
 
-    integralMetrics = computeMetrics(data)
-    
-    #Compute Levene
-    levenePValue = computeLevene(sc, cassandraKeyspace, srcTable, dataTable, experimentID, containerName, hostID, "cpu_percent_usage")
-    
-    #Compute combined variance
-    combinedVar = computeCombinedVar(CassandraRDD, "cpu")
-    
-    #Construct query
-    return [{"experiment_id":experimentID, "container_name":containerName, "host_id":hostID, "cpu_cores":nOfActiveCores, \
-              "cpu_min":metrics["min"], "cpu_max":metrics["max"], "cpu_q1_min":metrics["q1_min"], \
-              "cpu_q1_max":metrics["q1_max"], "cpu_q2_min":metrics["q2_min"], "cpu_q2_max":metrics["q2_max"], \
-              "cpu_p90_max":metrics["p90_max"], "cpu_p90_min":metrics["p90_min"], \
-              "cpu_p95_max":metrics["p95_max"], "cpu_p95_min":metrics["p95_min"], \
-              "cpu_p99_max":metrics["p99_max"], "cpu_p99_min":metrics["p99_min"], \
-              "cpu_q3_min":metrics["q3_min"], "cpu_q3_max":metrics["q3_max"], "cpu_weighted_avg":metrics["weighted_avg"], \
-              "cpu_best": metrics["best"], "cpu_worst": metrics["worst"], "cpu_average": metrics["average"], \
-              "cpu_integral_min":integralMetrics["min"], "cpu_integral_max":integralMetrics["max"], "cpu_integral_sd":integralMetrics["sd"], \
-              "cpu_integral_q1":integralMetrics["q1"], "cpu_integral_q2":integralMetrics["q2"], "cpu_integral_q3":integralMetrics["q3"], \
-              "cpu_integral_p90":integralMetrics["p90"], "cpu_integral_p95":integralMetrics["p95"], "cpu_integral_p99":integralMetrics["p99"], \
-              "cpu_integral_me":integralMetrics["me"], "cpu_integral_mean":integralMetrics["mean"], \
-              "cpu_integral_ci095_min":integralMetrics["ci095_min"], "cpu_integral_ci095_max":integralMetrics["ci095_max"], \
-              "cpu_levene_test_mean":levenePValue["levene_mean"], "cpu_levene_test_median":levenePValue["levene_median"], "cpu_levene_test_trimmed":levenePValue["levene_trimmed"], \
-              "cpu_levene_test_mean_stat":levenePValue["levene_mean_stat"], "cpu_levene_test_median_stat":levenePValue["levene_median_stat"], "cpu_levene_test_trimmed_stat":levenePValue["levene_trimmed_stat"], \
-              "cpu_variation_coefficient": metrics["variation_coefficient"], "cpu_combined_variance": combinedVar}]
+        integralMetrics = computeMetrics(data)
+        
+        #Compute Levene
+        levenePValue = computeLevene(sc, cassandraKeyspace, srcTable, dataTable, experimentID, containerName, hostID, "cpu_percent_usage")
+        
+        #Compute combined variance
+        combinedVar = computeCombinedVar(CassandraRDD, "cpu")
+        
+        #Construct query
+        return [{"experiment_id":experimentID, "container_name":containerName, "host_id":hostID, "cpu_cores":nOfActiveCores, \
+                  "cpu_min":metrics["min"], "cpu_max":metrics["max"], "cpu_q1_min":metrics["q1_min"], \
+                  "cpu_q1_max":metrics["q1_max"], "cpu_q2_min":metrics["q2_min"], "cpu_q2_max":metrics["q2_max"], \
+                  "cpu_p90_max":metrics["p90_max"], "cpu_p90_min":metrics["p90_min"], \
+                  "cpu_p95_max":metrics["p95_max"], "cpu_p95_min":metrics["p95_min"], \
+                  "cpu_p99_max":metrics["p99_max"], "cpu_p99_min":metrics["p99_min"], \
+                  "cpu_q3_min":metrics["q3_min"], "cpu_q3_max":metrics["q3_max"], "cpu_weighted_avg":metrics["weighted_avg"], \
+                  "cpu_best": metrics["best"], "cpu_worst": metrics["worst"], "cpu_average": metrics["average"], \
+                  "cpu_integral_min":integralMetrics["min"], "cpu_integral_max":integralMetrics["max"], "cpu_integral_sd":integralMetrics["sd"], \
+                  "cpu_integral_q1":integralMetrics["q1"], "cpu_integral_q2":integralMetrics["q2"], "cpu_integral_q3":integralMetrics["q3"], \
+                  "cpu_integral_p90":integralMetrics["p90"], "cpu_integral_p95":integralMetrics["p95"], "cpu_integral_p99":integralMetrics["p99"], \
+                  "cpu_integral_me":integralMetrics["me"], "cpu_integral_mean":integralMetrics["mean"], \
+                  "cpu_integral_ci095_min":integralMetrics["ci095_min"], "cpu_integral_ci095_max":integralMetrics["ci095_max"], \
+                  "cpu_levene_test_mean":levenePValue["levene_mean"], "cpu_levene_test_median":levenePValue["levene_median"], "cpu_levene_test_trimmed":levenePValue["levene_trimmed"], \
+                  "cpu_levene_test_mean_stat":levenePValue["levene_mean_stat"], "cpu_levene_test_median_stat":levenePValue["levene_median_stat"], "cpu_levene_test_trimmed_stat":levenePValue["levene_trimmed_stat"], \
+                  "cpu_variation_coefficient": metrics["variation_coefficient"], "cpu_combined_variance": combinedVar}]
 
-#Create the queries containg the results of the computations to pass to Cassandra for the individual CPU cores 
+#Create the queries containg the results of the computations to pass to Cassandra for the individual CPU cores. The rows of
+#the trials are collected once, with their packed lists if any, and the metrics of all the cores are computed on the driver
 def createCoreQuery(sc, cassandraKeyspace, srcTable, experimentID, containerName, hostID):
-    from commons import getHostCores, computeCombinedVar
+    from commons import getHostCores, decodeResultRow
     
     #Retrieve data for the computations
-    CassandraRDD = sc.cassandraTable(cassandraKeyspace, srcTable) \
-        .select("cpu_min", "cpu_max", "cpu_q1", "cpu_q2", "cpu_q3", "cpu_p90", "cpu_p95", "cpu_p99", "cpu_num_data_points", "cpu_mean", "cpu_me", "trial_id", "cpu_cores", "cpu_variance") \
-        .where("experiment_id=? AND container_name=? AND host_id=?", experimentID, containerName, hostID)
-    CassandraRDD.cache()
+    listColumns = ["cpu_min", "cpu_max", "cpu_q1", "cpu_q2", "cpu_q3", "cpu_p90", "cpu_p95", "cpu_p99", "cpu_mean", "cpu_me", "cpu_variance"]
+    columns = listColumns + [column + "_packed" for column in listColumns] + ["cpu_num_data_points", "trial_id", "cpu_cores"]
+    trials = sc.cassandraTable(cassandraKeyspace, srcTable) \
+        .select(*columns) \
+        .where("experiment_id=? AND container_name=? AND host_id=?", experimentID, containerName, hostID) \
+        .map(decodeResultRow) \
+        .collect()
     
     #Retrieve number of active cores
-    CassandraRDDFirst = CassandraRDD.first()
-    nOfActiveCores = CassandraRDDFirst["cpu_cores"]
-      
-    #Retrieve total number of cores          
+    nOfActiveCores = trials[0]["cpu_cores"]
+    
+    #Retrieve total number of cores
     nOfCores = getHostCores(sc, cassandraKeyspace, hostID)
     
-    #Prepare query
-    query = [{"experiment_id":experimentID, "container_name":containerName, "host_id":hostID, "cpu_cores":nOfActiveCores, \
-              "cpu_min":[None]*nOfCores, "cpu_max":[None]*nOfCores, "cpu_q1_min":[None]*nOfCores, \
-              "cpu_q1_max":[None]*nOfCores, "cpu_q2_min":[None]*nOfCores, "cpu_q2_max":[None]*nOfCores, \
-              "cpu_p95_max":[None]*nOfCores, "cpu_p95_min":[None]*nOfCores, \
-              "cpu_q3_min":[None]*nOfCores, "cpu_q3_max":[None]*nOfCores, "cpu_weighted_avg":[None]*nOfCores, \
-              "cpu_combined_variance":[None]*nOfCores}]
-    
-    #Fill in query with the computed metrics
-    for i in range(nOfCores):
-        #Compute metrics for the core
-        coreMetrics = computeExperimentCoreMetrics(CassandraRDD, i)
-        combinedVar = computeCombinedVar(CassandraRDD, "cpu", i)
-        
-        query[0]["cpu_weighted_avg"][i] = coreMetrics["weighted_avg"]
-        query[0]["cpu_combined_variance"][i] = combinedVar
-        query[0]["cpu_min"][i] = coreMetrics["min"]
-        query[0]["cpu_max"][i] = coreMetrics["max"]
-        query[0]["cpu_q1_min"][i] = coreMetrics["q1_min"]
-        query[0]["cpu_q1_max"][i] = coreMetrics["q1_max"]
-        query[0]["cpu_q2_min"][i] = coreMetrics["q2_min"]
-        query[0]["cpu_q2_max"][i] = coreMetrics["q2_max"]
-        query[0]["cpu_q3_min"][i] = coreMetrics["q3_min"]
-        query[0]["cpu_q3_max"][i] = coreMetrics["q3_max"]
-        query[0]["cpu_p95_min"][i] = coreMetrics["p95_min"]
-        query[0]["cpu_p95_max"][i] = coreMetrics["p95_max"]
-    
-    return query
+    #Compute the metrics of all the cores
+    coreMetrics = computeExperimentCoresMetrics(trials, nOfCores)
+    
+    return [{"experiment_id":experimentID, "container_name":containerName, "host_id":hostID, "cpu_cores":nOfActiveCores, \
+             "cpu_min":coreMetrics["min"], "cpu_max":coreMetrics["max"], "cpu_q1_min":coreMetrics["q1_min"], \
+             "cpu_q1_max":coreMetrics["q1_max"], "cpu_q2_min":coreMetrics["q2_min"], "cpu_q2_max":coreMetrics["q2_max"], \
+             "cpu_p95_max":coreMetrics["p95_max"], "cpu_p95_min":coreMetrics["p95_min"], \
+             "cpu_q3_min":coreMetrics["q3_min"], "cpu_q3_max":coreMetrics["q3_max"], "cpu_weighted_avg":coreMetrics["weighted_avg"], \
+             "cpu_combined_variance":coreMetrics["combined_variance"]}]
 
 def main():
+    from commons import getSparkContext, ResultsWriter, startAnalyserRun, getAnalyserConfiguration, getSparkConf
+    
     # Takes arguments
     args = json.loads(sys.argv[1])
     experimentID = str(args["experiment_id"])
@@ -175,10 +172,13 @@ def main():
     containerName = str(args["container_name"])
     hostID = str(args["host_id"])
     cassandraKeyspace = str(args["cassandra_keyspace"])
+    getAnalyserConfiguration(args.get("analyser_config_file"), __file__)
     
     # Set configuration for spark context
-    conf = SparkConf().setAppName("cpu analyser")
-    sc = CassandraSparkContext(conf=conf)
+    conf = getSparkConf("cpu analyser")
+    sc = getSparkContext(conf)
+    run = startAnalyserRun(sc, cassandraKeyspace, __file__, experimentID, args=args)
+    writer = ResultsWriter(sc, cassandraKeyspace, asynchronous=True)
 
     #Source and destination tables
     dataTable = "environment_data"
@@ -190,8 +190,9 @@ def main():
     #Create queries for the overall cpu usage
     query = createQuery(sc, cassandraKeyspace, srcTable, dataTable, experimentID, containerName, hostID)
 
-    #Save to cassandra
-    sc.parallelize(query).saveToCassandra(cassandraKeyspace, destTable)
+    #Save to cassandra, while the per core usage is computed
+    writer.add(destTable, query)
+    writer.flush()
 
     #####################################################
     
@@ -199,7 +200,9 @@ def main():
     query = createCoreQuery(sc, cassandraKeyspace, srcTableCore, experimentID, containerName, hostID)
     
     #Save to cassandra
-    sc.parallelize(query).saveToCassandra(cassandraKeyspace, destTableCores)
+    writer.add(destTableCores, query)
+    writer.wait()
+    run.finish()
     
 if __name__ == '__main__':
     main()
\ No newline at end of file
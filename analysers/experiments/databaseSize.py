@@ -13,15 +13,14 @@ import numpy as np
 
 from pyspark_cassandra import CassandraSparkContext
 from pyspark_cassandra import RowFormat
-from pyspark import SparkConf
 
 #Create the queries containg the results of the computations to pass to Cassandra
 def createQuery(dataRDD, experimentID):
-    from commons import computeMode, computeMetrics
+    from commons import computeMode, computeMetrics, collectArray
     
     mode = computeMode(dataRDD)
 
-    data = dataRDD.map(lambda x: x[0]).collect()
+    data = collectArray(dataRDD.map(lambda x: x[0]))
      
     metrics = computeMetrics(data)
     
@@ -33,15 +32,19 @@ def createQuery(dataRDD, experimentID):
               "size_me":metrics["me"], "size_ci095_min":metrics["ci095_min"], "size_ci095_max":metrics["ci095_max"]}]
 
 def main():
+    from commons import getSparkContext, ResultsWriter, startAnalyserRun, getAnalyserConfiguration, getSparkConf, cacheDataset
+    
     # Takes arguments
     args = json.loads(sys.argv[1])
     experimentID = str(args["experiment_id"])
     configFile = str(args["config_file"])
     cassandraKeyspace = str(args["cassandra_keyspace"])
+    getAnalyserConfiguration(args.get("analyser_config_file"), __file__)
     
     # Set configuration for spark context
-    conf = SparkConf().setAppName("Number of process instances analyser")
-    sc = CassandraSparkContext(conf=conf)
+    conf = getSparkConf("Number of process instances analyser")
+    sc = getSparkContext(conf)
+    run = startAnalyserRun(sc, cassandraKeyspace, __file__, experimentID, args=args)
     
     #Source and destination tables
     srcTable = "trial_byte_size"
@@ -52,14 +55,17 @@ def main():
             .select("size") \
             .where("experiment_id=?", experimentID) \
             .filter(lambda r: r['size'] is not None) \
-            .map(lambda r: (r['size'], 1)) \
-            .cache()
+            .map(lambda r: (r['size'], 1))
+    cacheDataset(dataRDD)
     
     #Prepare queries for Cassandra  
     query = createQuery(dataRDD, experimentID)
     
     #Save to Cassandra
-    sc.parallelize(query).saveToCassandra(cassandraKeyspace, destTable)
+    writer = ResultsWriter(sc, cassandraKeyspace)
+    writer.add(destTable, query)
+    writer.wait()
+    run.finish()
     
 if __name__ == '__main__':
     main()
\ No newline at end of file
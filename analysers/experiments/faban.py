@@ -6,193 +6,204 @@ from datetime import timedelta
 import numpy as np
 
 from pyspark_cassandra import CassandraSparkContext
-from pyspark import SparkConf
     
 #Create query for the total operations metrics
 def createTotalOpsQuery(sc, cassandraKeyspace, srcTable, experimentID, containerID, hostID):
-    from commons import computeExperimentMetrics, computeModeMinMax, computeMetrics, computeLevene
+    from commons import computeExperimentMetrics, computeModeMinMax, computeMetrics, computeLevene, collectArray, cacheDataset, CacheScope
     
-    queries = []
-    
-    CassandraRDD = sc.cassandraTable(cassandraKeyspace, srcTable) \
-        .select("experiment_id", "host", "name", "total_ops_value", "total_ops_unit") \
-        .where("experiment_id=?", experimentID)
-    CassandraRDD.cache()
-    
-    combinations = CassandraRDD.map(lambda a: (a["host"], a["name"])).distinct().collect()
-    
-    for comb in combinations:
-        data = CassandraRDD.filter(lambda r: r['host'] == comb[0] and r['name'] == comb[1]).map(lambda r: r["total_ops_value"]).collect()
-        avg = np.mean(data).item()   
-        queries.append({"experiment_id": experimentID, "faban_driver_host": comb[0], "faban_driver_name": comb[1], "faban_total_ops_mean": avg})
+    with CacheScope():
+        queries = []
         
-    return queries
+        CassandraRDD = sc.cassandraTable(cassandraKeyspace, srcTable) \
+            .select("experiment_id", "host", "name", "total_ops_value", "total_ops_unit") \
+            .where("experiment_id=?", experimentID)
+        cacheDataset(CassandraRDD)
+        
+        combinations = CassandraRDD.map(lambda a: (a["host"], a["name"])).distinct().collect()
+        
+        for comb in combinations:
+            data = collectArray(CassandraRDD.filter(lambda r: r['host'] == comb[0] and r['name'] == comb[1]).map(lambda r: r["total_ops_value"]))
+            avg = np.mean(data).item()   
+            queries.append({"experiment_id": experimentID, "faban_driver_host": comb[0], "faban_driver_name": comb[1], "faban_total_ops_mean": avg})
+            
+        return queries
 
 #Create query for the operations metrics
 def createOpsQuery(sc, cassandraKeyspace, srcTable, experimentID, containerID, hostID):
-    from commons import computeMetrics, computeMode
-    
-    queries = []
-    
-    CassandraRDD = sc.cassandraTable(cassandraKeyspace, srcTable) \
-        .select("experiment_id", "host", "driver_name", "op_name", "successes", "failures", "mix") \
-        .where("experiment_id=?", experimentID)
-    CassandraRDD.cache()
-    
-    combinations = CassandraRDD.map(lambda a: (a["host"], a["driver_name"], a["op_name"])).distinct().collect()
-    
-    for comb in combinations:
-        query = {}
-        for dataName in ["successes", "failures", "mix"]:
-            data = CassandraRDD.filter(lambda r: r['host'] == comb[0] and r['driver_name'] == comb[1] and r['op_name'] == comb[2])
-            
-            mode = computeMode(data.map(lambda r: (r[dataName], 1)))
-            metrics = computeMetrics(data.map(lambda r: r[dataName]).collect())
-            
-            query.update({"experiment_id":experimentID, "faban_driver_host": comb[0], "faban_driver_name": comb[1], "faban_op_name": comb[2], \
-                      "faban_"+dataName+"_mode":mode[0], "faban_"+dataName+"_mode_freq":mode[1], \
-                      "faban_"+dataName+"_mean":metrics["mean"], "faban_"+dataName+"_num_data_points":metrics["num_data_points"], \
-                      "faban_"+dataName+"_min":metrics["min"], "faban_"+dataName+"_max":metrics["max"], "faban_"+dataName+"_sd":metrics["sd"], "faban_"+dataName+"_variance":metrics["variance"], \
-                      "faban_"+dataName+"_q1":metrics["q1"], "faban_"+dataName+"_q2":metrics["q2"], "faban_"+dataName+"_q3":metrics["q3"], "faban_"+dataName+"_p95":metrics["p95"], \
-                      "faban_"+dataName+"_p90":metrics["p90"], "faban_"+dataName+"_p99":metrics["p99"], "faban_"+dataName+"_percentiles":metrics["percentiles"], \
-                      "faban_"+dataName+"_me":metrics["me"], "faban_"+dataName+"_ci095_min":metrics["ci095_min"], "faban_"+dataName+"_ci095_max":metrics["ci095_max"]})
-        queries.append(query)
-    return queries
+    from commons import computeMetrics, computeMode, collectArray, cacheDataset, CacheScope
+    
+    with CacheScope():
+        queries = []
+        
+        CassandraRDD = sc.cassandraTable(cassandraKeyspace, srcTable) \
+            .select("experiment_id", "host", "driver_name", "op_name", "successes", "failures", "mix") \
+            .where("experiment_id=?", experimentID)
+        cacheDataset(CassandraRDD)
+        
+        combinations = CassandraRDD.map(lambda a: (a["host"], a["driver_name"], a["op_name"])).distinct().collect()
+        
+        for comb in combinations:
+            query = {}
+            for dataName in ["successes", "failures", "mix"]:
+                data = CassandraRDD.filter(lambda r: r['host'] == comb[0] and r['driver_name'] == comb[1] and r['op_name'] == comb[2])
+                
+                mode = computeMode(data.map(lambda r: (r[dataName], 1)))
+                metrics = computeMetrics(collectArray(data.map(lambda r: r[dataName])))
+                
+                query.update({"experiment_id":experimentID, "faban_driver_host": comb[0], "faban_driver_name": comb[1], "faban_op_name": comb[2], \
+                          "faban_"+dataName+"_mode":mode[0], "faban_"+dataName+"_mode_freq":mode[1], \
+                          "faban_"+dataName+"_mean":metrics["mean"], "faban_"+dataName+"_num_data_points":metrics["num_data_points"], \
+                          "faban_"+dataName+"_min":metrics["min"], "faban_"+dataName+"_max":metrics["max"], "faban_"+dataName+"_sd":metrics["sd"], "faban_"+dataName+"_variance":metrics["variance"], \
+                          "faban_"+dataName+"_q1":metrics["q1"], "faban_"+dataName+"_q2":metrics["q2"], "faban_"+dataName+"_q3":metrics["q3"], "faban_"+dataName+"_p95":metrics["p95"], \
+                          "faban_"+dataName+"_p90":metrics["p90"], "faban_"+dataName+"_p99":metrics["p99"], "faban_"+dataName+"_percentiles":metrics["percentiles"], \
+                          "faban_"+dataName+"_me":metrics["me"], "faban_"+dataName+"_ci095_min":metrics["ci095_min"], "faban_"+dataName+"_ci095_max":metrics["ci095_max"]})
+            queries.append(query)
+        return queries
 
 #Create query for the delay times metrics
 def createDelaysQuery(sc, cassandraKeyspace, srcTable, experimentID, containerID, hostID):
-    from commons import computeMetrics, computeMode
-    
-    queries = []
-    
-    CassandraRDD = sc.cassandraTable(cassandraKeyspace, srcTable) \
-        .select("experiment_id", "host", "driver_name", "op_name", "actual_avg", "min", "max") \
-        .where("experiment_id=?", experimentID)
-    CassandraRDD.cache()
+    from commons import computeMetrics, computeMode, collectArray, cacheDataset, CacheScope
     
-    combinations = CassandraRDD.map(lambda a: (a["host"], a["driver_name"], a["op_name"])).distinct().collect()
-    
-    for comb in combinations:
-        query = {}
-        
-        data = CassandraRDD.filter(lambda r: r['host'] == comb[0] and r['driver_name'] == comb[1] and r['op_name'] == comb[2])
-        
-        mean = data.map(lambda r: r["actual_avg"]).mean()
+    with CacheScope():
+        queries = []
         
-        dataMin = data.map(lambda r: r["min"]).min()
-        dataMax = data.map(lambda r: r["max"]).max()
+        CassandraRDD = sc.cassandraTable(cassandraKeyspace, srcTable) \
+            .select("experiment_id", "host", "driver_name", "op_name", "actual_avg", "min", "max") \
+            .where("experiment_id=?", experimentID)
+        cacheDataset(CassandraRDD)
         
-        query = {"experiment_id":experimentID, "faban_driver_host": comb[0], "faban_driver_name": comb[1], "faban_op_name": comb[2], \
-                 "faban_delay_times_weighted_avg":mean, "faban_delay_times_min":dataMin, "faban_delay_times_max":dataMax}
+        combinations = CassandraRDD.map(lambda a: (a["host"], a["driver_name"], a["op_name"])).distinct().collect()
         
-        queries.append(query)
-    return queries
+        for comb in combinations:
+            query = {}
+            
+            data = CassandraRDD.filter(lambda r: r['host'] == comb[0] and r['driver_name'] == comb[1] and r['op_name'] == comb[2])
+            
+            mean = data.map(lambda r: r["actual_avg"]).mean()
+            
+            dataMin = data.map(lambda r: r["min"]).min()
+            dataMax = data.map(lambda r: r["max"]).max()
+            
+            query = {"experiment_id":experimentID, "faban_driver_host": comb[0], "faban_driver_name": comb[1], "faban_op_name": comb[2], \
+                     "faban_delay_times_weighted_avg":mean, "faban_delay_times_min":dataMin, "faban_delay_times_max":dataMax}
+            
+            queries.append(query)
+        return queries
 
 #Create query for the run informations metrics
 def runInfoQuery(sc, cassandraKeyspace, srcTable, experimentID, containerID, hostID):
-    from commons import computeMetrics, computeMode
-    
-    queries = []
-    
-    CassandraRDD = sc.cassandraTable(cassandraKeyspace, srcTable) \
-        .select("experiment_id", "host", "duration", "metric_unit", "metric_value", "passed") \
-        .where("experiment_id=?", experimentID)
-    CassandraRDD.cache()
-    
-    hosts = CassandraRDD.map(lambda a: a["host"]).distinct().collect()
-    
-    for host in hosts:
-        query = {}
-        for dataName in ["duration", "metric_value"]:
-            data = CassandraRDD.filter(lambda r: r['host'] == host).cache()
-            
-            mode = computeMode(data.map(lambda r: (r[dataName], 1)))
-            metrics = computeMetrics(data.map(lambda r: r[dataName]).collect())
-            
-            query.update({"experiment_id":experimentID, "faban_host": host, "faban_metric_unit": data.first()["metric_unit"], \
-                      "faban_"+dataName+"_mode":mode[0], "faban_"+dataName+"_mode_freq":mode[1], \
-                      "faban_"+dataName+"_mean":metrics["mean"], "faban_"+dataName+"_num_data_points":metrics["num_data_points"], \
-                      "faban_"+dataName+"_min":metrics["min"], "faban_"+dataName+"_max":metrics["max"], "faban_"+dataName+"_sd":metrics["sd"], "faban_"+dataName+"_variance":metrics["variance"], \
-                      "faban_"+dataName+"_q1":metrics["q1"], "faban_"+dataName+"_q2":metrics["q2"], "faban_"+dataName+"_q3":metrics["q3"], "faban_"+dataName+"_p95":metrics["p95"], \
-                      "faban_"+dataName+"_p90":metrics["p90"], "faban_"+dataName+"_p99":metrics["p99"], "faban_"+dataName+"_percentiles":metrics["percentiles"], \
-                      "faban_"+dataName+"_me":metrics["me"], "faban_"+dataName+"_ci095_min":metrics["ci095_min"], "faban_"+dataName+"_ci095_max":metrics["ci095_max"]})
-        query["faban_passed"] = data.map(lambda r: r["passed"]).reduce(lambda a, b: a and b)
-        queries.append(query)
-    return queries
+    from commons import computeMetrics, computeMode, collectArray, cacheDataset, uncacheDataset, CacheScope
+    
+    with CacheScope():
+        queries = []
+        
+        CassandraRDD = sc.cassandraTable(cassandraKeyspace, srcTable) \
+            .select("experiment_id", "host", "duration", "metric_unit", "metric_value", "passed") \
+            .where("experiment_id=?", experimentID)
+        cacheDataset(CassandraRDD)
+        
+        hosts = CassandraRDD.map(lambda a: a["host"]).distinct().collect()
+        
+        for host in hosts:
+            query = {}
+            data = cacheDataset(CassandraRDD.filter(lambda r: r['host'] == host))
+            for dataName in ["duration", "metric_value"]:
+                mode = computeMode(data.map(lambda r: (r[dataName], 1)))
+                metrics = computeMetrics(collectArray(data.map(lambda r: r[dataName])))
+                
+                query.update({"experiment_id":experimentID, "faban_host": host, "faban_metric_unit": data.first()["metric_unit"], \
+                          "faban_"+dataName+"_mode":mode[0], "faban_"+dataName+"_mode_freq":mode[1], \
+                          "faban_"+dataName+"_mean":metrics["mean"], "faban_"+dataName+"_num_data_points":metrics["num_data_points"], \
+                          "faban_"+dataName+"_min":metrics["min"], "faban_"+dataName+"_max":metrics["max"], "faban_"+dataName+"_sd":metrics["sd"], "faban_"+dataName+"_variance":metrics["variance"], \
+                          "faban_"+dataName+"_q1":metrics["q1"], "faban_"+dataName+"_q2":metrics["q2"], "faban_"+dataName+"_q3":metrics["q3"], "faban_"+dataName+"_p95":metrics["p95"], \
+                          "faban_"+dataName+"_p90":metrics["p90"], "faban_"+dataName+"_p99":metrics["p99"], "faban_"+dataName+"_percentiles":metrics["percentiles"], \
+                          "faban_"+dataName+"_me":metrics["me"], "faban_"+dataName+"_ci095_min":metrics["ci095_min"], "faban_"+dataName+"_ci095_max":metrics["ci095_max"]})
+            query["faban_passed"] = data.map(lambda r: r["passed"]).reduce(lambda a, b: a and b)
+            uncacheDataset(data)
+            queries.append(query)
+        return queries
 
 #Create query for the response times metrics
 def createResponseTimesQuery(sc, cassandraKeyspace, srcTable, experimentID, containerID, hostID):
-    queries = []
+    from commons import cacheDataset, uncacheDataset, CacheScope
     
-    CassandraRDD = sc.cassandraTable(cassandraKeyspace, srcTable) \
-        .select("experiment_id", "host", "driver_name", "op_name", "stat_name", "stat_value") \
-        .where("experiment_id=?", experimentID)
-    CassandraRDD.cache()
-    
-    combinations = CassandraRDD.map(lambda a: (a["host"], a["driver_name"], a["op_name"], a["stat_name"])).distinct().collect()
-    
-    for comb in combinations:
-        query = {}
-        
-        data = CassandraRDD.filter(lambda r: r['host'] == comb[0] and r['driver_name'] == comb[1] and r['op_name'] == comb[2] and r['stat_name'] == comb[3])
+    with CacheScope():
+        queries = []
         
-        statValues = data.map(lambda r: r["stat_value"]).cache()
+        CassandraRDD = sc.cassandraTable(cassandraKeyspace, srcTable) \
+            .select("experiment_id", "host", "driver_name", "op_name", "stat_name", "stat_value") \
+            .where("experiment_id=?", experimentID)
+        cacheDataset(CassandraRDD)
         
-        dataMin = statValues.min()
-        dataMax = statValues.max()
+        combinations = CassandraRDD.map(lambda a: (a["host"], a["driver_name"], a["op_name"], a["stat_name"])).distinct().collect()
         
-        query = {"experiment_id":experimentID, "faban_driver_host": comb[0], "faban_driver_name": comb[1], "faban_op_name": comb[2], \
-                 "faban_op_stat_name":comb[3], "faban_op_stat_min":dataMin, "faban_op_stat_max":dataMax}
-        
-        queries.append(query)
-    return queries
+        for comb in combinations:
+            query = {}
+            
+            data = CassandraRDD.filter(lambda r: r['host'] == comb[0] and r['driver_name'] == comb[1] and r['op_name'] == comb[2] and r['stat_name'] == comb[3])
+            
+            statValues = cacheDataset(data.map(lambda r: r["stat_value"]))
+            
+            dataMin = statValues.min()
+            dataMax = statValues.max()
+            uncacheDataset(statValues)
+            
+            query = {"experiment_id":experimentID, "faban_driver_host": comb[0], "faban_driver_name": comb[1], "faban_op_name": comb[2], \
+                     "faban_op_stat_name":comb[3], "faban_op_stat_min":dataMin, "faban_op_stat_max":dataMax}
+            
+            queries.append(query)
+        return queries
         
 #Create query for the custom stats metrics
 def createCustomStatsQuery(sc, cassandraKeyspace, srcTable, experimentID, containerID, hostID):
-    from commons import computeMetrics, computeMode
-    
-    absQueries = []
-    statQueries = []
-    
-    CassandraRDD = sc.cassandraTable(cassandraKeyspace, srcTable) \
-        .select("experiment_id", "host", "driver_name", "stat_name", "description", "target", "result") \
-        .where("experiment_id=?", experimentID)
-    CassandraRDD.cache()
-    
-    combinations = CassandraRDD.map(lambda a: (a["host"], a["driver_name"], a["stat_name"], a["description"])).distinct().collect()
+    from commons import computeMetrics, computeMode, collectArray, cacheDataset, uncacheDataset, CacheScope
     
-    for comb in combinations:
-        query = {}
+    with CacheScope():
+        absQueries = []
+        statQueries = []
         
-        data = CassandraRDD.filter(lambda r: r['host'] == comb[0] and r['driver_name'] == comb[1] and r['stat_name'] == comb[2] and r['description'] == comb[3])
+        CassandraRDD = sc.cassandraTable(cassandraKeyspace, srcTable) \
+            .select("experiment_id", "host", "driver_name", "stat_name", "description", "target", "result") \
+            .where("experiment_id=?", experimentID)
+        cacheDataset(CassandraRDD)
         
-        target = data.first()["target"]
+        combinations = CassandraRDD.map(lambda a: (a["host"], a["driver_name"], a["stat_name"], a["description"])).distinct().collect()
         
-        if target == "absolute":
-            mode = computeMode(data.map(lambda r: (r["result"], 1)))
-            metrics = computeMetrics(data.map(lambda r: r["result"]).collect())
+        for comb in combinations:
+            query = {}
             
-            query.update({"experiment_id":experimentID, "faban_driver_host": comb[0], "faban_driver_name": comb[1], "faban_stat_name": comb[2], \
-                      "faban_stat_mode":mode[0], "faban_stat_mode_freq":mode[1], "faban_stat_description":comb[3],\
-                      "faban_stat_mean":metrics["mean"], "faban_stat_num_data_points":metrics["num_data_points"], \
-                      "faban_stat_min":metrics["min"], "faban_stat_max":metrics["max"], "faban_stat_sd":metrics["sd"], "faban_stat_variance":metrics["variance"], \
-                      "faban_stat_q1":metrics["q1"], "faban_stat_q2":metrics["q2"], "faban_stat_q3":metrics["q3"], "faban_stat_p95":metrics["p95"], \
-                      "faban_stat_p90":metrics["p90"], "faban_stat_p99":metrics["p99"], "faban_stat_percentiles":metrics["percentiles"], \
-                      "faban_stat_me":metrics["me"], "faban_stat_ci095_min":metrics["ci095_min"], "faban_stat_ci095_max":metrics["ci095_max"]})
-            absQueries.append(query)
-        
-        else:
-            mappedData = data.map(lambda r: r["result"]).cache()
-            dataMin = mappedData.min()
-            dataMax = mappedData.max()
-            query.update({"experiment_id":experimentID, "faban_driver_host": comb[0], "faban_driver_name": comb[1], "faban_stat_name": comb[2], \
-                          "faban_stat_description":comb[3],\
-                          "faban_stat_min":dataMin, "faban_stat_max":dataMax})
-            statQueries.append(query)
+            data = CassandraRDD.filter(lambda r: r['host'] == comb[0] and r['driver_name'] == comb[1] and r['stat_name'] == comb[2] and r['description'] == comb[3])
             
-    return (absQueries, statQueries)
+            target = data.first()["target"]
+            
+            if target == "absolute":
+                mode = computeMode(data.map(lambda r: (r["result"], 1)))
+                metrics = computeMetrics(collectArray(data.map(lambda r: r["result"])))
+                
+                query.update({"experiment_id":experimentID, "faban_driver_host": comb[0], "faban_driver_name": comb[1], "faban_stat_name": comb[2], \
+                          "faban_stat_mode":mode[0], "faban_stat_mode_freq":mode[1], "faban_stat_description":comb[3],\
+                          "faban_stat_mean":metrics["mean"], "faban_stat_num_data_points":metrics["num_data_points"], \
+                          "faban_stat_min":metrics["min"], "faban_stat_max":metrics["max"], "faban_stat_sd":metrics["sd"], "faban_stat_variance":metrics["variance"], \
+                          "faban_stat_q1":metrics["q1"], "faban_stat_q2":metrics["q2"], "faban_stat_q3":metrics["q3"], "faban_stat_p95":metrics["p95"], \
+                          "faban_stat_p90":metrics["p90"], "faban_stat_p99":metrics["p99"], "faban_stat_percentiles":metrics["percentiles"], \
+                          "faban_stat_me":metrics["me"], "faban_stat_ci095_min":metrics["ci095_min"], "faban_stat_ci095_max":metrics["ci095_max"]})
+                absQueries.append(query)
+            
+            else:
+                mappedData = cacheDataset(data.map(lambda r: r["result"]))
+                dataMin = mappedData.min()
+                dataMax = mappedData.max()
+                uncacheDataset(mappedData)
+                query.update({"experiment_id":experimentID, "faban_driver_host": comb[0], "faban_driver_name": comb[1], "faban_stat_name": comb[2], \
+                              "faban_stat_description":comb[3],\
+                              "faban_stat_min":dataMin, "faban_stat_max":dataMax})
+                statQueries.append(query)
+                
+        return (absQueries, statQueries)
         
 def main():
+    from commons import getSparkContext, ResultsWriter, startAnalyserRun, getAnalyserConfiguration, getSparkConf
+    
     # Takes arguments
     args = json.loads(sys.argv[1])
     experimentID = str(args["experiment_id"])
@@ -200,30 +211,44 @@ def main():
     containerID = str(args["container_id"])
     hostID = str(args["host_id"])
     cassandraKeyspace = str(args["cassandra_keyspace"])
+    getAnalyserConfiguration(args.get("analyser_config_file"), __file__)
     
     # Set configuration for spark context
-    conf = SparkConf().setAppName("Faban analyser")
-    sc = CassandraSparkContext(conf=conf)
+    conf = getSparkConf("Faban analyser")
+    sc = getSparkContext(conf)
+    run = startAnalyserRun(sc, cassandraKeyspace, __file__, experimentID, args=args)
+    
+    #The results of each computation are written while the next one runs
+    writer = ResultsWriter(sc, cassandraKeyspace, asynchronous=True)
 
     #Prepare queries for Cassandra and save to Cassandra
     query = createTotalOpsQuery(sc, cassandraKeyspace, "faban_driver_summary", experimentID, containerID, hostID)
-    sc.parallelize(query).saveToCassandra(cassandraKeyspace, "exp_faban_total_ops")
+    writer.add("exp_faban_total_ops", query)
+    writer.flush()
     
     query = createDelaysQuery(sc, cassandraKeyspace, "faban_driver_delay_times", experimentID, containerID, hostID)
-    sc.parallelize(query).saveToCassandra(cassandraKeyspace, "exp_faban_delay_times")
+    writer.add("exp_faban_delay_times", query)
+    writer.flush()
     
     query = createResponseTimesQuery(sc, cassandraKeyspace, "faban_driver_response_times", experimentID, containerID, hostID)
-    sc.parallelize(query).saveToCassandra(cassandraKeyspace, "exp_faban_ops_response_times")
+    writer.add("exp_faban_ops_response_times", query)
+    writer.flush()
     
     query = runInfoQuery(sc, cassandraKeyspace, "faban_run_info", experimentID, containerID, hostID)
-    sc.parallelize(query).saveToCassandra(cassandraKeyspace, "exp_faban_run_info")
+    writer.add("exp_faban_run_info", query)
+    writer.flush()
     
     query = createOpsQuery(sc, cassandraKeyspace, "faban_driver_mix", experimentID, containerID, hostID)
-    sc.parallelize(query).saveToCassandra(cassandraKeyspace, "exp_faban_ops")
+    writer.add("exp_faban_ops", query)
+    writer.flush()
     
     query = createCustomStatsQuery(sc, cassandraKeyspace, "faban_driver_custom_stats", experimentID, containerID, hostID)
-    sc.parallelize(query[0]).saveToCassandra(cassandraKeyspace, "exp_faban_ops_custom_stats_target_absolute")
-    sc.parallelize(query[1]).saveToCassandra(cassandraKeyspace, "exp_faban_ops_custom_stats_target_statistic")
+    writer.add("exp_faban_ops_custom_stats_target_absolute", query[0])
+    writer.add("exp_faban_ops_custom_stats_target_statistic", query[1])
+    
+    #Wait for all the writes
+    writer.wait()
+    run.finish()
     
 if __name__ == '__main__':
     main()
\ No newline at end of file
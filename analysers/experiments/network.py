@@ -0,0 +1,75 @@
+import sys
+import json
+
+from pyspark_cassandra import CassandraSparkContext
+
+#Create the queries containg the results of the computations to pass to Cassandra. The few rows of the trials are collected
+#once and grouped by interface and counter on the driver, instead of running Spark jobs for every combination
+def createQueries(CassandraRDD, experimentID, containerName, hostID):
+    from commons import computeTrialsExperimentMetrics, computeTrialsCombinedVar, rowToDict
+
+    queries = []
+
+    combinations = {}
+    for row in CassandraRDD.map(rowToDict).collect():
+        combinations.setdefault((row["network_interface_name"], row["counter"]), []).append(row)
+
+    #Iterate over all combinations of interface and counter
+    for (interface, counter), rows in combinations.items():
+        trials = [r for r in rows if r["rate_mean"] is not None]
+
+        metrics = computeTrialsExperimentMetrics(trials, "rate")
+        combinedVar = computeTrialsCombinedVar(trials, "rate") if len(trials) > 0 else None
+
+        queries.append({"experiment_id":experimentID, "container_name":containerName, "host_id":hostID, \
+                  "network_interface_name":interface, "counter":counter, \
+                  "rate_mean_min":metrics["mean_min"], "rate_mean_max":metrics["mean_max"], \
+                  "rate_min":metrics["min"], "rate_max":metrics["max"], "rate_q1_min":metrics["q1_min"], \
+                  "rate_q1_max":metrics["q1_max"], "rate_q2_min":metrics["q2_min"], "rate_q2_max":metrics["q2_max"], \
+                  "rate_p90_max":metrics["p90_max"], "rate_p90_min":metrics["p90_min"], \
+                  "rate_p95_max":metrics["p95_max"], "rate_p95_min":metrics["p95_min"], \
+                  "rate_p99_max":metrics["p99_max"], "rate_p99_min":metrics["p99_min"], \
+                  "rate_q3_min":metrics["q3_min"], "rate_q3_max":metrics["q3_max"], "rate_weighted_avg":metrics["weighted_avg"], \
+                  "rate_best": metrics["best"], "rate_worst": metrics["worst"], "rate_average": metrics["average"], \
+                  "rate_variation_coefficient": metrics["variation_coefficient"], "rate_combined_variance": combinedVar})
+
+    return queries
+
+def main():
+    from commons import getSparkContext, ResultsWriter, startAnalyserRun, getAnalyserConfiguration, getSparkConf
+
+    # Takes arguments
+    args = json.loads(sys.argv[1])
+    experimentID = str(args["experiment_id"])
+    configFile = str(args["config_file"])
+    containerName = str(args["container_name"])
+    hostID = str(args["host_id"])
+    cassandraKeyspace = str(args["cassandra_keyspace"])
+    getAnalyserConfiguration(args.get("analyser_config_file"), __file__)
+
+    # Set configuration for spark context
+    conf = getSparkConf("Network analyser")
+    sc = getSparkContext(conf)
+    run = startAnalyserRun(sc, cassandraKeyspace, __file__, experimentID, args=args)
+
+    #Source and destination tables
+    srcTable = "trial_network"
+    destTable = "exp_network"
+
+    #Retrieving data for computations
+    CassandraRDD = sc.cassandraTable(cassandraKeyspace, srcTable) \
+        .select("network_interface_name", "counter", "trial_id", "rate_min", "rate_max", "rate_q1", "rate_q2", "rate_q3", \
+                "rate_p90", "rate_p95", "rate_p99", "rate_num_data_points", "rate_mean", "rate_me", "rate_variance") \
+        .where("experiment_id=? AND container_name=? AND host_id=?", experimentID, containerName, hostID)
+
+    #Creating Cassandra queries
+    queries = createQueries(CassandraRDD, experimentID, containerName, hostID)
+
+    #Save to Cassandra
+    writer = ResultsWriter(sc, cassandraKeyspace)
+    writer.add(destTable, queries)
+    writer.wait()
+    run.finish()
+
+if __name__ == '__main__':
+    main()
@@ -13,11 +13,10 @@ import numpy as np
 
 from pyspark_cassandra import CassandraSparkContext
 from pyspark_cassandra import RowFormat
-from pyspark import SparkConf
 
 #Create the queries containg the results of the computations to pass to Cassandra
 def createQuery(dataRDD, experimentID):
-    from commons import computeMode, computeMetrics
+    from commons import computeMode, computeMetrics, collectArray
     
     queries = []
     
@@ -27,7 +26,7 @@ def createQuery(dataRDD, experimentID):
     for process in processes:
         mode = computeMode(dataRDD.filter(lambda a: a["process_definition_id"] == process).map(lambda r: (r['number_of_process_instances'], 1)))
     
-        data = dataRDD.filter(lambda r: r['process_definition_id'] == process).map(lambda r: r['number_of_process_instances']).collect()
+        data = collectArray(dataRDD.filter(lambda r: r['process_definition_id'] == process).map(lambda r: r['number_of_process_instances']))
          
         metrics = computeMetrics(data)
         
@@ -41,15 +40,19 @@ def createQuery(dataRDD, experimentID):
     return queries
 
 def main():
+    from commons import getSparkContext, ResultsWriter, startAnalyserRun, getAnalyserConfiguration, getSparkConf, cacheDataset
+    
     # Takes arguments
     args = json.loads(sys.argv[1])
     experimentID = str(args["experiment_id"])
     configFile = str(args["config_file"])
     cassandraKeyspace = str(args["cassandra_keyspace"])
+    getAnalyserConfiguration(args.get("analyser_config_file"), __file__)
     
     # Set configuration for spark context
-    conf = SparkConf().setAppName("Number of process instances analyser")
-    sc = CassandraSparkContext(conf=conf)
+    conf = getSparkConf("Number of process instances analyser")
+    sc = getSparkContext(conf)
+    run = startAnalyserRun(sc, cassandraKeyspace, __file__, experimentID, args=args)
 
     #Source and destination tables
     srcTable = "trial_number_of_process_instances"
@@ -59,14 +62,17 @@ def main():
     dataRDD = sc.cassandraTable(cassandraKeyspace, srcTable) \
             .select("number_of_process_instances", "process_definition_id") \
             .where("experiment_id=?", experimentID) \
-            .filter(lambda r: r['number_of_process_instances'] is not None) \
-            .cache()
+            .filter(lambda r: r['number_of_process_instances'] is not None)
+    cacheDataset(dataRDD)
     
     #Creating the Cassandra query
     query = createQuery(dataRDD, experimentID)
     
     #Save to Cassandra
-    sc.parallelize(query).saveToCassandra(cassandraKeyspace, destTable)
+    writer = ResultsWriter(sc, cassandraKeyspace)
+    writer.add(destTable, query)
+    writer.wait()
+    run.finish()
     
 if __name__ == '__main__':
     main()
\ No newline at end of file
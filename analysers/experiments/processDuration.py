@@ -9,7 +9,6 @@ from datetime import timedelta
 
 from pyspark_cassandra import CassandraSparkContext
 from pyspark_cassandra import RowFormat
-from pyspark import SparkConf
 
 #Create the queries containg the results of the computations to pass to Cassandra
 def createQuery(CassandraRDD, experimentID):
@@ -42,15 +41,19 @@ def createQuery(CassandraRDD, experimentID):
     return queries
 
 def main():
+    from commons import getSparkContext, ResultsWriter, startAnalyserRun, getAnalyserConfiguration, getSparkConf, cacheDataset
+    
     # Takes arguments
     args = json.loads(sys.argv[1])
     experimentID = str(args["experiment_id"])
     configFile = str(args["config_file"])
     cassandraKeyspace = str(args["cassandra_keyspace"])
+    getAnalyserConfiguration(args.get("analyser_config_file"), __file__)
     
     # Set configuration for spark context
-    conf = SparkConf().setAppName("Process duration analyser")
-    sc = CassandraSparkContext(conf=conf)
+    conf = getSparkConf("Process duration analyser")
+    sc = getSparkContext(conf)
+    run = startAnalyserRun(sc, cassandraKeyspace, __file__, experimentID, args=args)
 
     #Source and destination tables
     srcTable = "trial_process_duration"
@@ -63,13 +66,16 @@ def main():
                 "process_duration_me", "trial_id", "process_duration_mode", "process_duration_mode_freq", "process_definition_id", \
                 "process_duration_p90", "process_duration_p99", "process_duration_variance") \
         .where("experiment_id=?", experimentID)
-    CassandraRDD.cache()
+    cacheDataset(CassandraRDD)
     
     #Creating Cassandra query
     query = createQuery(CassandraRDD, experimentID)
 
     #Save to Cassandra
-    sc.parallelize(query).saveToCassandra(cassandraKeyspace, destTable)
+    writer = ResultsWriter(sc, cassandraKeyspace)
+    writer.add(destTable, query)
+    writer.wait()
+    run.finish()
     
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -7,7 +7,6 @@ import uuid
 from datetime import timedelta
 
 from pyspark_cassandra import CassandraSparkContext
-from pyspark import SparkConf
 
 #Obtain max IO values from the data
 def maxIOValues(dataRDD):
@@ -23,17 +22,13 @@ def maxIOValues(dataRDD):
         else:
             return b
     
-    data = dataRDD.collect()
-    
-    devices = {}
-    for e in data:
-        dev = e["device"]
-        devices[dev] = 0
+    #Only the devices are needed on the driver, not the rows
+    devices = dataRDD.map(lambda a: a["device"]).distinct().collect()
     
     queries = []
     
     #Iterate over all devices
-    for d in devices.keys():
+    for d in devices:
         maxReads = dataRDD.filter(lambda a: a["device"] == d) \
             .map(lambda a: a["reads"]) \
             .reduce(whichHigher)
@@ -59,36 +54,52 @@ def createQueries(dataRDD, trialID, experimentID, containerID, containerName, ho
     return queries
 
 def main():
+    from commons import getSparkContext, getTrialIDs, readTrials, createTrialsQueries, runExperimentAnalyser, ResultsWriter, startAnalyserRun, getAnalyserConfiguration, getSparkConf, cacheDataset
+    
     # Takes arguments
     args = json.loads(sys.argv[1])
-    trialID = str(args["trial_id"])
     experimentID = str(args["experiment_id"])
     configFile = str(args["config_file"])
     containerID = str(args["container_id"])
     containerName = str(args["container_name"])
     hostID = str(args["host_id"])
     cassandraKeyspace = str(args["cassandra_keyspace"])
-    partitionsPerCore = 5
+    rawCacheDir = args.get("raw_cache_dir")
+    configuration = getAnalyserConfiguration(args.get("analyser_config_file"), __file__)
+    partitionsPerCore = configuration["partitions_per_core"]
     
     # Set configuration for spark context
-    conf = SparkConf().setAppName("IO analyser")
-    sc = CassandraSparkContext(conf=conf)
+    conf = getSparkConf("IO analyser")
+    sc = getSparkContext(conf)
+    trialIDs = getTrialIDs(sc, cassandraKeyspace, experimentID, args)
+    run = startAnalyserRun(sc, cassandraKeyspace, __file__, experimentID, trialIDs, args=args, inputs=["io_data"])
+    trialIDs = run.trialIDs
+    if len(trialIDs) == 0:
+        run.finish()
+        return
 
     #Source and destination tables
     srcTable = "io_data"
     destTable = "trial_io"
     
     #Obtain data for computations
-    dataRDD = sc.cassandraTable(cassandraKeyspace, srcTable)\
-            .select("device", "reads", "writes", "total") \
-            .where("trial_id=? AND experiment_id=? AND container_id=? AND host_id=?", trialID, experimentID, containerID, hostID) \
-            .repartition(sc.defaultParallelism * partitionsPerCore) \
-            .cache()
+    dataRDD = readTrials(sc, cassandraKeyspace, srcTable, ["device", "reads", "writes", "total"], experimentID, trialIDs, \
+                         [("container_id", containerID), ("host_id", hostID)], cacheDir=rawCacheDir) \
+            .repartition(sc.defaultParallelism * partitionsPerCore)
+    cacheDataset(dataRDD)
     
     # Generate queries for devices
-    queries = createQueries(dataRDD, trialID, experimentID, containerID, containerName, hostID)
+    queries = createTrialsQueries(dataRDD, trialIDs, \
+            lambda trialID, trialRDD: createQueries(trialRDD, trialID, experimentID, containerID, containerName, hostID))
     
     # Save to Cassandra
-    sc.parallelize(queries, sc.defaultParallelism * partitionsPerCore).saveToCassandra(cassandraKeyspace, destTable)
+    writer = ResultsWriter(sc, cassandraKeyspace)
+    writer.add(destTable, queries)
+    writer.wait()
+    run.finish()
+    
+    #Run the experiment analyser on the results just saved
+    if args.get("run_experiment", False) is True:
+        runExperimentAnalyser(sys.argv[0])
     
 if __name__ == '__main__': main()
\ No newline at end of file
@@ -0,0 +1,133 @@
+import sys
+import json
+import os
+import time
+
+from pyspark_cassandra import CassandraSparkContext
+
+#Trial analysers backfilled by default, in order of dependency (throughput reads the results of executionTime and
+#numberOfProcessInstances). Each is followed by its experiment analysers (see backfillExperimentAnalysers in commons), the
+#ones of a single container run for every container of the experiment. The trial analysers of a single container (see
+#backfillContainerAnalysers) can not be backfilled, resources covers cpu, ram and IO for all the containers.
+#Arguments: cassandra_keyspace, config_file and analyser_config_file given to the analysers, experiment_ids (all the
+#experiments if missing), analysers (defaultAnalysers if missing), analyser_args (more arguments of all the analysers, eg.
+#steady_state) and checkpoint_file (to resume an interrupted backfill). The reads are limited by backfill_reads_per_second,
+#that only the joins with Cassandra of the connector honour, and by backfill_rows_per_second, pausing between the runs
+#(see analysers.configuration.yml)
+defaultAnalysers = ["executionTime", "numberOfProcessInstances", "processDuration", "numberOfConstructInstances", "constructDuration", \
+                    "databaseSize", "resources", "environmentRollup", "throughput"]
+
+#Retrieve the trials of the experiments to backfill (all the ones in the experiment table if experimentIDs is None), as a
+#dictionary from the experiment to its trials
+def getBackfillExperiments(sc, cassandraKeyspace, experimentIDs=None):
+    trials = sc.cassandraTable(cassandraKeyspace, "experiment") \
+            .select("experiment_id", "trial_id") \
+            .map(lambda r: (str(r["experiment_id"]), str(r["trial_id"]))) \
+            .filter(lambda x: experimentIDs is None or x[0] in experimentIDs) \
+            .distinct() \
+            .collect()
+
+    experiments = {}
+    for experimentID, trialID in trials:
+        experiments.setdefault(experimentID, []).append(trialID)
+    return experiments
+
+#Retrieve the containers of the trials of an experiment from their properties, as a list of dictionaries with the container_id,
+#container_name (the name of the container, its id if missing) and host_id arguments of the analysers of a single container
+def getBackfillContainers(sc, cassandraKeyspace, experimentID, trialIDs):
+    containers = sc.cassandraTable(cassandraKeyspace, "container_properties") \
+            .select("container_id", "host_id", "name") \
+            .where("experiment_id=? AND trial_id IN (" + ",".join(["?"]*len(trialIDs)) + ")", experimentID, *trialIDs) \
+            .map(lambda r: (str(r["container_id"]), str(r["name"].lstrip("/")) if r["name"] is not None else str(r["container_id"]), str(r["host_id"]))) \
+            .distinct() \
+            .collect()
+    
+    return [{"container_id":c[0], "container_name":c[1], "host_id":c[2]} for c in sorted(containers)]
+
+def main():
+    from commons import getSparkContext, getAnalyserConfiguration, getSparkConf, runAnalyserScript, BackfillCheckpoint, getBackfillBatches, \
+            getBackfillExperimentRuns, backfillContainerAnalysers, finishedAnalyserRuns, getBackfillPause
+
+    # Takes arguments
+    args = json.loads(sys.argv[1])
+    configFile = str(args["config_file"])
+    cassandraKeyspace = str(args["cassandra_keyspace"])
+    checkpointFile = args.get("checkpoint_file")
+    experimentIDs = [str(e) for e in args["experiment_ids"]] if "experiment_ids" in args else None
+    analysers = [str(a) for a in args.get("analysers", defaultAnalysers)]
+    analyserArgs = args.get("analyser_args", {})
+    containerAnalysers = [a for a in analysers if a in backfillContainerAnalysers]
+    if len(containerAnalysers) > 0:
+        raise ValueError("The trial analysers of a single container can not be backfilled: " + ", ".join(containerAnalysers))
+    analyserConfigFile = args.get("analyser_config_file")
+    configuration = getAnalyserConfiguration(analyserConfigFile, __file__)
+    batchSize = configuration["backfill_batch_trials"]
+    rowsPerSecond = configuration["backfill_rows_per_second"]
+
+    # Set configuration for spark context, throttling the joins with Cassandra of every core of the executors
+    conf = getSparkConf("Backfill")
+    if configuration["backfill_reads_per_second"] is not None:
+        conf.set("spark.cassandra.input.reads_per_sec", str(configuration["backfill_reads_per_second"]))
+    sc = getSparkContext(conf)
+
+    experiments = getBackfillExperiments(sc, cassandraKeyspace, experimentIDs)
+    checkpoint = BackfillCheckpoint(checkpointFile)
+    trialsDir = os.path.dirname(os.path.abspath(__file__))
+    experimentsDir = os.path.join(os.path.dirname(trialsDir), "experiments")
+    #Arguments given to all the analysers run
+    commonArgs = {"config_file":configFile, "cassandra_keyspace":cassandraKeyspace}
+    if analyserConfigFile is not None:
+        commonArgs["analyser_config_file"] = analyserConfigFile
+
+    pending = dict((analyser, getBackfillBatches(experiments, analyser, checkpoint, batchSize)) for analyser in analysers)
+    totalTrials = sum(len(trialIDs) for batches in pending.values() for experimentID, trialIDs in batches)
+    doneTrials = 0
+    startTime = time.time()
+    print("Backfilling " + str(totalTrials) + " trials of " + str(len(experiments)) + " experiments with " + ", ".join(analysers))
+
+    #The containers of an experiment are only retrieved when an analyser of a single container needs them
+    experimentContainers = {}
+    def containers(experimentID):
+        if experimentID not in experimentContainers:
+            experimentContainers[experimentID] = getBackfillContainers(sc, cassandraKeyspace, experimentID, experiments[experimentID])
+        return experimentContainers[experimentID]
+
+    #Run an analyser, pausing after it so that the rows read by its runs fit backfill_rows_per_second
+    def runPaced(script, runArgs):
+        runs = len(finishedAnalyserRuns)
+        runStart = time.time()
+        runAnalyserScript(script, runArgs)
+        rowsRead = [run.getRowsRead() for run in finishedAnalyserRuns[runs:]]
+        pause = getBackfillPause(None if None in rowsRead else sum(rowsRead), time.time() - runStart, rowsPerSecond)
+        if pause > 0:
+            print("Pausing " + "%.1f" % pause + " seconds after reading " + str(sum(rowsRead)) + " rows")
+            time.sleep(pause)
+
+    for analyser in analysers:
+        for experimentID in sorted(experiments.keys()):
+            #Each batch is a run of the trial analyser on many trials of the experiment
+            for batchExperimentID, trialIDs in pending[analyser]:
+                if batchExperimentID != experimentID:
+                    continue
+                runArgs = dict(analyserArgs, experiment_id=experimentID, trial_ids=trialIDs, **commonArgs)
+                runPaced(os.path.join(trialsDir, analyser + ".py"), runArgs)
+                checkpoint.markDone([(analyser, experimentID, trialID) for trialID in trialIDs])
+
+                doneTrials += len(trialIDs)
+                elapsed = time.time() - startTime
+                print("Backfilled " + analyser + " on " + str(len(trialIDs)) + " trials of " + experimentID + ": " + str(doneTrials) + "/" + \
+                      str(totalTrials) + " trials, " + "%.1f" % (doneTrials * 60.0 / elapsed if elapsed > 0 else 0.0) + " trials/minute")
+
+            #The experiment analysers run once all the trials of the experiment are backfilled
+            for experimentAnalyser, containerArgs, step in getBackfillExperimentRuns(analyser, experimentID, lambda: containers(experimentID), checkpoint):
+                experimentScript = os.path.join(experimentsDir, experimentAnalyser + ".py")
+                if os.path.exists(experimentScript):
+                    runArgs = dict(analyserArgs, experiment_id=experimentID, **commonArgs)
+                    runArgs.update(containerArgs)
+                    runPaced(experimentScript, runArgs)
+                checkpoint.markDone([step])
+
+    elapsed = time.time() - startTime
+    print("Backfilled " + str(doneTrials) + " trials in " + "%.0f" % elapsed + " seconds")
+
+if __name__ == '__main__': main()
@@ -0,0 +1,77 @@
+import sys
+import json
+
+from pyspark_cassandra import CassandraSparkContext
+
+#Raw data tables bucketed by default
+defaultTables = ["environment_data", "io_data", "process", "construct"]
+
+#Delete the buckets of a raw data table of a trial bucketed before, and their rows of raw_data_buckets, so that bucketing again
+#(eg. with other raw_data_bucket_seconds) does not leave the old buckets listed. The index is deleted first, so the trial is
+#read from the raw data table until it is bucketed again
+def deleteBuckets(sc, cassandraKeyspace, table, experimentID, trialID):
+    from commons import bucketedRawTables, getRawDataBuckets, deleteRows
+
+    buckets = getRawDataBuckets(sc, cassandraKeyspace, table, experimentID, [trialID])
+    if len(buckets) == 0:
+        return
+    index = [{"experiment_id":experimentID, "trial_id":trialID, "table_name":table}]
+    if not deleteRows(sc, cassandraKeyspace, "raw_data_buckets", index):
+        raise ValueError("Trial " + trialID + " is already bucketed, deleting its buckets needs the Cassandra driver")
+    deleteRows(sc, cassandraKeyspace, bucketedRawTables[table][0], \
+               [{"experiment_id":experimentID, "trial_id":trialID, "bucket":bucket} for t, bucket, rows in buckets])
+
+#Copy the partition of a raw data table of a trial into its bucketed variant (see bucketedRawTables), replacing the buckets
+#of the trial, and return the rows of raw_data_buckets with the number of rows of each bucket and of the whole partition
+def bucketTable(sc, cassandraKeyspace, table, experimentID, trialID, bucketSeconds, hashBuckets):
+    from commons import bucketedRawTables, getRawDataBucket, rowToDict, cacheDataset, CacheScope
+
+    deleteBuckets(sc, cassandraKeyspace, table, experimentID, trialID)
+    with CacheScope():
+        dataRDD = sc.cassandraTable(cassandraKeyspace, table) \
+                .where("trial_id=? AND experiment_id=?", trialID, experimentID) \
+                .map(rowToDict) \
+                .map(lambda r: dict(r, bucket=getRawDataBucket(table, r, bucketSeconds, hashBuckets)))
+        cacheDataset(dataRDD)
+
+        dataRDD.saveToCassandra(cassandraKeyspace, bucketedRawTables[table][0])
+        buckets = dataRDD.map(lambda r: (r["bucket"], 1)) \
+                .reduceByKey(lambda a, b: a + b) \
+                .collect()
+
+    sourceRows = sum(rows for bucket, rows in buckets)
+    return [{"experiment_id":experimentID, "trial_id":trialID, "table_name":table, "bucket":bucket, "rows":rows, "source_rows":sourceRows} \
+            for bucket, rows in buckets]
+
+def main():
+    from commons import getSparkContext, getTrialIDs, ResultsWriter, startAnalyserRun, getAnalyserConfiguration, getSparkConf
+
+    # Takes arguments
+    args = json.loads(sys.argv[1])
+    experimentID = str(args["experiment_id"])
+    configFile = str(args["config_file"])
+    cassandraKeyspace = str(args["cassandra_keyspace"])
+    tables = [str(t) for t in args.get("tables", defaultTables)]
+    configuration = getAnalyserConfiguration(args.get("analyser_config_file"), __file__)
+    bucketSeconds = configuration["raw_data_bucket_seconds"]
+    hashBuckets = configuration["raw_data_hash_buckets"]
+
+    # Set configuration for spark context
+    conf = getSparkConf("Raw data bucketing")
+    sc = getSparkContext(conf)
+    trialIDs = getTrialIDs(sc, cassandraKeyspace, experimentID, args)
+    run = startAnalyserRun(sc, cassandraKeyspace, __file__, experimentID, trialIDs, args=args)
+
+    #The buckets are indexed only after the data of the table is copied, so partially bucketed trials are not read
+    writer = ResultsWriter(sc, cassandraKeyspace)
+    for trialID in trialIDs:
+        for table in tables:
+            buckets = bucketTable(sc, cassandraKeyspace, table, experimentID, trialID, bucketSeconds, hashBuckets)
+            writer.add("raw_data_buckets", buckets)
+            writer.flush()
+            print("Bucketed " + str(sum(b["rows"] for b in buckets)) + " rows of " + table + " for trial " + trialID + " in " + str(len(buckets)) + " buckets")
+
+    writer.wait()
+    run.finish()
+
+if __name__ == '__main__': main()
@@ -4,94 +4,163 @@ import json
 from datetime import timedelta
 
 from pyspark_cassandra import CassandraSparkContext
-from pyspark import SparkConf
 
-#Create the queries containg the results of the computations to pass to Cassandra
-def createQuery(sc, dataRDD, experimentID, trialID):
-    from commons import computeMode, computeMetrics
-    
-    queries = []
-    
-    filteredRDD = dataRDD.filter(lambda r: r['duration'] != None).cache()
-    
-    modeRDD = filteredRDD.map(lambda r: (r['duration'], 1)) \
-            .cache()
-                   
-    mode = computeMode(modeRDD)
-    
-    data = filteredRDD.map(lambda r: r['duration']).collect()
-    metrics = computeMetrics(data)
-    
-    queries.append({"construct_name":"all", "construct_type":"all", "experiment_id":experimentID, "trial_id":trialID, "construct_duration_mode":mode[0], \
+#Create the query with the metrics of the durations of a construct type and name ("all" for all of them)
+def createDurationQuery(consType, name, experimentID, trialID, mode, metrics):
+    return {"construct_name":name, "construct_type":consType, "experiment_id":experimentID, "trial_id":trialID, "construct_duration_mode":mode[0], \
                     "construct_duration_mode_freq":mode[1], "construct_duration_p90":metrics["p90"], "construct_duration_p99":metrics["p99"], \
                     "construct_duration_percentiles":metrics["percentiles"], \
                   "construct_duration_mean":metrics["mean"], "construct_duration_num_data_points":metrics["num_data_points"], \
                   "construct_duration_min":metrics["min"], "construct_duration_max":metrics["max"], "construct_duration_sd":metrics["sd"], "construct_duration_variance":metrics["variance"], \
                   "construct_duration_q1":metrics["q1"], "construct_duration_q2":metrics["q2"], "construct_duration_q3":metrics["q3"], "construct_duration_p95":metrics["p95"], \
-                  "construct_duration_me":metrics["me"], "construct_duration_ci095_min":metrics["ci095_min"], "construct_duration_ci095_max":metrics["ci095_max"]})
+                  "construct_duration_me":metrics["me"], "construct_duration_ci095_min":metrics["ci095_min"], "construct_duration_ci095_max":metrics["ci095_max"]}
+
+#Create the queries containg the results of the computations to pass to Cassandra
+def createQuery(sc, dataRDD, experimentID, trialID):
+    from commons import computeGroupedMetrics, computeMetrics
+    
+    queries = []
     
-    combinations = dataRDD.map(lambda a: (a["construct_type"], a["construct_name"])).distinct().collect()
+    #The durations of all the constructs (the None group) and of each combination of construct type and name are summarised in a single pass
+    results = computeGroupedMetrics(dataRDD, lambda r: [None, (r["construct_type"], r["construct_name"])], "duration")
+    
+    mode, metrics = results.pop(None, ((None, None), computeMetrics([])))
+    queries.append(createDurationQuery("all", "all", experimentID, trialID, mode, metrics))
     
     #Iterate over all combinations of construct name and type
-    for combs in combinations:
-        consType = combs[0]
-        name = combs[1]
-        
-        filteredRDD = dataRDD.filter(lambda r: r['duration'] != None and r['construct_name'] == name and r['construct_type'] == consType)
-        
-        modeRDD = filteredRDD.map(lambda r: (r['duration'], 1)) \
-            .cache()
-                   
-        mode = computeMode(modeRDD)
-        
-        data = filteredRDD.map(lambda r: r['duration']).collect()
-        metrics = computeMetrics(data)
-        
+    for (consType, name), (mode, metrics) in results.items():
         # Checking for type and name being None, in order to avoid saving a None type to the trials table
         if consType is None:
             consType = "Unspecified"
         if name is None:
             name = "Unspecified"
         
-        queries.append({"construct_name":name, "construct_type":consType, "experiment_id":experimentID, "trial_id":trialID, "construct_duration_mode":mode[0], \
-                    "construct_duration_mode_freq":mode[1], "construct_duration_p90":metrics["p90"], "construct_duration_p99":metrics["p99"], \
-                    "construct_duration_percentiles":metrics["percentiles"], \
-                  "construct_duration_mean":metrics["mean"], "construct_duration_num_data_points":metrics["num_data_points"], \
-                  "construct_duration_min":metrics["min"], "construct_duration_max":metrics["max"], "construct_duration_sd":metrics["sd"], "construct_duration_variance":metrics["variance"], \
-                  "construct_duration_q1":metrics["q1"], "construct_duration_q2":metrics["q2"], "construct_duration_q3":metrics["q3"], "construct_duration_p95":metrics["p95"], \
-                  "construct_duration_me":metrics["me"], "construct_duration_ci095_min":metrics["ci095_min"], "construct_duration_ci095_max":metrics["ci095_max"]})
+        queries.append(createDurationQuery(consType, name, experimentID, trialID, mode, metrics))
 
     return queries
 
+#Create the queries of all the trials with DataFrames: the filters, the column selection and the aggregations run in the JVM,
+#and only the metrics of each group reach Python. The percentiles are approximated (see computeMetricsDataFrame)
+def createDataFrameQueries(sc, cassandraKeyspace, srcTable, experimentID, trialIDs):
+    from commons import readTrialsDataFrame, computeMetricsDataFrame, computeModeDataFrame, computeMetrics, cacheDataset, uncacheDataset, CacheScope
+    from pyspark.sql import functions as F
+    
+    with CacheScope():
+        df = readTrialsDataFrame(sc, cassandraKeyspace, srcTable, ["source_construct_instance_id", "to_ignore", "construct_name", "construct_type", "duration"], experimentID, trialIDs) \
+                .filter(F.col("source_construct_instance_id").isNotNull() & (F.col("to_ignore") == False))
+        cacheDataset(df)
+        
+        noMetrics = computeMetrics([])
+        
+        queries = []
+        
+        #All the constructs of each trial
+        metrics = computeMetricsDataFrame(df, "duration", ["trial_id"])
+        modes = computeModeDataFrame(df, "duration", ["trial_id"])
+        for trialID in trialIDs:
+            queries.append(createDurationQuery("all", "all", experimentID, trialID, modes.get((trialID,), (None, None)), metrics.get((trialID,), noMetrics)))
+        
+        #Each combination of construct name and type of each trial
+        groupBy = ["trial_id", "construct_type", "construct_name"]
+        metrics = computeMetricsDataFrame(df, "duration", groupBy)
+        modes = computeModeDataFrame(df, "duration", groupBy)
+        for trialID, consType, name in df.select(*groupBy).distinct().collect():
+            group = (trialID, consType, name)
+            
+            # Checking for type and name being None, in order to avoid saving a None type to the trials table
+            if consType is None:
+                consType = "Unspecified"
+            if name is None:
+                name = "Unspecified"
+            
+            queries.append(createDurationQuery(consType, name, experimentID, trialID, modes.get(group, (None, None)), metrics.get(group, noMetrics)))
+        
+        uncacheDataset(df)
+        return queries
+
+#Create the queries of all the trials with a grouped map pandas UDF: the durations of each group reach Python as Arrow batches
+#and the metrics are exact, as with the RDD engine
+def createPandasQueries(sc, cassandraKeyspace, srcTable, experimentID, trialIDs):
+    from commons import readTrialsDataFrame, computeGroupedMetricsDataFrame, computeMetrics, cacheDataset, uncacheDataset, CacheScope
+    from pyspark.sql import functions as F
+    
+    with CacheScope():
+        df = readTrialsDataFrame(sc, cassandraKeyspace, srcTable, ["source_construct_instance_id", "to_ignore", "construct_name", "construct_type", "duration"], experimentID, trialIDs) \
+                .filter(F.col("source_construct_instance_id").isNotNull() & (F.col("to_ignore") == False))
+        cacheDataset(df)
+        
+        queries = []
+        
+        #All the constructs of each trial
+        results = computeGroupedMetricsDataFrame(df, "duration", ["trial_id"])
+        for trialID in trialIDs:
+            mode, metrics = results.get((trialID,), ((None, None), computeMetrics([])))
+            queries.append(createDurationQuery("all", "all", experimentID, trialID, mode, metrics))
+        
+        #Each combination of construct name and type of each trial
+        for (trialID, consType, name), (mode, metrics) in computeGroupedMetricsDataFrame(df, "duration", ["trial_id", "construct_type", "construct_name"]).items():
+            # Checking for type and name being None, in order to avoid saving a None type to the trials table
+            if consType is None:
+                consType = "Unspecified"
+            if name is None:
+                name = "Unspecified"
+            
+            queries.append(createDurationQuery(consType, name, experimentID, trialID, mode, metrics))
+        
+        uncacheDataset(df)
+        return queries
+
 def main():
+    from commons import getSparkContext, getTrialIDs, readTrials, createTrialsQueries, runExperimentAnalyser, ResultsWriter, startAnalyserRun, getAnalyserConfiguration, getSparkConf, cacheDataset
+    
     # Takes arguments
     args = json.loads(sys.argv[1])
-    trialID = str(args["trial_id"])
     experimentID = str(args["experiment_id"])
     configFile = str(args["config_file"])
     cassandraKeyspace = str(args["cassandra_keyspace"])
-    partitionsPerCore = 5
+    rawCacheDir = args.get("raw_cache_dir")
+    configuration = getAnalyserConfiguration(args.get("analyser_config_file"), __file__)
+    partitionsPerCore = configuration["partitions_per_core"]
+    engine = args.get("engine", configuration["engine"])
     
     # Set configuration for spark context
-    conf = SparkConf().setAppName("Construct duration analyser")
-    sc = CassandraSparkContext(conf=conf)
+    conf = getSparkConf("Construct duration analyser")
+    sc = getSparkContext(conf)
+    trialIDs = getTrialIDs(sc, cassandraKeyspace, experimentID, args)
+    run = startAnalyserRun(sc, cassandraKeyspace, __file__, experimentID, trialIDs, args=args, inputs=["construct"])
+    trialIDs = run.trialIDs
+    if len(trialIDs) == 0:
+        run.finish()
+        return
 
     #Source and destination tables
     srcTable = "construct"
     destTable = "trial_construct_duration"
     
-    #Retrieving data for computations
-    dataRDD = sc.cassandraTable(cassandraKeyspace, srcTable)\
-            .select("source_construct_instance_id", "to_ignore", "construct_name", "construct_type", "start_time", "duration") \
-            .where("trial_id=? AND experiment_id=?", trialID, experimentID) \
-            .filter(lambda r: r["source_construct_instance_id"] is not None and r["to_ignore"] is False) \
-            .repartition(sc.defaultParallelism * partitionsPerCore) \
-            .cache()
-    
-    #Create Cassandra table
-    query = createQuery(sc, dataRDD, experimentID, trialID)
+    if engine == "dataframe":
+        #Create Cassandra table
+        query = createDataFrameQueries(sc, cassandraKeyspace, srcTable, experimentID, trialIDs)
+    elif engine == "pandas":
+        #Create Cassandra table
+        query = createPandasQueries(sc, cassandraKeyspace, srcTable, experimentID, trialIDs)
+    else:
+        #Retrieving data for computations
+        dataRDD = readTrials(sc, cassandraKeyspace, srcTable, ["source_construct_instance_id", "to_ignore", "construct_name", "construct_type", "start_time", "duration"], experimentID, trialIDs, cacheDir=rawCacheDir) \
+                .filter(lambda r: r["source_construct_instance_id"] is not None and r["to_ignore"] is False) \
+                .repartition(sc.defaultParallelism * partitionsPerCore)
+        cacheDataset(dataRDD)
+        
+        #Create Cassandra table
+        query = createTrialsQueries(dataRDD, trialIDs, lambda trialID, trialRDD: createQuery(sc, trialRDD, experimentID, trialID))
     
     #Save to Cassandra
-    sc.parallelize(query, sc.defaultParallelism * partitionsPerCore).saveToCassandra(cassandraKeyspace, destTable)
+    writer = ResultsWriter(sc, cassandraKeyspace)
+    writer.add(destTable, query)
+    writer.wait()
+    run.finish()
+    
+    #Run the experiment analyser on the results just saved
+    if args.get("run_experiment", False) is True:
+        runExperimentAnalyser(sys.argv[0])
     
 if __name__ == '__main__': main()
\ No newline at end of file
@@ -13,22 +13,18 @@ import numpy as np
 
 from pyspark_cassandra import CassandraSparkContext
 from pyspark_cassandra import RowFormat
-from pyspark import SparkConf
 
 #Get the number of active cpu cores
 def getActiveCores(sc, cassandraKeyspace, srcTable, trialID, experimentID, containerID, hostID):
-    from commons import getHostCores
+    from commons import getHostCores, getContainerProperties
     
     cpuInfoAvailable = True
     
-    containerProperties = sc.cassandraTable(cassandraKeyspace, "container_properties") \
-            .select("cpu_set_cpus") \
-            .where("trial_id=? AND experiment_id=? AND container_id=? AND host_id=?", trialID, experimentID, containerID, hostID)
+    containerProperties = getContainerProperties(sc, cassandraKeyspace, experimentID, trialID, containerID, hostID)
             
-    if containerProperties.isEmpty():
+    if containerProperties is None:
         cpuInfoAvailable = False
     else:   
-        containerProperties = containerProperties.first()
         cpuInfoAvailable = containerProperties["cpu_set_cpus"] is not None
             
     if cpuInfoAvailable and "cpu_set_cpus" in containerProperties.keys():
@@ -47,12 +43,15 @@ def getActiveCores(sc, cassandraKeyspace, srcTable, trialID, experimentID, conta
         return nOfCpus
 
 #Create the queries containg the results of the computations to pass to Cassandra for overall cpu usage
-def createQuery(dataRDD, experimentID, trialID, containerID, containerName, hostID, nOfActiveCores):
+def createQuery(dataRDD, experimentID, trialID, containerID, containerName, hostID, nOfActiveCores, times=None):
     from commons import computeMetrics
     
-    metrics = computeMetrics(dataRDD)
-    relativeEfficency = metrics["integral"]/(metrics["max"]*metrics["num_data_points"])
-    absoluteEfficency = metrics["integral"]/(100.0*metrics["num_data_points"])
+    metrics = computeMetrics(dataRDD, times)
+    
+    #With the read times the integral is over seconds, so the efficiencies are normalised over the wall-clock duration
+    dataLength = metrics["duration"] if metrics["duration"] else metrics["num_data_points"]
+    relativeEfficency = metrics["integral"]/(metrics["max"]*dataLength)
+    absoluteEfficency = metrics["integral"]/(100.0*dataLength)
     
     query = [{"experiment_id":experimentID, "trial_id":trialID, "container_id":containerID, "container_name":containerName, "host_id":hostID, \
               "cpu_mean":metrics["mean"], "cpu_num_data_points":metrics["num_data_points"], \
@@ -66,7 +65,7 @@ def createQuery(dataRDD, experimentID, trialID, containerID, containerName, host
     return query
 
 #Create the queries containg the results of the computations to pass to Cassandra for individual cpu cores usage
-def createCoresQuery(sc, cassandraKeyspace, dataRDD, experimentID, trialID, containerID, containerName, hostID, nOfActiveCores):
+def createCoresQuery(sc, cassandraKeyspace, data, experimentID, trialID, containerID, containerName, hostID, nOfActiveCores, times=None):
     from commons import computeMetrics, getHostCores
                 
     nOfCores = getHostCores(sc, cassandraKeyspace, hostID)
@@ -96,10 +95,9 @@ def createCoresQuery(sc, cassandraKeyspace, dataRDD, experimentID, trialID, cont
     query[0]["cpu_ci095_max"] = [None]*nOfCores
     
     for i in range(nOfCores):
-        data = dataRDD.map(lambda r: r[i]) \
-                .collect()
+        coreData = [r[i] for r in data]
     
-        met = computeMetrics(data)
+        met = computeMetrics(coreData, times)
         query[0]["cpu_num_data_points"] = met["num_data_points"]
         query[0]["cpu_mean"][i] = met["mean"]
         query[0]["cpu_integral"][i] = met["integral"]
@@ -119,61 +117,85 @@ def createCoresQuery(sc, cassandraKeyspace, dataRDD, experimentID, trialID, cont
         
     return query
 
+#Create the queries for the overall and the per core cpu usage of a container, given the RDD of its environment data
+#(read_time, cpu_percent_usage and cpu_percpu_percent_usage)
+def createContainerQueries(sc, cassandraKeyspace, dataRDD, experimentID, trialID, containerID, containerName, hostID, steadyState=False):
+    from commons import filterSteadyState, collectTimeSeries
+    
+    nOfActiveCores = getActiveCores(sc, cassandraKeyspace, "environment_data", trialID, experimentID, containerID, hostID)
+    
+    cpuRDD = dataRDD.filter(lambda r: r['cpu_percent_usage'] is not None)
+    coresRDD = dataRDD.filter(lambda r: r['cpu_percpu_percent_usage'] is not None)
+    
+    #The per core usage uses the same steady state window of the overall cpu usage
+    if steadyState:
+        cpuRDD = filterSteadyState(sc, cassandraKeyspace, cpuRDD, experimentID, trialID, containerID, hostID, "cpu_percent_usage")
+        coresRDD = filterSteadyState(sc, cassandraKeyspace, coresRDD, experimentID, trialID, containerID, hostID, "cpu_percent_usage")
+    
+    times, data = collectTimeSeries(cpuRDD, "read_time", "cpu_percent_usage")
+    query = createQuery(data, experimentID, trialID, containerID, containerName, hostID, nOfActiveCores, times)
+    
+    times, data = collectTimeSeries(coresRDD, "read_time", "cpu_percpu_percent_usage")
+    coresQuery = createCoresQuery(sc, cassandraKeyspace, data, experimentID, trialID, containerID, containerName, hostID, nOfActiveCores, times)
+    
+    return (query, coresQuery)
+
 def main():
+    from commons import getSparkContext, getTrialIDs, readTrials, runExperimentAnalyser, ResultsWriter, startAnalyserRun, getAnalyserConfiguration, getSparkConf, cacheDataset, uncacheDataset
+    
     # Takes arguments
     args = json.loads(sys.argv[1])
-    trialID = str(args["trial_id"])
     experimentID = str(args["experiment_id"])
     configFile = str(args["config_file"])
     containerID = str(args["container_id"])
     containerName = str(args["container_name"])
     hostID = str(args["host_id"])
     cassandraKeyspace = str(args["cassandra_keyspace"])
-    partitionsPerCore = 5
+    rawCacheDir = args.get("raw_cache_dir")
+    steadyState = args.get("steady_state", False) is True
+    configuration = getAnalyserConfiguration(args.get("analyser_config_file"), __file__)
+    partitionsPerCore = configuration["partitions_per_core"]
     
     # Set configuration for spark context
-    conf = SparkConf().setAppName("Cpu analyser")
-    sc = CassandraSparkContext(conf=conf)
+    conf = getSparkConf("Cpu analyser")
+    sc = getSparkContext(conf)
+    trialIDs = getTrialIDs(sc, cassandraKeyspace, experimentID, args)
+    run = startAnalyserRun(sc, cassandraKeyspace, __file__, experimentID, trialIDs, args=args, inputs=["environment_data", "container_properties", "host_properties", "trial_steady_state"])
+    trialIDs = run.trialIDs
+    if len(trialIDs) == 0:
+        run.finish()
+        return
     
     #Source and destination tables
     srcTable = "environment_data"
     destTable = "trial_cpu"
     destTableCore = "trial_cpu_core"
     
-    nOfActiveCores = getActiveCores(sc, cassandraKeyspace, srcTable, trialID, experimentID, containerID, hostID)
-    
-    #Retrieving data for computations
-    dataRDD = sc.cassandraTable(cassandraKeyspace, srcTable) \
-            .select("cpu_percent_usage") \
-            .where("trial_id=? AND experiment_id=? AND container_id=? AND host_id=?", trialID, experimentID, containerID, hostID) \
-            .filter(lambda r: r['cpu_percent_usage'] is not None) \
-            .map(lambda r: r['cpu_percent_usage']) \
-            .repartition(sc.defaultParallelism * partitionsPerCore) \
-            .collect()
-    
-    #Create Cassandra query for overall cpu usage
-    query = createQuery(dataRDD, experimentID, trialID, containerID, containerName, hostID, nOfActiveCores)
+    #Retrieving the data for both the overall and the per core usage in a single read
+    dataRDD = readTrials(sc, cassandraKeyspace, srcTable, ["read_time", "cpu_percent_usage", "cpu_percpu_percent_usage"], experimentID, trialIDs, \
+                         [("container_id", containerID), ("host_id", hostID)], cacheDir=rawCacheDir) \
+            .repartition(sc.defaultParallelism * partitionsPerCore)
+    cacheDataset(dataRDD)
+    
+    #Create Cassandra queries for overall and per cpu core usage
+    query = []
+    coresQuery = []
+    for trialID in trialIDs:
+        trialRDD = dataRDD.filter(lambda r: r["trial_id"] == trialID) if len(trialIDs) > 1 else dataRDD
+        trialQuery, trialCoresQuery = createContainerQueries(sc, cassandraKeyspace, trialRDD, experimentID, trialID, containerID, containerName, hostID, steadyState)
+        query += trialQuery
+        coresQuery += trialCoresQuery
+    uncacheDataset(dataRDD)
     
     #Save to Cassandra
-    sc.parallelize(query, sc.defaultParallelism * partitionsPerCore).saveToCassandra(cassandraKeyspace, destTable)
-    
-    
-    ###################################################################################################################
-    
-    
-     #Retrieving data for computations
-    dataRDD = sc.cassandraTable(cassandraKeyspace, srcTable) \
-            .select("cpu_percpu_percent_usage") \
-            .where("trial_id=? AND experiment_id=? AND container_id=? AND host_id=?", trialID, experimentID, containerID, hostID) \
-            .filter(lambda r: r['cpu_percpu_percent_usage'] is not None) \
-            .map(lambda r: r['cpu_percpu_percent_usage']) \
-            .repartition(sc.defaultParallelism * partitionsPerCore) \
-            .cache()
-    
-    #Create Cassandra query for per cpu core usage
-    query = createCoresQuery(sc, cassandraKeyspace, dataRDD, experimentID, trialID, containerID, containerName, hostID, nOfActiveCores)
-      
-    #Save to Cassandra 
-    sc.parallelize(query, sc.defaultParallelism * partitionsPerCore).saveToCassandra(cassandraKeyspace, destTableCore)
+    writer = ResultsWriter(sc, cassandraKeyspace)
+    writer.add(destTable, query)
+    writer.add(destTableCore, coresQuery)
+    writer.wait()
+    run.finish()
+    
+    #Run the experiment analyser on the results just saved
+    if args.get("run_experiment", False) is True:
+        runExperimentAnalyser(sys.argv[0])
     
 if __name__ == '__main__': main()
\ No newline at end of file
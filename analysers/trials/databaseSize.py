@@ -7,7 +7,6 @@ import uuid
 from datetime import timedelta
 
 from pyspark_cassandra import CassandraSparkContext
-from pyspark import SparkConf
 
 #Compute overall database size
 def databaseSize(dataRDD):
@@ -24,33 +23,66 @@ def createQuery(dataRDD, experimentID, trialID):
     size = databaseSize(dataRDD)
     return [{"experiment_id":experimentID, "trial_id":trialID, "size":size}]
 
+#Create the queries summing the database sizes in Cassandra, without reading the rows. Returns None without the Cassandra driver
+def createAggregateQuery(sc, cassandraKeyspace, srcTable, experimentID, trialID):
+    from commons import aggregatePartition
+    
+    result = aggregatePartition(sc, cassandraKeyspace, srcTable, [("sum", "size"), ("count", "size")], \
+                                [("experiment_id", experimentID), ("trial_id", trialID)])
+    if result is None:
+        return None
+    size, count = result[None]
+    return [{"experiment_id":experimentID, "trial_id":trialID, "size":size if count > 0 else None}]
+
 def main():
+    from commons import getSparkContext, getTrialIDs, readTrials, createTrialsQueries, runExperimentAnalyser, ResultsWriter, getCassandraSession, startAnalyserRun, getAnalyserConfiguration, getSparkConf, cacheDataset
+    
     # Takes arguments
     args = json.loads(sys.argv[1])
-    trialID = str(args["trial_id"])
     experimentID = str(args["experiment_id"])
     configFile = str(args["config_file"])
     cassandraKeyspace = str(args["cassandra_keyspace"])
-    partitionsPerCore = 5
+    rawCacheDir = args.get("raw_cache_dir")
+    configuration = getAnalyserConfiguration(args.get("analyser_config_file"), __file__)
+    partitionsPerCore = configuration["partitions_per_core"]
     
     # Set configuration for spark context
-    conf = SparkConf().setAppName("Database size analyser")
-    sc = CassandraSparkContext(conf=conf)
+    conf = getSparkConf("Database size analyser")
+    sc = getSparkContext(conf)
+    trialIDs = getTrialIDs(sc, cassandraKeyspace, experimentID, args)
+    run = startAnalyserRun(sc, cassandraKeyspace, __file__, experimentID, trialIDs, args=args, inputs=["database_sizes"])
+    trialIDs = run.trialIDs
+    if len(trialIDs) == 0:
+        run.finish()
+        return
 
     #Source and destination tables
     srcTable = "database_sizes"
     destTable = "trial_byte_size"
     
-    #Obtain data for the computations
-    dataRDD = sc.cassandraTable(cassandraKeyspace, srcTable) \
-            .select("size") \
-            .where("trial_id=? AND experiment_id=?", trialID, experimentID) \
-            .repartition(sc.defaultParallelism * partitionsPerCore)
-    
-    #Create query for Cassandra
-    query = createQuery(dataRDD, experimentID, trialID)
+    #The raw cache is read with Spark when given, as it spares the reads from Cassandra
+    if rawCacheDir is None and getCassandraSession(sc) is not None:
+        #Create query for Cassandra, aggregating in Cassandra
+        query = []
+        for trialID in trialIDs:
+            query += createAggregateQuery(sc, cassandraKeyspace, srcTable, experimentID, trialID)
+    else:
+        #Obtain data for the computations
+        dataRDD = readTrials(sc, cassandraKeyspace, srcTable, ["size"], experimentID, trialIDs, cacheDir=rawCacheDir) \
+                .repartition(sc.defaultParallelism * partitionsPerCore)
+        cacheDataset(dataRDD)
+        
+        #Create query for Cassandra
+        query = createTrialsQueries(dataRDD, trialIDs, lambda trialID, trialRDD: createQuery(trialRDD, experimentID, trialID))
     
     # Saves to Cassandra
-    sc.parallelize(query, sc.defaultParallelism * partitionsPerCore).saveToCassandra(cassandraKeyspace, destTable)
+    writer = ResultsWriter(sc, cassandraKeyspace)
+    writer.add(destTable, query)
+    writer.wait()
+    run.finish()
+    
+    #Run the experiment analyser on the results just saved
+    if args.get("run_experiment", False) is True:
+        runExperimentAnalyser(sys.argv[0])
     
 if __name__ == '__main__': main()
\ No newline at end of file
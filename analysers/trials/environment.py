@@ -0,0 +1,74 @@
+import os
+import sys
+import json
+
+from pyspark_cassandra import CassandraSparkContext
+
+#Columns of environment_data needed by the cpu, per core cpu and ram computations
+environmentColumns = ["read_time", "cpu_percent_usage", "cpu_percpu_percent_usage", "memory_usage"]
+
+#Create the queries for the cpu, per core cpu and ram usage of a container from the RDD with all its environment data.
+#Returns a dictionary with the queries for each destination table
+def createQueries(sc, cassandraKeyspace, dataRDD, experimentID, trialID, containerID, containerName, hostID, steadyState=False):
+    import cpu
+    import ram
+
+    query, coresQuery = cpu.createContainerQueries(sc, cassandraKeyspace, dataRDD, experimentID, trialID, containerID, containerName, hostID, steadyState)
+    ramQuery = ram.createContainerQuery(sc, cassandraKeyspace, dataRDD, experimentID, trialID, containerID, containerName, hostID, steadyState)
+
+    return {"trial_cpu":query, "trial_cpu_core":coresQuery, "trial_ram":ramQuery}
+
+def main():
+    from commons import getSparkContext, getTrialIDs, readTrials, runExperimentAnalyser, ResultsWriter, startAnalyserRun, getAnalyserConfiguration, getSparkConf, cacheDataset, uncacheDataset
+
+    # Takes arguments
+    args = json.loads(sys.argv[1])
+    experimentID = str(args["experiment_id"])
+    configFile = str(args["config_file"])
+    containerID = str(args["container_id"])
+    containerName = str(args["container_name"])
+    hostID = str(args["host_id"])
+    cassandraKeyspace = str(args["cassandra_keyspace"])
+    rawCacheDir = args.get("raw_cache_dir")
+    steadyState = args.get("steady_state", False) is True
+    configuration = getAnalyserConfiguration(args.get("analyser_config_file"), __file__)
+    partitionsPerCore = configuration["partitions_per_core"]
+
+    # Set configuration for spark context
+    conf = getSparkConf("Environment stats trial analyser")
+    sc = getSparkContext(conf)
+    trialIDs = getTrialIDs(sc, cassandraKeyspace, experimentID, args)
+    run = startAnalyserRun(sc, cassandraKeyspace, __file__, experimentID, trialIDs, args=args, inputs=["environment_data", "container_properties", "host_properties", "trial_steady_state"])
+    trialIDs = run.trialIDs
+    if len(trialIDs) == 0:
+        run.finish()
+        return
+
+    #Source table
+    srcTable = "environment_data"
+
+    #Obtain all the data for the computations in a single read of the container partition
+    dataRDD = readTrials(sc, cassandraKeyspace, srcTable, environmentColumns, experimentID, trialIDs, \
+                         [("container_id", containerID), ("host_id", hostID)], cacheDir=rawCacheDir) \
+            .repartition(sc.defaultParallelism * partitionsPerCore)
+    cacheDataset(dataRDD)
+
+    #Create the Cassandra queries of all the trials, written together per table
+    writer = ResultsWriter(sc, cassandraKeyspace)
+    for trialID in trialIDs:
+        trialRDD = dataRDD.filter(lambda r: r["trial_id"] == trialID) if len(trialIDs) > 1 else dataRDD
+        trialQueries = createQueries(sc, cassandraKeyspace, trialRDD, experimentID, trialID, containerID, containerName, hostID, steadyState)
+        for destTable, query in trialQueries.items():
+            writer.add(destTable, query)
+    uncacheDataset(dataRDD)
+
+    #Save to Cassandra
+    writer.wait()
+    run.finish()
+
+    #Run the cpu and ram experiment analysers on the results just saved
+    if args.get("run_experiment", False) is True:
+        for name in ["cpu.py", "ram.py"]:
+            runExperimentAnalyser(os.path.join(os.path.dirname(sys.argv[0]), name))
+
+if __name__ == '__main__': main()
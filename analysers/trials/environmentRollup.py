@@ -0,0 +1,97 @@
+import sys
+import json
+
+from datetime import datetime
+
+import numpy as np
+
+from pyspark_cassandra import CassandraSparkContext
+
+#Metrics of the environment data that are rolled up, and the default sizes (in seconds) of the tumbling windows
+rollupMetrics = ["cpu_percent_usage", "memory_usage"]
+defaultWindowSizes = [1, 10, 60]
+
+#Compute the tumbling window rollups (min, max, mean, p95 and number of data points) of the environment data of all the
+#containers, for all the window sizes, in one pass over the data. If trialField is given the windows are computed separately
+#for each trial of the RDD, in the same pass, and the rollups have its trial_id
+def computeRollups(dataRDD, windowSizes, metrics=rollupMetrics, trialField=None):
+    from commons import parseReadTime
+
+    #Assign each value to its window for every window size
+    def assignWindows(r):
+        readTime = parseReadTime(r["read_time"])
+        if readTime is None:
+            return
+        for metric in metrics:
+            if r[metric] is None:
+                continue
+            for windowSize in windowSizes:
+                windowStart = int(readTime // windowSize) * windowSize
+                yield ((r["container_id"], r["host_id"], metric, windowSize, windowStart, \
+                        r[trialField] if trialField is not None else None), r[metric])
+
+    def summariseWindow(window):
+        key, values = window
+        values = np.fromiter(values, dtype=np.float64)
+        rollup = {"container_id":key[0], "host_id":key[1], "metric":key[2], "window_size":key[3], \
+                  "window_start":datetime.utcfromtimestamp(key[4]), \
+                  "min":np.min(values).item(), "max":np.max(values).item(), "mean":np.mean(values).item(), \
+                  "p95":np.percentile(values, 95).item(), "num_data_points":len(values)}
+        if trialField is not None:
+            rollup["trial_id"] = key[5]
+        return rollup
+
+    return dataRDD.flatMap(assignWindows) \
+            .groupByKey() \
+            .map(summariseWindow)
+
+#Create the queries containg the results of the computations to pass to Cassandra, for all the trials of the data
+def createQueries(dataRDD, experimentID, windowSizes):
+    def addExperiment(r):
+        r["experiment_id"] = experimentID
+        return r
+
+    return computeRollups(dataRDD, windowSizes, trialField="trial_id") \
+            .map(addExperiment)
+
+def main():
+    from commons import getSparkContext, getTrialIDs, readTrials, startAnalyserRun, getAnalyserConfiguration, getSparkConf, ResultsWriter
+
+    # Takes arguments
+    args = json.loads(sys.argv[1])
+    experimentID = str(args["experiment_id"])
+    configFile = str(args["config_file"])
+    cassandraKeyspace = str(args["cassandra_keyspace"])
+    rawCacheDir = args.get("raw_cache_dir")
+    windowSizes = [int(w) for w in args.get("rollup_windows", defaultWindowSizes)]
+    configuration = getAnalyserConfiguration(args.get("analyser_config_file"), __file__)
+    partitionsPerCore = configuration["partitions_per_core"]
+
+    # Set configuration for spark context
+    conf = getSparkConf("Environment rollup trial analyser")
+    sc = getSparkContext(conf)
+    trialIDs = getTrialIDs(sc, cassandraKeyspace, experimentID, args)
+    run = startAnalyserRun(sc, cassandraKeyspace, __file__, experimentID, trialIDs, args=args, inputs=["environment_data"])
+    trialIDs = run.trialIDs
+    if len(trialIDs) == 0:
+        run.finish()
+        return
+
+    #Source and destination tables
+    srcTable = "environment_data"
+    destTable = "trial_environment_rollup"
+
+    #Obtain data of all the containers of the trial for computations
+    dataRDD = readTrials(sc, cassandraKeyspace, srcTable, ["container_id", "host_id", "read_time", "cpu_percent_usage", "memory_usage"], experimentID, trialIDs, cacheDir=rawCacheDir) \
+            .repartition(sc.defaultParallelism * partitionsPerCore)
+
+    #Create the rollups for Cassandra, the rollups of all the trials in a single pass over the data
+    queries = createQueries(dataRDD, experimentID, windowSizes).collect()
+
+    #Save to Cassandra
+    writer = ResultsWriter(sc, cassandraKeyspace)
+    writer.add(destTable, queries)
+    writer.wait()
+    run.finish()
+
+if __name__ == '__main__': main()
@@ -4,7 +4,6 @@ import json
 from datetime import timedelta
 
 from pyspark_cassandra import CassandraSparkContext
-from pyspark import SparkConf
 
 #Compute the execution time
 def computeExecutionTime(dataRDD):
@@ -48,34 +47,52 @@ def createQuery(sc, dataRDD, experimentID, trialID):
     return queries
 
 def main():
+    from commons import markNInitialProcesses, getSparkContext, getTrialIDs, readTrials, createTrialsQueries, runExperimentAnalyser, ResultsWriter, startAnalyserRun, getAnalyserConfiguration, getSparkConf, cacheDataset
+    
     # Takes arguments
     args = json.loads(sys.argv[1])
-    trialID = str(args["trial_id"])
     experimentID = str(args["experiment_id"])
     configFile = str(args["config_file"])
     cassandraKeyspace = str(args["cassandra_keyspace"])
-    partitionsPerCore = 5
+    rawCacheDir = args.get("raw_cache_dir")
+    processesToIgnore = int(args.get("processes_to_ignore", 0))
+    configuration = getAnalyserConfiguration(args.get("analyser_config_file"), __file__)
+    partitionsPerCore = configuration["partitions_per_core"]
     
     # Set configuration for spark context
-    conf = SparkConf().setAppName("Process execution time trial analyser")
-    sc = CassandraSparkContext(conf=conf)
+    conf = getSparkConf("Process execution time trial analyser")
+    sc = getSparkContext(conf)
+    trialIDs = getTrialIDs(sc, cassandraKeyspace, experimentID, args)
+    run = startAnalyserRun(sc, cassandraKeyspace, __file__, experimentID, trialIDs, args=args, inputs=["process"])
+    trialIDs = run.trialIDs
+    if len(trialIDs) == 0:
+        run.finish()
+        return
 
     #Source and destination tables
     srcTable = "process"
     destTable = "trial_execution_time"
     
     #Obtain data for the computations
-    dataRDD = sc.cassandraTable(cassandraKeyspace, srcTable)\
-            .select("process_name", "to_ignore", "source_process_instance_id", "start_time", "end_time", "duration") \
-            .where("trial_id=? AND experiment_id=?", trialID, experimentID) \
+    dataRDD = readTrials(sc, cassandraKeyspace, srcTable, ["process_name", "to_ignore", "source_process_instance_id", "start_time", "end_time", "duration"], experimentID, trialIDs, cacheDir=rawCacheDir)
+    
+    #Mark the warm-up processes of each trial to be ignored
+    dataRDD = markNInitialProcesses(dataRDD, processesToIgnore, "process_name", "trial_id") \
             .filter(lambda r: r["process_name"] is not None and r["to_ignore"] is False) \
-            .repartition(sc.defaultParallelism * partitionsPerCore) \
-            .cache()
+            .repartition(sc.defaultParallelism * partitionsPerCore)
+    cacheDataset(dataRDD)
     
     #Create query for Cassandra
-    query = createQuery(sc, dataRDD, experimentID, trialID)
+    query = createTrialsQueries(dataRDD, trialIDs, lambda trialID, trialRDD: createQuery(sc, trialRDD, experimentID, trialID))
     
     #Save to Cassandra
-    sc.parallelize(query, sc.defaultParallelism * partitionsPerCore).saveToCassandra(cassandraKeyspace, destTable)
+    writer = ResultsWriter(sc, cassandraKeyspace)
+    writer.add(destTable, query)
+    writer.wait()
+    run.finish()
+    
+    #Run the experiment analyser on the results just saved
+    if args.get("run_experiment", False) is True:
+        runExperimentAnalyser(sys.argv[0])
     
 if __name__ == '__main__': main()
\ No newline at end of file
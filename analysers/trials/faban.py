@@ -4,72 +4,91 @@ import json
 from datetime import timedelta
 
 from pyspark_cassandra import CassandraSparkContext
-from pyspark import SparkConf
 
 #Create the queries containg the results of the computations to pass to Cassandra
-def createQuery(sc, cassandraKeyspace, srcTable, experimentID, trialID, containerID, hostID, partitionsPerCore):
-    from commons import computeMode, computeMetrics
+def createQuery(sc, cassandraKeyspace, srcTable, experimentID, trialID, containerID, hostID, partitionsPerCore, cacheDir=None):
+    from commons import computeGroupedMetrics, computeMetrics, readTrials, cacheDataset, uncacheDataset, CacheScope
     
-    queries = []
-    
-    #Obtain data for computations
-    dataRDD = sc.cassandraTable(cassandraKeyspace, srcTable) \
-            .select("value", "section", "host", "op_name") \
-            .where("trial_id=? AND experiment_id=?", trialID, experimentID) \
-            .repartition(sc.defaultParallelism * partitionsPerCore) \
-            .cache() \
-            
-    hosts = dataRDD.map(lambda a: a["host"]).distinct().collect()
-    hosts.append("aggregate")
-    operations = dataRDD.map(lambda a: a["op_name"]).distinct().collect()
-    sections = ["WebDriver Throughput", "WebDriver Response Times"]
-    
-    #Iterate over hosts, sections and operations
-    for host in hosts:
-        for section in sections:
-            for operation in operations:
-                modeRDD = dataRDD.filter(lambda r: r["value"] is not None and r["host"] == host and r["op_name"] == operation and section in r["section"]) \
-                                 .map(lambda r: (r['value'], 1)) \
-                
-                mode = computeMode(modeRDD)
+    with CacheScope():
+        queries = []
+        
+        #Obtain data for computations
+        dataRDD = readTrials(sc, cassandraKeyspace, srcTable, ["value", "section", "host", "op_name"], experimentID, [trialID], cacheDir=cacheDir) \
+                .repartition(sc.defaultParallelism * partitionsPerCore)
+        cacheDataset(dataRDD)
                 
-                data = dataRDD.map(lambda x: x['value']).collect()
-                 
-                metrics = computeMetrics(data)
-                
-                queries.append({"experiment_id":experimentID, "trial_id":trialID, "faban_details_host":host, "faban_details_op_name":operation, "faban_details_section":section, \
-                          "faban_details_mode":mode[0], "faban_details_mode_freq":mode[1], "faban_details_integral":metrics["integral"], \
-                          "faban_details_mean":metrics["mean"], "faban_details_num_data_points":metrics["num_data_points"], \
-                          "faban_details_min":metrics["min"], "faban_details_max":metrics["max"], "faban_details_sd":metrics["sd"], "faban_details_variance":metrics["variance"], \
-                          "faban_details_q1":metrics["q1"], "faban_details_q2":metrics["q2"], "faban_details_q3":metrics["q3"], "faban_details_p95":metrics["p95"], \
-                          "faban_details_p99":metrics["p99"], "faban_details_p90":metrics["p90"], "faban_details_percentiles":metrics["percentiles"], \
-                          "faban_details_me":metrics["me"], "faban_details_ci095_min":metrics["ci095_min"], "faban_details_ci095_max":metrics["ci095_max"]})
-    return queries
+        hosts = dataRDD.map(lambda a: a["host"]).distinct().collect()
+        hosts.append("aggregate")
+        operations = dataRDD.map(lambda a: a["op_name"]).distinct().collect()
+        sections = ["WebDriver Throughput", "WebDriver Response Times"]
+        
+        #Each value is in the group of its host, section and operation, and in the aggregate one of its section and operation.
+        #All the groups are summarised in a single pass over the data
+        def groups(r):
+            if r["section"] is None:
+                return []
+            return [(host, section, r["op_name"]) for section in sections if section in r["section"] for host in [r["host"], "aggregate"]]
+        
+        results = computeGroupedMetrics(dataRDD, groups, "value")
+        uncacheDataset(dataRDD)
+        
+        #Iterate over hosts, sections and operations
+        for host in hosts:
+            for section in sections:
+                for operation in operations:
+                    mode, metrics = results.get((host, section, operation), ((None, None), computeMetrics([])))
+                    
+                    queries.append({"experiment_id":experimentID, "trial_id":trialID, "faban_details_host":host, "faban_details_op_name":operation, "faban_details_section":section, \
+                              "faban_details_mode":mode[0], "faban_details_mode_freq":mode[1], "faban_details_integral":metrics["integral"], \
+                              "faban_details_mean":metrics["mean"], "faban_details_num_data_points":metrics["num_data_points"], \
+                              "faban_details_min":metrics["min"], "faban_details_max":metrics["max"], "faban_details_sd":metrics["sd"], "faban_details_variance":metrics["variance"], \
+                              "faban_details_q1":metrics["q1"], "faban_details_q2":metrics["q2"], "faban_details_q3":metrics["q3"], "faban_details_p95":metrics["p95"], \
+                              "faban_details_p99":metrics["p99"], "faban_details_p90":metrics["p90"], "faban_details_percentiles":metrics["percentiles"], \
+                              "faban_details_me":metrics["me"], "faban_details_ci095_min":metrics["ci095_min"], "faban_details_ci095_max":metrics["ci095_max"]})
+        return queries
 
 def main():
+    from commons import getSparkContext, getTrialIDs, runExperimentAnalyser, ResultsWriter, startAnalyserRun, getAnalyserConfiguration, getSparkConf
+    
     #Takes arguments
     args = json.loads(sys.argv[1])
-    trialID = str(args["trial_id"])
     experimentID = str(args["experiment_id"])
     configFile = str(args["config_file"])
     containerID = str(args["container_id"])
     hostID = str(args["host_id"])
     cassandraKeyspace = str(args["cassandra_keyspace"])
-    partitionsPerCore = 5
+    rawCacheDir = args.get("raw_cache_dir")
+    configuration = getAnalyserConfiguration(args.get("analyser_config_file"), __file__)
+    partitionsPerCore = configuration["partitions_per_core"]
     
     # Set configuration for spark context
-    conf = SparkConf().setAppName("Faban trial analyser")
-    sc = CassandraSparkContext(conf=conf)
+    conf = getSparkConf("Faban trial analyser")
+    sc = getSparkContext(conf)
+    trialIDs = getTrialIDs(sc, cassandraKeyspace, experimentID, args)
+    run = startAnalyserRun(sc, cassandraKeyspace, __file__, experimentID, trialIDs, args=args, inputs=["faban_details"])
+    trialIDs = run.trialIDs
+    if len(trialIDs) == 0:
+        run.finish()
+        return
 
     #Source and destination tables
     srcTable = "faban_details"
     destTable = "trial_faban_details"
     
     #Create Cassandra query
-    query = createQuery(sc, cassandraKeyspace, srcTable, experimentID, trialID, containerID, hostID, partitionsPerCore)
+    query = []
+    for trialID in trialIDs:
+        query += createQuery(sc, cassandraKeyspace, srcTable, experimentID, trialID, containerID, hostID, partitionsPerCore, rawCacheDir)
     
     #Save to Cassandra
-    sc.parallelize(query, sc.defaultParallelism * partitionsPerCore).saveToCassandra(cassandraKeyspace, destTable)
+    writer = ResultsWriter(sc, cassandraKeyspace)
+    writer.add(destTable, query)
+    writer.wait()
+    run.finish()
+    
+    #Run the experiment analyser on the results just saved
+    if args.get("run_experiment", False) is True:
+        runExperimentAnalyser(sys.argv[0])
     
 if __name__ == '__main__':
     main()
\ No newline at end of file
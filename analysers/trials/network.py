@@ -0,0 +1,126 @@
+import sys
+import json
+
+import numpy as np
+
+from pyspark_cassandra import CassandraSparkContext
+
+#Cumulative counters of the network interfaces, as named in network_interface_data without the network_ prefix
+networkCounters = ["rx_bytes", "tx_bytes", "rx_packets", "tx_packets", "rx_dropped", "tx_dropped", "rx_errors", "tx_errors"]
+
+#Compute the rates per second of the cumulative counters of an interface, given the sorted read times and the counters
+#at each read time. All the counters are computed at once; intervals without time progress and counter resets are dropped
+def computeRates(times, counters):
+    if len(times) < 2:
+        return dict((c, np.array([], dtype=np.float64)) for c in networkCounters)
+
+    values = np.array(counters, dtype=np.float64)
+    intervals = np.diff(times)
+    deltas = np.diff(values, axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rates = deltas / intervals[:, np.newaxis]
+
+    result = {}
+    for i, counter in enumerate(networkCounters):
+        valid = (intervals > 0) & (deltas[:, i] >= 0)
+        result[counter] = rates[valid, i]
+    return result
+
+#Compute the metrics of the rates of every counter of every interface. The samples of each interface are sorted by read time
+#in their partition, and the rates are computed there, so hosts with many interfaces are spread over the executors
+def computeInterfaceMetrics(envRDD, networkRDD):
+    from commons import computeMetrics, sortTimeSeries
+
+    #Environment data points to the samples of the interfaces read at that time
+    samplesRDD = envRDD.filter(lambda r: r["network_interfaces"] is not None and r["read_time"] is not None) \
+            .flatMap(lambda r: [(dataID, (name, r["read_time"])) for name, dataID in r["network_interfaces"].items()])
+
+    countersRDD = networkRDD.map(lambda r: (r["network_interface_data_id"], [r["network_" + c] for c in networkCounters]))
+
+    seriesRDD = samplesRDD.join(countersRDD) \
+            .map(lambda x: (x[1][0][0], (x[1][0][1], x[1][1])))
+
+    def interfaceMetrics(series):
+        times, counters = series
+        rates = computeRates(times, counters)
+        return [(counter, computeMetrics(rates[counter])) for counter in networkCounters]
+
+    return sortTimeSeries(seriesRDD) \
+            .flatMapValues(interfaceMetrics) \
+            .collect()
+
+#Create the queries containg the results of the computations to pass to Cassandra
+def createQueries(envRDD, networkRDD, experimentID, trialID, containerID, containerName, hostID):
+    queries = []
+    for interface, (counter, metrics) in computeInterfaceMetrics(envRDD, networkRDD):
+        queries.append({"experiment_id":experimentID, "trial_id":trialID, "container_id":containerID, "container_name":containerName, "host_id":hostID, \
+                        "network_interface_name":interface, "counter":counter, \
+                        "rate_mean":metrics["mean"], "rate_num_data_points":metrics["num_data_points"], "rate_integral":metrics["integral"], \
+                        "rate_min":metrics["min"], "rate_max":metrics["max"], "rate_sd":metrics["sd"], "rate_variance":metrics["variance"], \
+                        "rate_q1":metrics["q1"], "rate_q2":metrics["q2"], "rate_q3":metrics["q3"], "rate_p95":metrics["p95"], \
+                        "rate_me":metrics["me"], "rate_ci095_min":metrics["ci095_min"], "rate_ci095_max":metrics["ci095_max"], \
+                        "rate_p90":metrics["p90"], "rate_p99":metrics["p99"], "rate_percentiles":metrics["percentiles"]})
+    return queries
+
+def main():
+    from commons import getSparkContext, getTrialIDs, readTrials, runExperimentAnalyser, ResultsWriter, startAnalyserRun, getAnalyserConfiguration, getSparkConf, cacheDataset
+
+    # Takes arguments
+    args = json.loads(sys.argv[1])
+    experimentID = str(args["experiment_id"])
+    configFile = str(args["config_file"])
+    containerID = str(args["container_id"])
+    containerName = str(args["container_name"])
+    hostID = str(args["host_id"])
+    cassandraKeyspace = str(args["cassandra_keyspace"])
+    rawCacheDir = args.get("raw_cache_dir")
+    configuration = getAnalyserConfiguration(args.get("analyser_config_file"), __file__)
+    partitionsPerCore = configuration["partitions_per_core"]
+
+    # Set configuration for spark context
+    conf = getSparkConf("Network trial analyser")
+    sc = getSparkContext(conf)
+    trialIDs = getTrialIDs(sc, cassandraKeyspace, experimentID, args)
+    run = startAnalyserRun(sc, cassandraKeyspace, __file__, experimentID, trialIDs, args=args, inputs=["environment_data", "network_interface_data"])
+    trialIDs = run.trialIDs
+    if len(trialIDs) == 0:
+        run.finish()
+        return
+
+    #Source and destination tables
+    envTable = "environment_data"
+    srcTable = "network_interface_data"
+    destTable = "trial_network"
+
+    clusteringKeys = [("container_id", containerID), ("host_id", hostID)]
+
+    #Obtain data for computations
+    envRDD = readTrials(sc, cassandraKeyspace, envTable, ["read_time", "network_interfaces"], experimentID, trialIDs, clusteringKeys, cacheDir=rawCacheDir) \
+            .repartition(sc.defaultParallelism * partitionsPerCore)
+
+    networkRDD = readTrials(sc, cassandraKeyspace, srcTable, ["network_interface_data_id"] + ["network_" + c for c in networkCounters], \
+                            experimentID, trialIDs, clusteringKeys, cacheDir=rawCacheDir) \
+            .repartition(sc.defaultParallelism * partitionsPerCore)
+
+    if len(trialIDs) > 1:
+        cacheDataset(envRDD)
+        cacheDataset(networkRDD)
+
+    #Create Cassandra queries
+    queries = []
+    for trialID in trialIDs:
+        trialEnvRDD = envRDD.filter(lambda r: r["trial_id"] == trialID)
+        trialNetworkRDD = networkRDD.filter(lambda r: r["trial_id"] == trialID)
+        queries += createQueries(trialEnvRDD, trialNetworkRDD, experimentID, trialID, containerID, containerName, hostID)
+
+    #Save to Cassandra
+    writer = ResultsWriter(sc, cassandraKeyspace)
+    writer.add(destTable, queries)
+    writer.wait()
+    run.finish()
+
+    #Run the experiment analyser on the results just saved
+    if args.get("run_experiment", False) is True:
+        runExperimentAnalyser(sys.argv[0])
+
+if __name__ == '__main__': main()
@@ -7,54 +7,77 @@ import uuid
 from datetime import timedelta
 
 from pyspark_cassandra import CassandraSparkContext
-from pyspark import SparkConf
 
 #Create the queries containg the results of the computations to pass to Cassandra
-def createQuery(sc, cassandraKeyspace, srcTable, experimentID, trialID, partitionsPerCore):
-    queries = []
+def createQuery(sc, cassandraKeyspace, srcTable, experimentID, trialID, partitionsPerCore, processesToIgnore=0, cacheDir=None):
+    from commons import markNInitialProcesses, readTrials, cacheDataset, CacheScope
     
-    #Obtain data for computations
-    dataRDD = sc.cassandraTable(cassandraKeyspace, srcTable) \
-            .select("process_name", "source_process_instance_id", "to_ignore", "start_time", "duration") \
-            .where("trial_id=? AND experiment_id=?", trialID, experimentID) \
-            .filter(lambda r: r["process_name"] is not None and r["to_ignore"] is False) \
-            .repartition(sc.defaultParallelism * partitionsPerCore) \
-            .cache()
-    
-    numberOfInstances = dataRDD.count()
-    
-    queries.append({"experiment_id":experimentID, "trial_id":trialID, "number_of_process_instances":numberOfInstances, "process_definition_id": "all"})
-    
-    processes = dataRDD.map(lambda a: a["process_name"]).distinct().collect()
-    
-    #Iterate over all process definitions
-    for process in processes:
-        numberOfInstances = dataRDD.filter(lambda a: a["process_name"] == process).count()
-        queries.append({"experiment_id":experimentID, "trial_id":trialID, "number_of_process_instances":numberOfInstances, "process_definition_id": process})
-    
-    return queries
+    with CacheScope():
+        queries = []
+        
+        #Obtain data for computations
+        dataRDD = readTrials(sc, cassandraKeyspace, srcTable, ["process_name", "source_process_instance_id", "to_ignore", "start_time", "duration"], \
+                             experimentID, [trialID], cacheDir=cacheDir)
+        
+        #Mark the warm-up processes to be ignored
+        dataRDD = markNInitialProcesses(dataRDD, processesToIgnore, "process_name") \
+                .filter(lambda r: r["process_name"] is not None and r["to_ignore"] is False) \
+                .repartition(sc.defaultParallelism * partitionsPerCore)
+        cacheDataset(dataRDD)
+        
+        numberOfInstances = dataRDD.count()
+        
+        queries.append({"experiment_id":experimentID, "trial_id":trialID, "number_of_process_instances":numberOfInstances, "process_definition_id": "all"})
+        
+        processes = dataRDD.map(lambda a: a["process_name"]).distinct().collect()
+        
+        #Iterate over all process definitions
+        for process in processes:
+            numberOfInstances = dataRDD.filter(lambda a: a["process_name"] == process).count()
+            queries.append({"experiment_id":experimentID, "trial_id":trialID, "number_of_process_instances":numberOfInstances, "process_definition_id": process})
+        
+        return queries
 
 def main():
+    from commons import getSparkContext, getTrialIDs, runExperimentAnalyser, ResultsWriter, startAnalyserRun, getAnalyserConfiguration, getSparkConf
+    
     # Takes arguments
     args = json.loads(sys.argv[1])
-    trialID = str(args["trial_id"])
     experimentID = str(args["experiment_id"])
     configFile = str(args["config_file"])
     cassandraKeyspace = str(args["cassandra_keyspace"])
-    partitionsPerCore = 5
+    rawCacheDir = args.get("raw_cache_dir")
+    processesToIgnore = int(args.get("processes_to_ignore", 0))
+    configuration = getAnalyserConfiguration(args.get("analyser_config_file"), __file__)
+    partitionsPerCore = configuration["partitions_per_core"]
     
     # Set configuration for spark context
-    conf = SparkConf().setAppName("Number of process instances analyser")
-    sc = CassandraSparkContext(conf=conf)
+    conf = getSparkConf("Number of process instances analyser")
+    sc = getSparkContext(conf)
+    trialIDs = getTrialIDs(sc, cassandraKeyspace, experimentID, args)
+    run = startAnalyserRun(sc, cassandraKeyspace, __file__, experimentID, trialIDs, args=args, inputs=["process"])
+    trialIDs = run.trialIDs
+    if len(trialIDs) == 0:
+        run.finish()
+        return
 
     #Source and destination tables
     srcTable = "process"
     destTable = "trial_number_of_process_instances"
     
     #Create Cassandra query
-    query = createQuery(sc, cassandraKeyspace, srcTable, experimentID, trialID, partitionsPerCore)
+    query = []
+    for trialID in trialIDs:
+        query += createQuery(sc, cassandraKeyspace, srcTable, experimentID, trialID, partitionsPerCore, processesToIgnore, rawCacheDir)
     
     #Save to Cassandra
-    sc.parallelize(query, sc.defaultParallelism * partitionsPerCore).saveToCassandra(cassandraKeyspace, destTable)
+    writer = ResultsWriter(sc, cassandraKeyspace)
+    writer.add(destTable, query)
+    writer.wait()
+    run.finish()
+    
+    #Run the experiment analyser on the results just saved
+    if args.get("run_experiment", False) is True:
+        runExperimentAnalyser(sys.argv[0])
     
 if __name__ == '__main__': main()
\ No newline at end of file
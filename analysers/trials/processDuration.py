@@ -11,83 +11,147 @@ import numpy as np
 
 from pyspark_cassandra import CassandraSparkContext
 from pyspark_cassandra import RowFormat
-from pyspark import SparkConf
+
+#Create the query with the metrics of the durations of a process definition ("all" for all of them)
+def createDurationQuery(process, experimentID, trialID, mode, metrics):
+    return {"process_definition_id":process, "experiment_id":experimentID, "trial_id":trialID, "process_duration_mode":mode[0], "process_duration_mode_freq":mode[1], \
+              "process_duration_mean":metrics["mean"], "process_duration_num_data_points":metrics["num_data_points"], \
+              "process_duration_min":metrics["min"], "process_duration_max":metrics["max"], "process_duration_sd":metrics["sd"], "process_duration_variance":metrics["variance"], \
+              "process_duration_q1":metrics["q1"], "process_duration_q2":metrics["q2"], "process_duration_q3":metrics["q3"], "process_duration_p95":metrics["p95"], \
+              "process_duration_me":metrics["me"], "process_duration_ci095_min":metrics["ci095_min"], "process_duration_ci095_max":metrics["ci095_max"], \
+              "process_duration_p90":metrics["p90"], "process_duration_p99":metrics["p99"], "process_duration_percentiles":metrics["percentiles"]}
 
 #Create the queries containg the results of the computations to pass to Cassandra
 def createQuery(sc, dataRDD, experimentID, trialID):
-    from commons import computeMode, computeMetrics
+    from commons import computeGroupedMetrics, computeMetrics
     
     queries = []
     
-    filteredRDD = dataRDD.filter(lambda r: r['duration'] != None).cache()
-    
-    modeRDD = filteredRDD.map(lambda r: (r['duration'], 1)) \
-            .cache()
-                   
-    mode = computeMode(modeRDD)
+    #The durations of all the process definitions (the None group) and of each one are summarised in a single pass
+    results = computeGroupedMetrics(dataRDD, lambda r: [None, r["process_name"]], "duration")
     
-    data = filteredRDD.map(lambda r: r['duration']).collect()
-    metrics = computeMetrics(data)
+    mode, metrics = results.pop(None, ((None, None), computeMetrics([])))
+    queries.append(createDurationQuery("all", experimentID, trialID, mode, metrics))
     
-    queries.append({"process_definition_id":"all", "experiment_id":experimentID, "trial_id":trialID, "process_duration_mode":mode[0], "process_duration_mode_freq":mode[1], \
-              "process_duration_mean":metrics["mean"], "process_duration_num_data_points":metrics["num_data_points"], \
-              "process_duration_min":metrics["min"], "process_duration_max":metrics["max"], "process_duration_sd":metrics["sd"], "process_duration_variance":metrics["variance"], \
-              "process_duration_q1":metrics["q1"], "process_duration_q2":metrics["q2"], "process_duration_q3":metrics["q3"], "process_duration_p95":metrics["p95"], \
-              "process_duration_me":metrics["me"], "process_duration_ci095_min":metrics["ci095_min"], "process_duration_ci095_max":metrics["ci095_max"], \
-              "process_duration_p90":metrics["p90"], "process_duration_p99":metrics["p99"], "process_duration_percentiles":metrics["percentiles"]})
+    #Iterate over all process definitions
+    for process, (mode, metrics) in results.items():
+        queries.append(createDurationQuery(process, experimentID, trialID, mode, metrics))
     
-    processes = dataRDD.map(lambda a: a["process_name"]).distinct().collect()
+    return queries
+
+#Create the queries of all the trials with DataFrames: the filters, the column selection and the aggregations run in the JVM,
+#and only the metrics of each group reach Python. The percentiles are approximated (see computeMetricsDataFrame)
+def createDataFrameQueries(sc, cassandraKeyspace, srcTable, experimentID, trialIDs):
+    from commons import readTrialsDataFrame, computeMetricsDataFrame, computeModeDataFrame, computeMetrics, cacheDataset, uncacheDataset, CacheScope
+    from pyspark.sql import functions as F
     
-    #Iterate over all process definitions
-    for process in processes:
-        filteredRDD = dataRDD.filter(lambda r: r['duration'] != None and r['process_name'] == process).cache()
+    with CacheScope():
+        df = readTrialsDataFrame(sc, cassandraKeyspace, srcTable, ["process_name", "to_ignore", "duration"], experimentID, trialIDs) \
+                .filter(F.col("process_name").isNotNull() & (F.col("to_ignore") == False))
+        cacheDataset(df)
         
-        modeRDD = filteredRDD.map(lambda r: (r['duration'], 1)) \
-            .cache()
-                   
-        mode = computeMode(modeRDD)
+        noMetrics = computeMetrics([])
         
-        data = filteredRDD.map(lambda r: r['duration']).collect()
-        metrics = computeMetrics(data)
+        queries = []
         
-        queries.append({"process_definition_id":process, "experiment_id":experimentID, "trial_id":trialID, "process_duration_mode":mode[0], "process_duration_mode_freq":mode[1], \
-                  "process_duration_mean":metrics["mean"], "process_duration_num_data_points":metrics["num_data_points"], \
-                  "process_duration_min":metrics["min"], "process_duration_max":metrics["max"], "process_duration_sd":metrics["sd"], "process_duration_variance":metrics["variance"], \
-                  "process_duration_q1":metrics["q1"], "process_duration_q2":metrics["q2"], "process_duration_q3":metrics["q3"], "process_duration_p95":metrics["p95"], \
-                  "process_duration_me":metrics["me"], "process_duration_ci095_min":metrics["ci095_min"], "process_duration_ci095_max":metrics["ci095_max"], \
-                  "process_duration_p90":metrics["p90"], "process_duration_p99":metrics["p99"], "process_duration_percentiles":metrics["percentiles"]})
+        #All the process definitions of each trial
+        metrics = computeMetricsDataFrame(df, "duration", ["trial_id"])
+        modes = computeModeDataFrame(df, "duration", ["trial_id"])
+        for trialID in trialIDs:
+            queries.append(createDurationQuery("all", experimentID, trialID, modes.get((trialID,), (None, None)), metrics.get((trialID,), noMetrics)))
+        
+        #Each process definition of each trial
+        metrics = computeMetricsDataFrame(df, "duration", ["trial_id", "process_name"])
+        modes = computeModeDataFrame(df, "duration", ["trial_id", "process_name"])
+        for trialID, process in df.select("trial_id", "process_name").distinct().collect():
+            group = (trialID, process)
+            queries.append(createDurationQuery(process, experimentID, trialID, modes.get(group, (None, None)), metrics.get(group, noMetrics)))
+        
+        uncacheDataset(df)
+        return queries
+
+#Create the queries of all the trials with a grouped map pandas UDF: the durations of each group reach Python as Arrow batches
+#and the metrics are exact, as with the RDD engine
+def createPandasQueries(sc, cassandraKeyspace, srcTable, experimentID, trialIDs):
+    from commons import readTrialsDataFrame, computeGroupedMetricsDataFrame, computeMetrics, cacheDataset, uncacheDataset, CacheScope
+    from pyspark.sql import functions as F
     
-    return queries
+    with CacheScope():
+        df = readTrialsDataFrame(sc, cassandraKeyspace, srcTable, ["process_name", "to_ignore", "duration"], experimentID, trialIDs) \
+                .filter(F.col("process_name").isNotNull() & (F.col("to_ignore") == False))
+        cacheDataset(df)
+        
+        queries = []
+        
+        #All the process definitions of each trial
+        results = computeGroupedMetricsDataFrame(df, "duration", ["trial_id"])
+        for trialID in trialIDs:
+            mode, metrics = results.get((trialID,), ((None, None), computeMetrics([])))
+            queries.append(createDurationQuery("all", experimentID, trialID, mode, metrics))
+        
+        #Each process definition of each trial
+        for (trialID, process), (mode, metrics) in computeGroupedMetricsDataFrame(df, "duration", ["trial_id", "process_name"]).items():
+            queries.append(createDurationQuery(process, experimentID, trialID, mode, metrics))
+        
+        uncacheDataset(df)
+        return queries
 
 def main():
+    from commons import markNInitialProcesses, getSparkContext, getTrialIDs, readTrials, createTrialsQueries, runExperimentAnalyser, ResultsWriter, startAnalyserRun, getAnalyserConfiguration, getSparkConf, cacheDataset
+    
     # Takes arguments
     args = json.loads(sys.argv[1])
-    trialID = str(args["trial_id"])
     experimentID = str(args["experiment_id"])
     configFile = str(args["config_file"])
     cassandraKeyspace = str(args["cassandra_keyspace"])
-    partitionsPerCore = 5
+    rawCacheDir = args.get("raw_cache_dir")
+    processesToIgnore = int(args.get("processes_to_ignore", 0))
+    configuration = getAnalyserConfiguration(args.get("analyser_config_file"), __file__)
+    partitionsPerCore = configuration["partitions_per_core"]
+    engine = args.get("engine", configuration["engine"])
     
     # Set configuration for spark context
-    conf = SparkConf().setAppName("Process duration analyser")
-    sc = CassandraSparkContext(conf=conf)
+    conf = getSparkConf("Process duration analyser")
+    sc = getSparkContext(conf)
+    trialIDs = getTrialIDs(sc, cassandraKeyspace, experimentID, args)
+    run = startAnalyserRun(sc, cassandraKeyspace, __file__, experimentID, trialIDs, args=args, inputs=["process"])
+    trialIDs = run.trialIDs
+    if len(trialIDs) == 0:
+        run.finish()
+        return
     
     #Source and destination tables
     srcTable = "process"
     destTable = "trial_process_duration"
     
-    #Obtain data for computations
-    dataRDD = sc.cassandraTable(cassandraKeyspace, srcTable)\
-            .select("process_name", "to_ignore", "source_process_instance_id", "start_time", "duration") \
-            .where("trial_id=? AND experiment_id=?", trialID, experimentID) \
-            .filter(lambda r: r["process_name"] is not None and r["to_ignore"] is False) \
-            .repartition(sc.defaultParallelism * partitionsPerCore) \
-            .cache()
-    
-    #Create Cassandra query
-    query = createQuery(sc, dataRDD, experimentID, trialID)
+    #The DataFrame engines do not mark the warm-up processes, that needs the RDD engine
+    if engine == "dataframe" and processesToIgnore < 1:
+        #Create Cassandra query
+        query = createDataFrameQueries(sc, cassandraKeyspace, srcTable, experimentID, trialIDs)
+    elif engine == "pandas" and processesToIgnore < 1:
+        #Create Cassandra query
+        query = createPandasQueries(sc, cassandraKeyspace, srcTable, experimentID, trialIDs)
+    else:
+        #Obtain data for computations
+        dataRDD = readTrials(sc, cassandraKeyspace, srcTable, ["process_name", "to_ignore", "source_process_instance_id", "start_time", "duration"], experimentID, trialIDs, cacheDir=rawCacheDir)
+        
+        #Mark the warm-up processes of each trial to be ignored
+        dataRDD = markNInitialProcesses(dataRDD, processesToIgnore, "process_name", "trial_id") \
+                .filter(lambda r: r["process_name"] is not None and r["to_ignore"] is False) \
+                .repartition(sc.defaultParallelism * partitionsPerCore)
+        cacheDataset(dataRDD)
+        
+        #Create Cassandra query
+        query = createTrialsQueries(dataRDD, trialIDs, lambda trialID, trialRDD: createQuery(sc, trialRDD, experimentID, trialID))
     
     #Save to Cassandra
-    sc.parallelize(query, sc.defaultParallelism * partitionsPerCore).saveToCassandra(cassandraKeyspace, destTable)
+    writer = ResultsWriter(sc, cassandraKeyspace)
+    writer.add(destTable, query)
+    writer.wait()
+    run.finish()
+    
+    #Run the experiment analyser on the results just saved
+    if args.get("run_experiment", False) is True:
+        runExperimentAnalyser(sys.argv[0])
     
 if __name__ == '__main__': main()
\ No newline at end of file
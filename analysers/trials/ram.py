@@ -13,7 +13,6 @@ import numpy as np
 
 from pyspark_cassandra import CassandraSparkContext
 from pyspark_cassandra import RowFormat
-from pyspark import SparkConf
 
 #Return the byte size from the string defining the memory limit of a container (eg. 2g, 2gb, ...) 
 def byteSizeFromString(arg):
@@ -40,39 +39,42 @@ def byteSizeFromString(arg):
     else:
         return long(arg[:-2])
         
-#Compute the absolute efficiency of the RAM
-def absoluteRamEfficency(sc, cassandraKeyspace, trialID, experimentID, containerID, hostID, dataIntegral, dataPoints):
+#Compute the absolute efficiency of the RAM, given the integral of the memory usage and the length it is normalised over
+#(the duration in seconds for an integral over the read times, otherwise the number of data points)
+def absoluteRamEfficency(sc, cassandraKeyspace, trialID, experimentID, containerID, hostID, dataIntegral, dataLength):
+    from commons import getContainerProperties, getHostProperties
+    
     # Taking from the container properties
-    containerProperties = sc.cassandraTable(cassandraKeyspace, "container_properties") \
-            .select("mem_limit") \
-            .where("trial_id=? AND experiment_id=? AND container_id=? AND host_id=?", trialID, experimentID, containerID, hostID) \
-            .first()
-    maxMemory = containerProperties["mem_limit"]
+    containerProperties = getContainerProperties(sc, cassandraKeyspace, experimentID, trialID, containerID, hostID)
+    maxMemory = containerProperties["mem_limit"] if containerProperties is not None else None
     # If Docker returns memory as either 0 or -1 it means unlimited memory given to the container, so we need the host memory
     if maxMemory is not None:
         byteSizeFromString(maxMemory)
     if maxMemory is None or maxMemory < 1:
-        hostProperties = sc.cassandraTable(cassandraKeyspace, "host_properties") \
-            .select("mem_total") \
-            .where("host_id=?", hostID) \
-            .first()
-        maxMemory = hostProperties["mem_total"]
+        hostProperties = getHostProperties(sc, cassandraKeyspace, hostID)
+        maxMemory = hostProperties["mem_total"] if hostProperties is not None else None
         if maxMemory is None:
             return None
-    absoluteEfficency = dataIntegral/float(long(maxMemory)*dataPoints)
+    absoluteEfficency = dataIntegral/float(long(maxMemory)*dataLength)
     return absoluteEfficency
 
 #Create the queries containg the results of the computations to pass to Cassandra
-def createQuery(dataRDD, sc, cassandraKeyspace, experimentID, trialID, containerID, containerName, hostID):
-    from commons import computeMode, computeMetrics
+#If the RDD with the rows of the time series is given, the integral is computed over the read times
+def createQuery(dataRDD, sc, cassandraKeyspace, experimentID, trialID, containerID, containerName, hostID, seriesRDD=None):
+    from commons import computeMode, computeMetrics, collectTimeSeries, collectArray
     
     mode = computeMode(dataRDD)
     
-    data = dataRDD.map(lambda x: x[0]).collect()
+    if seriesRDD is None:
+        times = None
+        data = collectArray(dataRDD.map(lambda x: x[0]))
+    else:
+        times, data = collectTimeSeries(seriesRDD, "read_time", "memory_usage")
      
-    metrics = computeMetrics(data)
-    relativeEfficency = metrics["integral"]/(metrics["max"]*metrics["num_data_points"])
-    absoluteEfficency = absoluteRamEfficency(sc, cassandraKeyspace, trialID, experimentID, containerID, hostID, metrics["integral"], metrics["num_data_points"])
+    metrics = computeMetrics(data, times)
+    dataLength = metrics["duration"] if metrics["duration"] else metrics["num_data_points"]
+    relativeEfficency = metrics["integral"]/(metrics["max"]*dataLength)
+    absoluteEfficency = absoluteRamEfficency(sc, cassandraKeyspace, trialID, experimentID, containerID, hostID, metrics["integral"], dataLength)
     
     query = [{"experiment_id":experimentID, "trial_id":trialID, "container_id":containerID, "container_name":containerName, "host_id":hostID, \
               "ram_mode":mode[0], "ram_mode_freq":mode[1], "ram_integral":metrics["integral"], \
@@ -84,40 +86,69 @@ def createQuery(dataRDD, sc, cassandraKeyspace, experimentID, trialID, container
               "ram_p90":metrics["p90"], "ram_p99":metrics["p99"], "ram_percentiles":metrics["percentiles"]}]
     return query
 
+#Create the query for the memory usage of a container, given the RDD of its environment data (read_time and memory_usage)
+def createContainerQuery(sc, cassandraKeyspace, dataRDD, experimentID, trialID, containerID, containerName, hostID, steadyState=False):
+    from commons import filterSteadyState
+    
+    seriesRDD = dataRDD.filter(lambda r: r["memory_usage"] is not None)
+    
+    #Restrict the data to the steady state window of the memory usage
+    if steadyState:
+        seriesRDD = filterSteadyState(sc, cassandraKeyspace, seriesRDD, experimentID, trialID, containerID, hostID, "memory_usage")
+    
+    dataRDD = seriesRDD.map(lambda r: (r['memory_usage'], 1))
+    
+    return createQuery(dataRDD, sc, cassandraKeyspace, experimentID, trialID, containerID, containerName, hostID, seriesRDD)
+
 def main():
+    from commons import getSparkContext, getTrialIDs, readTrials, createTrialsQueries, runExperimentAnalyser, ResultsWriter, startAnalyserRun, getAnalyserConfiguration, getSparkConf, cacheDataset
+    
     #Takes arguments
     args = json.loads(sys.argv[1])
-    trialID = str(args["trial_id"])
     experimentID = str(args["experiment_id"])
     configFile = str(args["config_file"])
     containerID = str(args["container_id"])
     containerName = str(args["container_name"])
     hostID = str(args["host_id"])
     cassandraKeyspace = str(args["cassandra_keyspace"])
-    partitionsPerCore = 5
+    rawCacheDir = args.get("raw_cache_dir")
+    steadyState = args.get("steady_state", False) is True
+    configuration = getAnalyserConfiguration(args.get("analyser_config_file"), __file__)
+    partitionsPerCore = configuration["partitions_per_core"]
     
     # Set configuration for spark context
-    conf = SparkConf().setAppName("Ram trial analyser")
-    sc = CassandraSparkContext(conf=conf)
+    conf = getSparkConf("Ram trial analyser")
+    sc = getSparkContext(conf)
+    trialIDs = getTrialIDs(sc, cassandraKeyspace, experimentID, args)
+    run = startAnalyserRun(sc, cassandraKeyspace, __file__, experimentID, trialIDs, args=args, inputs=["environment_data", "container_properties", "host_properties", "trial_steady_state"])
+    trialIDs = run.trialIDs
+    if len(trialIDs) == 0:
+        run.finish()
+        return
     
     #Source and destination tables
     srcTable = "environment_data"
     destTable = "trial_ram"
     
     #Obtain data for computations
-    dataRDD = sc.cassandraTable(cassandraKeyspace, srcTable) \
-            .select("memory_usage") \
-            .where("trial_id=? AND experiment_id=? AND container_id=? AND host_id=?", trialID, experimentID, containerID, hostID) \
-            .filter(lambda r: r["memory_usage"] is not None) \
-            .map(lambda r: (r['memory_usage'], 1)) \
-            .repartition(sc.defaultParallelism * partitionsPerCore) \
-            .cache()
+    dataRDD = readTrials(sc, cassandraKeyspace, srcTable, ["read_time", "memory_usage"], experimentID, trialIDs, \
+                         [("container_id", containerID), ("host_id", hostID)], cacheDir=rawCacheDir) \
+            .repartition(sc.defaultParallelism * partitionsPerCore)
+    cacheDataset(dataRDD)
     
     #Create Cassandra query
-    query = createQuery(dataRDD, sc, cassandraKeyspace, experimentID, trialID, containerID, containerName, hostID)
+    query = createTrialsQueries(dataRDD, trialIDs, \
+            lambda trialID, trialRDD: createContainerQuery(sc, cassandraKeyspace, trialRDD, experimentID, trialID, containerID, containerName, hostID, steadyState))
     
     #Save to Cassandra
-    sc.parallelize(query, sc.defaultParallelism * partitionsPerCore).saveToCassandra(cassandraKeyspace, destTable)
+    writer = ResultsWriter(sc, cassandraKeyspace)
+    writer.add(destTable, query)
+    writer.wait()
+    run.finish()
+    
+    #Run the experiment analyser on the results just saved
+    if args.get("run_experiment", False) is True:
+        runExperimentAnalyser(sys.argv[0])
     
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -0,0 +1,50 @@
+import sys
+import json
+
+from pyspark_cassandra import CassandraSparkContext
+
+#Raw data tables exported by default
+defaultTables = ["environment_data", "process", "construct"]
+
+#Snapshot the partition of a table of a trial into the raw cache, streaming the rows to the driver one Spark partition at a time.
+#The partition is fingerprinted before reading it, so rows written during the export make the cache stale rather than missed
+def exportTable(sc, cassandraKeyspace, cacheDir, table, experimentID, trialID):
+    from commons import writeRawCache, getInputFingerprints
+
+    fingerprint = getInputFingerprints(sc, cassandraKeyspace, experimentID, [trialID], [table])[trialID]
+
+    dataRDD = sc.cassandraTable(cassandraKeyspace, table) \
+            .where("trial_id=? AND experiment_id=?", trialID, experimentID)
+
+    return writeRawCache(cacheDir, experimentID, trialID, table, dataRDD.toLocalIterator(), fingerprint=fingerprint)
+
+def main():
+    from commons import getSparkContext, getTrialIDs, invalidateRawCache, startAnalyserRun, getAnalyserConfiguration, getSparkConf
+
+    # Takes arguments
+    args = json.loads(sys.argv[1])
+    experimentID = str(args["experiment_id"])
+    configFile = str(args["config_file"])
+    cassandraKeyspace = str(args["cassandra_keyspace"])
+    cacheDir = str(args["raw_cache_dir"])
+    tables = [str(t) for t in args.get("tables", defaultTables)]
+    getAnalyserConfiguration(args.get("analyser_config_file"), __file__)
+
+    # Set configuration for spark context
+    conf = getSparkConf("Raw cache export")
+    sc = getSparkContext(conf)
+    trialIDs = getTrialIDs(sc, cassandraKeyspace, experimentID, args)
+    run = startAnalyserRun(sc, cassandraKeyspace, __file__, experimentID, trialIDs, args=args)
+
+    for trialID in trialIDs:
+        for table in tables:
+            #Only remove the cached data (eg. after the trial data changed), the next export or analysis reads Cassandra again
+            if args.get("invalidate", False) is True:
+                invalidateRawCache(cacheDir, experimentID, trialID, table)
+            else:
+                manifest = exportTable(sc, cassandraKeyspace, cacheDir, table, experimentID, trialID)
+                print("Exported " + str(manifest["rows"]) + " rows of " + table + " for trial " + trialID)
+
+    run.finish()
+
+if __name__ == '__main__': main()
@@ -0,0 +1,115 @@
+import sys
+import json
+
+from pyspark_cassandra import CassandraSparkContext
+
+#Retrieve the name of a container from its properties, falling back to its id
+def getContainerName(sc, cassandraKeyspace, experimentID, trialID, containerID, hostID):
+    from commons import getContainerProperties
+
+    containerProperties = getContainerProperties(sc, cassandraKeyspace, experimentID, trialID, containerID, hostID)
+    if containerProperties is None or containerProperties["name"] is None:
+        return containerID
+    return containerProperties["name"].lstrip("/")
+
+#Create the queries for the cpu, per core cpu and ram usage of all the containers of the trial, given the RDD with the
+#environment data of the whole trial. Returns a dictionary with the queries for each destination table
+def createEnvironmentQueries(sc, cassandraKeyspace, envRDD, experimentID, trialID, steadyState=False):
+    import cpu
+    import ram
+
+    queries = {"trial_cpu":[], "trial_cpu_core":[], "trial_ram":[]}
+
+    containers = envRDD.map(lambda r: (r["container_id"], r["host_id"])).distinct().collect()
+
+    #Iterate over all the containers of the trial
+    for containerID, hostID in containers:
+        containerName = getContainerName(sc, cassandraKeyspace, experimentID, trialID, containerID, hostID)
+        containerRDD = envRDD.filter(lambda r: r["container_id"] == containerID and r["host_id"] == hostID)
+
+        query, coresQuery = cpu.createContainerQueries(sc, cassandraKeyspace, containerRDD, experimentID, trialID, containerID, containerName, hostID, steadyState)
+        queries["trial_cpu"] += query
+        queries["trial_cpu_core"] += coresQuery
+        queries["trial_ram"] += ram.createContainerQuery(sc, cassandraKeyspace, containerRDD, experimentID, trialID, containerID, containerName, hostID, steadyState)
+
+    return queries
+
+#Create the queries for the IO of all the containers of the trial, given the RDD with the IO data of the whole trial
+def createIOQueries(sc, cassandraKeyspace, ioRDD, experimentID, trialID):
+    import IO
+
+    queries = {"trial_io":[]}
+
+    containers = ioRDD.map(lambda r: (r["container_id"], r["host_id"])).distinct().collect()
+
+    #Iterate over all the containers of the trial
+    for containerID, hostID in containers:
+        containerName = getContainerName(sc, cassandraKeyspace, experimentID, trialID, containerID, hostID)
+        containerRDD = ioRDD.filter(lambda r: r["container_id"] == containerID and r["host_id"] == hostID)
+
+        queries["trial_io"] += IO.createQueries(containerRDD, trialID, experimentID, containerID, containerName, hostID)
+
+    return queries
+
+def main():
+    from commons import loadProperties, getSparkContext, getTrialIDs, readTrials, ResultsWriter, startAnalyserRun, getAnalyserConfiguration, getSparkConf, cacheDataset, uncacheDataset
+
+    # Takes arguments
+    args = json.loads(sys.argv[1])
+    experimentID = str(args["experiment_id"])
+    configFile = str(args["config_file"])
+    cassandraKeyspace = str(args["cassandra_keyspace"])
+    rawCacheDir = args.get("raw_cache_dir")
+    steadyState = args.get("steady_state", False) is True
+    configuration = getAnalyserConfiguration(args.get("analyser_config_file"), __file__)
+    partitionsPerCore = configuration["partitions_per_core"]
+
+    # Set configuration for spark context
+    conf = getSparkConf("Resources trial analyser")
+    sc = getSparkContext(conf)
+    trialIDs = getTrialIDs(sc, cassandraKeyspace, experimentID, args)
+    run = startAnalyserRun(sc, cassandraKeyspace, __file__, experimentID, trialIDs, args=args, inputs=["environment_data", "io_data", "container_properties", "host_properties", "trial_steady_state"])
+    trialIDs = run.trialIDs
+    if len(trialIDs) == 0:
+        run.finish()
+        return
+
+    #Properties of all the containers of the trials and of their hosts, in bulk
+    loadProperties(sc, cassandraKeyspace, experimentID, trialIDs)
+
+    #The queries of each table are written together, the environment ones while the IO data is analysed
+    writer = ResultsWriter(sc, cassandraKeyspace, asynchronous=True)
+
+    def addQueries(trialQueries):
+        for destTable, query in trialQueries.items():
+            writer.add(destTable, query)
+
+    #Obtain the environment data of all the containers, reading the partitions once
+    envRDD = readTrials(sc, cassandraKeyspace, "environment_data", \
+                        ["container_id", "host_id", "read_time", "cpu_percent_usage", "cpu_percpu_percent_usage", "memory_usage"], \
+                        experimentID, trialIDs, cacheDir=rawCacheDir) \
+            .repartition(sc.defaultParallelism * partitionsPerCore)
+    cacheDataset(envRDD)
+
+    for trialID in trialIDs:
+        trialRDD = envRDD.filter(lambda r: r["trial_id"] == trialID)
+        addQueries(createEnvironmentQueries(sc, cassandraKeyspace, trialRDD, experimentID, trialID, steadyState))
+    uncacheDataset(envRDD)
+    writer.flush()
+
+    #Obtain the IO data of all the containers, reading the partitions once
+    ioRDD = readTrials(sc, cassandraKeyspace, "io_data", ["container_id", "host_id", "device", "reads", "writes", "total"], \
+                       experimentID, trialIDs, cacheDir=rawCacheDir) \
+            .repartition(sc.defaultParallelism * partitionsPerCore)
+    cacheDataset(ioRDD)
+
+    for trialID in trialIDs:
+        trialRDD = ioRDD.filter(lambda r: r["trial_id"] == trialID)
+        addQueries(createIOQueries(sc, cassandraKeyspace, trialRDD, experimentID, trialID))
+    uncacheDataset(ioRDD)
+
+    #Save to Cassandra and wait for all the writes
+    writer.wait()
+    run.finish()
+
+if __name__ == '__main__': main()
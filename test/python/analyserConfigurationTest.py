@@ -0,0 +1,82 @@
+import unittest
+import os
+import tempfile
+import commons
+from commons import *
+
+class AnalyserConfigurationTestCase(unittest.TestCase):
+    def setUp(self):
+        self.files = []
+        
+    def tearDown(self):
+        for path in self.files:
+            os.remove(path)
+        commons.analyserConfiguration = dict(analyserConfigurationDefaults)
+        
+    def writeConfiguration(self, content):
+        fd, path = tempfile.mkstemp(suffix=".yml")
+        with os.fdopen(fd, "w") as f:
+            f.write(content)
+        self.files.append(path)
+        return path
+        
+    def testDefaults(self):
+        conf = getAnalyserConfiguration("", "/analysers/trials/cpu.py")
+        self.assertTrue(conf == analyserConfigurationDefaults)
+        self.assertTrue(commons.analyserConfiguration is conf)
+        
+    def testSections(self):
+        path = self.writeConfiguration("defaults:\n"
+                                       "    partitions_per_core: 3\n"
+                                       "    spark:\n"
+                                       "        spark.serializer: org.apache.spark.serializer.KryoSerializer\n"
+                                       "analysers:\n"
+                                       "    trials/cpu:\n"
+                                       "        partitions_per_core: 8\n"
+                                       "        write_batch_size: 50\n"
+                                       "        spark:\n"
+                                       "            spark.sql.execution.arrow.enabled: true\n")
+        conf = getAnalyserConfiguration(path, "/analysers/trials/cpu.py")
+        self.assertTrue(conf["partitions_per_core"] == 8)
+        self.assertTrue(conf["write_batch_size"] == 50)
+        self.assertTrue(conf["engine"] == "rdd")
+        self.assertTrue(conf["spark"] == {"spark.serializer":"org.apache.spark.serializer.KryoSerializer", "spark.sql.execution.arrow.enabled":True})
+        self.assertTrue(getAnalyserConfiguration(path, "/analysers/trials/ram.py")["partitions_per_core"] == 3)
+        self.assertTrue(analyserConfigurationDefaults["spark"] == {})
+        
+    def testDrivesDefaults(self):
+        path = self.writeConfiguration("defaults:\n    collect_spill_threshold: 7\n")
+        getAnalyserConfiguration(path)
+        self.assertTrue(ValuesBuffer().spillThreshold == 7)
+        
+    def testInvalid(self):
+        for content in ["defaults:\n    partitions_per_cores: 5\n", "defaults:\n    partitions_per_core: 0\n", \
+                        "defaults:\n    partitions_per_core: true\n", "defaults:\n    engine: spark\n", \
+                        "analysers:\n    trials/cpu:\n        spark:\n            serializer: kryo\n", "trials/cpu:\n    engine: rdd\n"]:
+            path = self.writeConfiguration(content)
+            self.assertRaises(ValueError, getAnalyserConfiguration, path, "/analysers/trials/cpu.py")
+        
+    def testMissingFile(self):
+        conf = getAnalyserConfiguration("/nonexistent/analysers.configuration.yml", "/analysers/trials/cpu.py")
+        self.assertTrue(conf == analyserConfigurationDefaults)
+        
+    def testShippedFile(self):
+        path = self.writeConfiguration("defaults:\n    partitions_per_core: 4\n")
+        cwd = os.getcwd()
+        os.chdir(os.path.dirname(path))
+        try:
+            conf = getAnalyserConfiguration("/shipped/with/files/" + os.path.basename(path))
+        finally:
+            os.chdir(cwd)
+        self.assertTrue(conf["partitions_per_core"] == 4)
+        
+    def testRepositoryFile(self):
+        path = os.path.join(os.path.dirname(os.path.abspath(commons.__file__)), "..", "..", "analysers.configuration.yml")
+        if os.path.isfile(path):
+            conf = getAnalyserConfiguration(path, "/analysers/trials/cpu.py")
+            self.assertTrue(conf["spark"] == {})
+            conf = getAnalyserConfiguration(path, "/analysers/trials/processDuration.py")
+            self.assertTrue(conf["spark"]["spark.sql.execution.arrow.enabled"] is True)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+import os
+import tempfile
+from commons import *
+
+class BackfillTestCase(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mktemp(suffix=".json")
+        
+    def tearDown(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        
+    def testBatches(self):
+        experiments = {"foo":["foo_3", "foo_1", "foo_2"], "bar":["bar_1"]}
+        batches = getBackfillBatches(experiments, "processDuration", BackfillCheckpoint(), 2)
+        self.assertTrue(batches == [("bar", ["bar_1"]), ("foo", ["foo_1", "foo_2"]), ("foo", ["foo_3"])])
+        
+    def testResume(self):
+        checkpoint = BackfillCheckpoint(self.path)
+        checkpoint.markDone([("processDuration", "foo", "foo_1"), ("processDuration", "foo", "foo_2")])
+        checkpoint.markDone([("processDuration", "foo")])
+        self.assertFalse(os.path.exists(self.path + ".tmp"))
+        
+        checkpoint = BackfillCheckpoint(self.path)
+        self.assertTrue(checkpoint.isDone("processDuration", "foo", "foo_1"))
+        self.assertTrue(checkpoint.isDone("processDuration", "foo"))
+        self.assertFalse(checkpoint.isDone("throughput", "foo", "foo_1"))
+        experiments = {"foo":["foo_1", "foo_2", "foo_3"]}
+        self.assertTrue(getBackfillBatches(experiments, "processDuration", checkpoint, 2) == [("foo", ["foo_3"])])
+        self.assertTrue(getBackfillBatches(experiments, "throughput", checkpoint, 5) == [("foo", ["foo_1", "foo_2", "foo_3"])])
+        
+    def testExperimentRuns(self):
+        containers = [{"container_id":"c1", "container_name":"db", "host_id":"h1"}, {"container_id":"c2", "container_name":"engine", "host_id":"h1"}]
+        checkpoint = BackfillCheckpoint()
+        self.assertTrue(getBackfillExperimentRuns("throughput", "foo", lambda: self.fail(), checkpoint) == \
+                        [("throughput", {}, ("experiments/throughput", "foo"))])
+        runs = getBackfillExperimentRuns("resources", "foo", lambda: containers, checkpoint)
+        self.assertTrue([(a, args.get("container_name")) for a, args, step in runs] == \
+                        [("cpu", "db"), ("cpu", "engine"), ("ram", "db"), ("ram", "engine"), ("IO", "db"), ("IO", "engine")])
+        self.assertTrue(runs[0][1] == containers[0] and runs[0][2] == ("experiments/cpu", "foo", "db", "h1"))
+        
+        checkpoint.markDone([step for a, args, step in runs[:3]])
+        runs = getBackfillExperimentRuns("resources", "foo", lambda: containers, checkpoint)
+        self.assertTrue([(a, args["container_name"]) for a, args, step in runs] == [("ram", "engine"), ("IO", "db"), ("IO", "engine")])
+
+    def testPause(self):
+        self.assertTrue(getBackfillPause(1000, 2.0, 100) == 8.0)
+        self.assertTrue(getBackfillPause(1000, 20.0, 100) == 0.0)
+        self.assertTrue(getBackfillPause(None, 2.0, 100) == 0.0)
+        self.assertTrue(getBackfillPause(1000, 2.0, None) == 0.0)
+
+if __name__ == '__main__':
+    unittest.main()
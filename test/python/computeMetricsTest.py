@@ -88,6 +88,32 @@ class MetricsTestCase(unittest.TestCase):
         self.assertTrue(metrics["me"] == 0)
         self.assertTrue(metrics["ci095_min"] == 2)
         self.assertTrue(metrics["ci095_max"] == 2)
+        
+    def testIrregularSampling(self):
+        data = [2, 4, 2]
+        times = [0, 1, 3]
+        metrics = computeMetrics(data, times)
+        self.assertTrue(metrics["mean"] == 8/3.0)
+        self.assertTrue(metrics["integral"] == 9)
+        self.assertTrue(metrics["duration"] == 3)
+        self.assertTrue(metrics["num_data_points"] == 3)
+        self.assertTrue(computeMetrics(data)["duration"] is None)
+
+    def testTrialsExperimentMetrics(self):
+        trials = [{"trial_id":"t%d" % i, "data_mean":m, "data_me":me, "data_min":m - 1, "data_max":m + 1, "data_q1":m, "data_q2":m, \
+                   "data_q3":m, "data_p90":m, "data_p95":m, "data_p99":m, "data_num_data_points":n, "data_variance":1.0} \
+                  for i, (m, me, n) in enumerate([(1, 0.5, 1), (1, 0.2, 1), (2, 0, 2), (4, 0, 4)])]
+        metrics = computeTrialsExperimentMetrics(trials, "data")
+        self.assertTrue(metrics["min"] == 0 and metrics["max"] == 5)
+        self.assertTrue(metrics["q2_min"] == 1 and metrics["q2_max"] == 4)
+        self.assertTrue(metrics["weighted_avg"] == 22 / 8.0)
+        self.assertTrue(metrics["best"] == ["t1"] and metrics["worst"] == ["t3"])
+        self.assertTrue(metrics["average"] == ["t2"])
+        self.assertTrue(computeTrialsExperimentMetrics([], "data")["best"] is None)
+        
+        data = np.concatenate([np.full(n, m, dtype=np.float64) for m, n in [(1, 1), (1, 1), (2, 2), (4, 4)]])
+        trials = [dict(t, data_variance=0.0) for t in trials]
+        self.assertTrue(abs(computeTrialsCombinedVar(trials, "data") - np.var(data, ddof=1)) < 1e-9)
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
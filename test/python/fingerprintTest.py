@@ -0,0 +1,51 @@
+import unittest
+import os
+import shutil
+import tempfile
+import commons
+from commons import *
+
+class FingerprintTestCase(unittest.TestCase):
+    def tearDown(self):
+        commons.analyserConfiguration = dict(analyserConfigurationDefaults)
+        
+    def testArguments(self):
+        arguments = getAnalyserArguments({"experiment_id":"foo", "trial_id":"foo_1", "container_id":"c1", "steady_state":True})
+        self.assertTrue(arguments == '{"container_id": "c1", "steady_state": true}')
+        self.assertTrue(arguments == getAnalyserArguments({"steady_state":True, "container_id":"c1", "trial_ids":["foo_2"], "config_file":"a.yml"}))
+        self.assertTrue(getAnalyserArguments(None) == "{}")
+        
+    def testVersion(self):
+        version = getAnalyserVersion(commons.__file__)
+        self.assertTrue(len(version) == 40)
+        self.assertTrue(getAnalyserVersion(commons.__file__) == version)
+        commons.analyserConfiguration = dict(analyserConfigurationDefaults, partitions_per_core=7)
+        self.assertTrue(getAnalyserVersion(commons.__file__) != version)
+        
+    def testModules(self):
+        directory = tempfile.mkdtemp()
+        try:
+            def write(name, content):
+                with open(os.path.join(directory, name), "w") as f:
+                    f.write(content)
+            write("resources.py", "import sys\n\ndef main():\n    import cpu\n    from commons import readTrials\n")
+            write("cpu.py", "import numpy as np\n")
+            write("ram.py", "")
+            analyserFile = os.path.join(directory, "resources.py")
+            modules = [os.path.basename(m) for m in getAnalyserModules(analyserFile)]
+            self.assertTrue("cpu.py" in modules and "resources.py" in modules and "commons.py" in modules)
+            self.assertFalse("ram.py" in modules)
+            
+            version = getAnalyserVersion(analyserFile)
+            write("cpu.py", "import numpy\n")
+            self.assertTrue(getAnalyserVersion(analyserFile) != version)
+        finally:
+            shutil.rmtree(directory)
+        
+    def testRowsDigest(self):
+        digest = getRowsDigest([("all", 10), ("p1", 4)])
+        self.assertTrue(digest == getRowsDigest([("p1", 4), ("all", 10)]))
+        self.assertTrue(digest != getRowsDigest([("all", 10), ("p1", 5)]))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import os
+import math
+import uuid
+import datetime
+import tempfile
+import unittest
+from localCassandra import *
+
+schema = """
+-- Test keyspace
+CREATE KEYSPACE test WITH REPLICATION = { 'class' : 'SimpleStrategy', 'replication_factor' : 1 };
+USE test;
+CREATE TABLE process (
+  experiment_id text,
+  trial_id text,
+  source_process_instance_id text,
+  start_time timestamp,
+  duration bigint,
+  mean double,
+  to_ignore boolean,
+  values list<double>,
+  values_packed blob,
+  PRIMARY KEY ((experiment_id, trial_id), source_process_instance_id)
+);
+CREATE TABLE properties (
+  host_id text,
+  read_id uuid,
+  labels map<text, text>,
+  PRIMARY KEY (host_id, read_id)
+) WITH CLUSTERING ORDER BY (read_id DESC);
+"""
+
+class LocalCassandraTestCase(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mktemp(suffix=".db")
+        self.store = LocalCassandra(self.path)
+        self.store.executeScript(schema)
+        
+    def tearDown(self):
+        self.store.close()
+        os.remove(self.path)
+        
+    def testInsertStatement(self):
+        self.store.executeScript("INSERT INTO process (experiment_id, trial_id, source_process_instance_id, start_time, duration, to_ignore, values) " + \
+                                 "VALUES ('e', 't', 'p''1', '2016-03-18 11:02:12+0100', 5, False, [1.5, 2]);")
+        rows = list(self.store.select("test", "process"))
+        self.assertTrue(len(rows) == 1)
+        self.assertTrue(rows[0]["source_process_instance_id"] == "p'1")
+        self.assertTrue(rows[0].start_time == datetime.datetime(2016, 3, 18, 10, 2, 12))
+        self.assertTrue(rows[0]["to_ignore"] is False)
+        self.assertTrue(rows[0]["values"] == [1.5, 2])
+        
+    def testWhere(self):
+        self.store.insert("test", "process", ({"experiment_id":"e", "trial_id":"t" + str(i % 3), "source_process_instance_id":"p%02d" % i, \
+                                               "duration":i} for i in range(30)), chunkSize=7)
+        rows = list(self.store.select("test", "process", ["trial_id", "duration"], "experiment_id=? AND trial_id IN (?,?)", ["e", "t0", "t1"]))
+        self.assertTrue(len(rows) == 20)
+        rows = list(self.store.select("test", "process", ["duration"], "experiment_id=? AND trial_id=? AND source_process_instance_id>=?", ["e", "t0", "p15"]))
+        self.assertTrue([r["duration"] for r in rows] == [15, 18, 21, 24, 27])
+        self.assertTrue(sorted(self.store.partitionKeys("test", "process")) == [("e", "t0"), ("e", "t1"), ("e", "t2")])
+        
+    def testUpsert(self):
+        key = {"experiment_id":"e", "trial_id":"t", "source_process_instance_id":"p"}
+        self.store.insert("test", "process", [dict(key, duration=3)])
+        self.store.insert("test", "process", [dict(key, to_ignore=True)])
+        rows = list(self.store.select("test", "process", ["duration", "to_ignore"]))
+        self.assertTrue(rows == [{"duration":3, "to_ignore":True}])
+        
+    def testDelete(self):
+        self.store.insert("test", "process", ({"experiment_id":"e", "trial_id":"t" + str(i % 3), "source_process_instance_id":"p%02d" % i, \
+                                               "duration":i} for i in range(30)))
+        deleted = self.store.delete("test", "process", [{"experiment_id":"e", "trial_id":"t0"}, \
+                                                        {"experiment_id":"e", "trial_id":"t1", "source_process_instance_id":"p01"}])
+        self.assertTrue(deleted == 11)
+        self.assertTrue(sorted(self.store.partitionKeys("test", "process")) == [("e", "t1"), ("e", "t2")])
+        self.assertTrue(len(list(self.store.select("test", "process", where="experiment_id=? AND trial_id=?", params=["e", "t1"]))) == 9)
+        
+    def testBlob(self):
+        packed = bytearray("\x01\x00\x00\x00\x00\xff")
+        self.store.insert("test", "process", [{"experiment_id":"e", "trial_id":"t", "source_process_instance_id":"p", "values_packed":packed}])
+        rows = list(self.store.select("test", "process", ["values_packed"]))
+        self.assertTrue(rows[0]["values_packed"] == packed)
+        self.assertTrue(isinstance(rows[0]["values_packed"], bytearray))
+        
+    def testNonFinite(self):
+        values = [float("nan"), float("inf"), float("-inf"), 1.5, None]
+        self.store.insert("test", "process", [{"experiment_id":"e", "trial_id":"t", "source_process_instance_id":"p%d" % i, "mean":v} \
+                                              for i, v in enumerate(values)])
+        rows = list(self.store.select("test", "process", ["mean"]))
+        self.assertTrue(math.isnan(rows[0]["mean"]))
+        self.assertTrue([r["mean"] for r in rows[1:]] == values[1:])
+        
+    def testClusteringOrder(self):
+        ids = [uuid.UUID(int=i) for i in range(3)]
+        self.store.insert("test", "properties", [{"host_id":"h", "read_id":i, "labels":{"a":"b"}} for i in ids])
+        rows = list(self.store.select("test", "properties", where="host_id=?", params=["h"]))
+        self.assertTrue([r["read_id"] for r in rows] == list(reversed(ids)))
+        self.assertTrue(rows[0]["labels"] == {"a":"b"})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+import unittest
+import struct
+import numpy as np
+from commons import *
+
+class PackedArrayTestCase(unittest.TestCase):
+    def testRoundTrip(self):
+        blob = encodePackedArray([1.5, 2, 3.25])
+        self.assertTrue(len(blob) == 8 + 3*8)
+        values = decodePackedArray(blob)
+        self.assertTrue(values.dtype == np.float64)
+        self.assertTrue(list(values) == [1.5, 2, 3.25])
+        self.assertTrue(len(decodePackedArray(encodePackedArray([]))) == 0)
+        self.assertTrue(decodePackedArray(None) is None)
+        
+    def testFloat32(self):
+        blob = encodePackedArray([0.5, 4], "float32")
+        self.assertTrue(len(blob) == 8 + 2*4)
+        values = decodePackedArray(blob)
+        self.assertTrue(values.dtype == np.float32)
+        self.assertTrue(list(values) == [0.5, 4])
+        
+    def testNone(self):
+        values = decodePackedArray(encodePackedArray([None, 1]))
+        self.assertTrue(np.isnan(values[0]))
+        self.assertTrue(values[1] == 1)
+        
+    def testUnsupported(self):
+        blob = encodePackedArray([1])
+        self.assertRaises(ValueError, decodePackedArray, struct.pack("<BBHI", packedArrayVersion + 1, 0, 0, 1) + blob[8:])
+        self.assertRaises(ValueError, decodePackedArray, struct.pack("<BBHI", packedArrayVersion, 9, 0, 1) + blob[8:])
+        
+    def testPackResultLists(self):
+        rows = packResultLists("trial_cpu_core", [{"trial_id":"foo_1", "cpu_cores":2, "cpu_min":[1, 2]}], "float64")
+        self.assertTrue(sorted(rows[0].keys()) == ["cpu_cores", "cpu_min_packed", "trial_id"])
+        self.assertTrue(list(decodePackedArray(rows[0]["cpu_min_packed"])) == [1, 2])
+        rows = packResultLists("trial_process_duration", [{"trial_id":"foo_1", "process_duration_percentiles":[1, 2], "modes":[3]}], "float64")
+        self.assertTrue(sorted(rows[0].keys()) == ["modes", "process_duration_percentiles_packed", "trial_id"])
+        
+    def testDecodeResultRow(self):
+        row = decodeResultRow({"trial_id":"foo_1", "cpu_min":[None, 2], "cpu_max":[5, 6], "cpu_max_packed":encodePackedArray([3, 4]), "cpu_q1_packed":None})
+        self.assertTrue(sorted(row.keys()) == ["cpu_max", "cpu_min", "trial_id"])
+        self.assertTrue(np.isnan(row["cpu_min"][0]) and row["cpu_min"][1] == 2)
+        self.assertTrue(list(row["cpu_max"]) == [3, 4])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,33 @@
+import unittest
+import time
+from commons import *
+
+class PropertiesCacheTestCase(unittest.TestCase):
+    def testMissing(self):
+        cache = PropertiesCache()
+        self.assertTrue(cache.get(("foo",)) is PropertiesCache.missing)
+        
+    def testCachedNone(self):
+        cache = PropertiesCache()
+        cache.put(("foo",), None)
+        self.assertTrue(cache.get(("foo",)) is None)
+        
+    def testExpired(self):
+        cache = PropertiesCache(ttl=0.01)
+        cache.put(("foo",), {"n_cpu":4})
+        self.assertTrue(cache.get(("foo",)) == {"n_cpu":4})
+        time.sleep(0.05)
+        self.assertTrue(cache.get(("foo",)) is PropertiesCache.missing)
+        
+    def testEviction(self):
+        cache = PropertiesCache(maxSize=2)
+        cache.put(("a",), 1)
+        cache.put(("b",), 2)
+        cache.get(("a",))
+        cache.put(("c",), 3)
+        self.assertTrue(cache.get(("a",)) == 1)
+        self.assertTrue(cache.get(("b",)) is PropertiesCache.missing)
+        self.assertTrue(cache.get(("c",)) == 3)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import unittest
+import shutil
+import tempfile
+import uuid
+from datetime import datetime
+from commons import *
+
+class RawCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.cacheDir = tempfile.mkdtemp()
+        
+    def tearDown(self):
+        shutil.rmtree(self.cacheDir)
+        
+    def writeRows(self):
+        rows = [{"trial_id":"t1", "container_id":"a", "read_time":"x", "cpu_percent_usage":1.5, "cpu_percpu_percent_usage":[1.0, 2.0]}, \
+                {"trial_id":"t1", "container_id":"b", "read_time":"y", "cpu_percent_usage":2.5, "cpu_percpu_percent_usage":[3.0, 4.0]}, \
+                {"trial_id":"t1", "container_id":"a", "read_time":"z", "cpu_percent_usage":None, "cpu_percpu_percent_usage":None}]
+        return writeRawCache(self.cacheDir, "e1", "t1", "environment_data", iter(rows), fingerprint="environment_data:3:z")
+        
+    def testManifest(self):
+        self.writeRows()
+        manifest = readRawCacheManifest(self.cacheDir, "e1", "t1", "environment_data")
+        self.assertTrue(manifest["rows"] == 3)
+        self.assertTrue(manifest["fingerprint"] == "environment_data:3:z")
+        self.assertTrue(manifest["columns"]["cpu_percent_usage"] == [[np.dtype(float).str, True]])
+        self.assertTrue(manifest["columns"]["container_id"] == [["bytes", False]])
+        self.assertTrue(readRawCacheManifest(self.cacheDir, "e1", "t2", "environment_data") is None)
+        
+    def testLoadSlice(self):
+        manifest = self.writeRows()
+        path = getRawCachePath(self.cacheDir, "e1", "t1", "environment_data")
+        rows = list(loadRawCacheSlice(path, manifest, 0, 3, ["read_time", "cpu_percpu_percent_usage"], {"container_id":"a"}))
+        self.assertTrue(rows == [{"read_time":"x", "cpu_percpu_percent_usage":[1.0, 2.0]}, {"read_time":"z", "cpu_percpu_percent_usage":None}])
+        
+    def testNumericColumn(self):
+        rows = [{"trial_id":"t1", "size":10}, {"trial_id":"t1", "size":20}]
+        manifest = writeRawCache(self.cacheDir, "e1", "t1", "database_sizes", iter(rows))
+        self.assertTrue(manifest["columns"]["size"][0][0] != "object")
+        path = getRawCachePath(self.cacheDir, "e1", "t1", "database_sizes")
+        sizes = [r["size"] for r in loadRawCacheSlice(path, manifest, 0, 2, ["size"])]
+        self.assertTrue(sizes == [10, 20] and isinstance(sizes[0], int))
+        
+    def testNativeColumns(self):
+        instanceID = uuid.uuid4()
+        rows = [{"trial_id":u"t1", "process_name":u"caf\xe9", "source_process_instance_id":instanceID, "start_time":datetime(2016, 5, 1, 10, 0, 0, 250), "to_ignore":False}, \
+                {"trial_id":u"t1", "process_name":None, "source_process_instance_id":None, "start_time":None, "to_ignore":None}]
+        manifest = writeRawCache(self.cacheDir, "e1", "t1", "process", iter(rows))
+        self.assertTrue(all(e[0][0] != "object" for e in manifest["columns"].values()))
+        path = getRawCachePath(self.cacheDir, "e1", "t1", "process")
+        self.assertTrue(list(loadRawCacheSlice(path, manifest, 0, 2, rows[0].keys())) == rows)
+        
+    def testChunks(self):
+        rows = [{"trial_id":"t1", "size":i, "dbms":None if i < 4 else "mysql"} for i in range(7)]
+        manifest = writeRawCache(self.cacheDir, "e1", "t1", "database_sizes", iter(rows), 3)
+        self.assertTrue(manifest["rows"] == 7 and manifest["columns"]["dbms"] == [[None, True], ["bytes", True], ["bytes", False]])
+        path = getRawCachePath(self.cacheDir, "e1", "t1", "database_sizes")
+        self.assertTrue(list(loadRawCacheSlice(path, manifest, 2, 6, ["trial_id", "size", "dbms"])) == rows[2:6])
+        self.assertTrue(list(loadRawCacheSlice(path, manifest, 0, 7, ["size"], {"dbms":"mysql"})) == [{"size":i} for i in range(4, 7)])
+        
+    def testInvalidate(self):
+        self.writeRows()
+        invalidateRawCache(self.cacheDir, "e1", "t1")
+        self.assertTrue(readRawCacheManifest(self.cacheDir, "e1", "t1", "environment_data") is None)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,37 @@
+import unittest
+import uuid
+from commons import *
+
+class ResultsDiffTestCase(unittest.TestCase):
+    def testNumbers(self):
+        self.assertTrue(resultValuesEqual(1, 1.0, 1e-09))
+        self.assertTrue(resultValuesEqual(1000.0, 1000.0000001, 1e-09))
+        self.assertFalse(resultValuesEqual(1000.0, 1000.1, 1e-09))
+        self.assertTrue(resultValuesEqual(1e-12, 0, 1e-09))
+        self.assertTrue(resultValuesEqual(float("NaN"), float("NaN"), 1e-09))
+        self.assertFalse(resultValuesEqual(float("NaN"), 1.0, 1e-09))
+        
+    def testNone(self):
+        self.assertTrue(resultValuesEqual(None, None, 1e-09))
+        self.assertTrue(resultValuesEqual([], None, 1e-09))
+        self.assertFalse(resultValuesEqual(0, None, 1e-09))
+        
+    def testCollections(self):
+        self.assertTrue(resultValuesEqual([1, 2.0000000001], (1.0, 2), 1e-09))
+        self.assertFalse(resultValuesEqual([1, 2], [1, 2, 3], 1e-09))
+        self.assertTrue(resultValuesEqual({"a":[1]}, {"a":[1.0]}, 1e-09))
+        self.assertFalse(resultValuesEqual({"a":1}, {"b":1}, 1e-09))
+        
+    def testOthers(self):
+        runID = uuid.uuid1()
+        self.assertTrue(resultValuesEqual(runID, str(runID), 1e-09))
+        self.assertFalse(resultValuesEqual("foo_1", "foo_2", 1e-09))
+        
+    def testRows(self):
+        row = {"trial_id":"foo_1", "cpu_mean":1.5, "cpu_min_packed":encodePackedArray([1, 2])}
+        self.assertTrue(resultRowsEqual(row, {"trial_id":"foo_1", "cpu_mean":1.5, "cpu_min_packed":str(encodePackedArray([1, 2], "float32")), "cpu_max":3}, 1e-09))
+        self.assertFalse(resultRowsEqual(row, {"trial_id":"foo_1", "cpu_mean":1.5, "cpu_min_packed":encodePackedArray([1, 3])}, 1e-09))
+        self.assertFalse(resultRowsEqual(row, {"trial_id":"foo_1", "cpu_min_packed":encodePackedArray([1, 2])}, 1e-09))
+
+if __name__ == '__main__':
+    unittest.main()
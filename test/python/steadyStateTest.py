@@ -0,0 +1,34 @@
+import unittest
+from commons import *
+
+class SteadyStateTestCase(unittest.TestCase):
+    def testEmpty(self):
+        data = []
+        self.assertTrue(computeMSER(data) == 0)
+        self.assertTrue(detectSteadyState(data) == (0, 0))
+        
+    def testConstant(self):
+        data = [2]*100
+        self.assertTrue(computeMSER(data) == 0)
+        self.assertTrue(detectSteadyState(data) == (0, 100))
+        
+    def testWarmUp(self):
+        data = range(0, 50, 1) + [50]*200
+        truncation = computeMSER(data)
+        self.assertTrue(truncation >= 40)
+        self.assertTrue(truncation <= 50)
+        
+    def testWarmUpAndCoolDown(self):
+        data = range(0, 50, 1) + [50]*200 + range(50, 0, -1)
+        start, end = detectSteadyState(data)
+        self.assertTrue(start >= 40 and start <= 50)
+        self.assertTrue(end >= 250 and end <= 260)
+        
+    def testReadTime(self):
+        self.assertTrue(parseReadTime("1970-01-01T00:00:10Z") == 10)
+        self.assertTrue(parseReadTime("1970-01-01T01:00:10+01:00") == 10)
+        self.assertTrue(abs(parseReadTime("2016-03-18T13:01:05.517955063+01:00") - 1458302465.517955063) < 1e-6)
+        self.assertTrue(parseReadTime(None) is None)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,37 @@
+import unittest
+import numpy as np
+from commons import *
+
+class ValuesBufferTestCase(unittest.TestCase):
+    def testEmpty(self):
+        values = ValuesBuffer().toArray()
+        self.assertTrue(len(values) == 0)
+        self.assertTrue(computeMetrics(values)["num_data_points"] == 0)
+        
+    def testIntegers(self):
+        values = ValuesBuffer()
+        values.extend([3, 1, 2])
+        data = values.toArray()
+        self.assertTrue(data.dtype == np.int64)
+        self.assertTrue(list(data) == [3, 1, 2])
+        self.assertTrue(computeMetrics(data)["min"] == 1)
+        
+    def testToFloat(self):
+        values = ValuesBuffer()
+        values.extend([1, 2, 2.5])
+        data = values.toArray()
+        self.assertTrue(data.dtype == np.float64)
+        self.assertTrue(list(data) == [1.0, 2.0, 2.5])
+        
+    def testSpill(self):
+        values = ValuesBuffer(spillThreshold=10)
+        values.chunkSize = 4
+        values.extend(range(25))
+        values.append(0.5)
+        data = values.toArray()
+        self.assertTrue(isinstance(data, np.memmap))
+        self.assertTrue(list(data) == range(25) + [0.5])
+        self.assertTrue(computeMetrics(data)["num_data_points"] == 26)
+
+if __name__ == '__main__':
+    unittest.main()
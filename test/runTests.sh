@@ -13,10 +13,20 @@ HOST_NAME=docker_host
 echo "Starting Python tests"
 
 python2.7 /test/pythonTests/computeMetricsTest.py
+python2.7 /test/pythonTests/steadyStateTest.py
+python2.7 /test/pythonTests/propertiesCacheTest.py
+python2.7 /test/pythonTests/rawCacheTest.py
+python2.7 /test/pythonTests/valuesBufferTest.py
+python2.7 /test/pythonTests/localCassandraTest.py
+python2.7 /test/pythonTests/analyserConfigurationTest.py
+python2.7 /test/pythonTests/packedArrayTest.py
+python2.7 /test/pythonTests/resultsDiffTest.py
+python2.7 /test/pythonTests/fingerprintTest.py
+python2.7 /test/pythonTests/backfillTest.py
 
 echo "Starting Spark tests"
 
-for SCRIPT in "computeModeTest" "cutNInitialProcessesTest" "computeExperimentsMetricsTest"
+for SCRIPT in "computeModeTest" "cutNInitialProcessesTest" "computeExperimentsMetricsTest" "computeMetricsDataFrameTest" "computeGroupedMetricsTest" "analyserRunTest" "tracerTest" "cacheScopeTest"
 do 
 	$SPARK_HOME/bin/spark-submit \
 	--master $SPARK_MASTER \
@@ -31,6 +41,21 @@ do
 	sleep 5
 done
 
+for SCRIPT in "localCassandraTest"
+do 
+	$SPARK_HOME/bin/spark-submit \
+	--master $SPARK_MASTER \
+	--jars $PYSPARK_CASSANDRA_JAR_PATH \
+    --driver-class-path $PYSPARK_CASSANDRA_JAR_PATH \
+	--py-files $ANALYSERS_PATH/commons/commons.py,$ANALYSERS_PATH/commons/localCassandra.py,$ANALYSERS_PATH/trials/bucketRawData.py,$PYSPARK_CASSANDRA_JAR_PATH \
+	/test/sparkTests/$SCRIPT.py
+	if [ "$?" = "1" ]; then
+		exit 1
+	fi
+	echo $SCRIPT completed without errors
+	sleep 5
+done
+
 for SCRIPT in "databaseSizeTest"
 do 
 	$SPARK_HOME/bin/spark-submit \
@@ -61,13 +86,43 @@ do
 	sleep 5
 done
 
+for SCRIPT in "environmentRollupTest"
+do 
+	$SPARK_HOME/bin/spark-submit \
+	--master $SPARK_MASTER \
+	--jars $PYSPARK_CASSANDRA_JAR_PATH \
+    --driver-class-path $PYSPARK_CASSANDRA_JAR_PATH \
+	--py-files $ANALYSERS_PATH/trials/environmentRollup.py,$ANALYSERS_PATH/commons/commons.py,$PYSPARK_CASSANDRA_JAR_PATH \
+	/test/sparkTests/$SCRIPT.py
+	if [ "$?" = "1" ]; then
+		exit 1
+	fi
+	echo $SCRIPT completed without errors
+	sleep 5
+done
+
+for SCRIPT in "networkTest"
+do 
+	$SPARK_HOME/bin/spark-submit \
+	--master $SPARK_MASTER \
+	--jars $PYSPARK_CASSANDRA_JAR_PATH \
+    --driver-class-path $PYSPARK_CASSANDRA_JAR_PATH \
+	--py-files $ANALYSERS_PATH/trials/network.py,$ANALYSERS_PATH/commons/commons.py,$PYSPARK_CASSANDRA_JAR_PATH \
+	/test/sparkTests/$SCRIPT.py
+	if [ "$?" = "1" ]; then
+		exit 1
+	fi
+	echo $SCRIPT completed without errors
+	sleep 5
+done
+
 for SCRIPT in "computeExperimentCoreMetricsTest"
 do 
 	$SPARK_HOME/bin/spark-submit \
 	--master $SPARK_MASTER \
 	--jars $PYSPARK_CASSANDRA_JAR_PATH \
     --driver-class-path $PYSPARK_CASSANDRA_JAR_PATH \
-	--py-files $ANALYSERS_PATH/experiments/cpu.py,$PYSPARK_CASSANDRA_JAR_PATH \
+	--py-files $ANALYSERS_PATH/experiments/cpu.py,$ANALYSERS_PATH/commons/commons.py,$PYSPARK_CASSANDRA_JAR_PATH \
 	/test/sparkTests/$SCRIPT.py
 	if [ "$?" = "1" ]; then
 		exit 1
@@ -78,7 +133,7 @@ done
 
 echo "Starting Cassandra tests"
 
-for SCRIPT in "cpu" "ram" "IO" "databaseSize" "processDuration" "executionTime" "numberOfProcessInstances" "throughput"
+for SCRIPT in "cpu" "ram" "IO" "databaseSize" "processDuration" "executionTime" "numberOfProcessInstances" "throughput" "environmentRollup"
 do 
 	$SPARK_HOME/bin/spark-submit \
 	--master $SPARK_MASTER \
@@ -95,6 +150,40 @@ do
 	sleep 5
 done
 
+for SCRIPT in "resources"
+do 
+	$SPARK_HOME/bin/spark-submit \
+	--master $SPARK_MASTER \
+	--jars $PYSPARK_CASSANDRA_JAR_PATH \
+    --driver-class-path $PYSPARK_CASSANDRA_JAR_PATH \
+	--conf spark.cassandra.connection.host=$CASSANDRA_HOST \
+	--py-files $ANALYSERS_PATH/commons/commons.py,$ANALYSERS_PATH/trials/cpu.py,$ANALYSERS_PATH/trials/ram.py,$ANALYSERS_PATH/trials/IO.py,$PYSPARK_CASSANDRA_JAR_PATH \
+	$ANALYSERS_PATH/trials/$SCRIPT.py \
+	'{"cassandra_keyspace":"benchflow", "config_file": "'$CONFIG_FILE'", "trial_id": "'$TRIAL_ID'", "experiment_id": "'$EXPERIMENT_ID'"}'
+	if [ "$?" = "1" ]; then
+		exit 1
+	fi
+	echo $SCRIPT completed without errors
+	sleep 5
+done
+
+for SCRIPT in "environment"
+do 
+	$SPARK_HOME/bin/spark-submit \
+	--master $SPARK_MASTER \
+	--jars $PYSPARK_CASSANDRA_JAR_PATH \
+    --driver-class-path $PYSPARK_CASSANDRA_JAR_PATH \
+	--conf spark.cassandra.connection.host=$CASSANDRA_HOST \
+	--py-files $ANALYSERS_PATH/commons/commons.py,$ANALYSERS_PATH/trials/cpu.py,$ANALYSERS_PATH/trials/ram.py,$PYSPARK_CASSANDRA_JAR_PATH \
+	$ANALYSERS_PATH/trials/$SCRIPT.py \
+	'{"cassandra_keyspace":"benchflow", "config_file": "'$CONFIG_FILE'", "trial_id": "'$TRIAL_ID'", "experiment_id": "'$EXPERIMENT_ID'", "container_id": "'$CONTAINER_ID'", "container_name": "'$CONTAINER_NAME'", "host_id": "'$HOST_NAME'"}'
+	if [ "$?" = "1" ]; then
+		exit 1
+	fi
+	echo $SCRIPT completed without errors
+	sleep 5
+done
+
 for SCRIPT in "cpu" "ram" "IO" "databaseSize" "processDuration" "executionTime" "numberOfProcessInstances" "throughput"
 do 
 	$SPARK_HOME/bin/spark-submit \
@@ -0,0 +1,51 @@
+from pyspark_cassandra import CassandraSparkContext
+from pyspark import SparkConf
+
+#Test that the jobs are counted in the stage that started them, and the whole run in the run stage
+def testStages(sc):
+    import commons
+    from commons import startAnalyserRun, analyserStage, computeMode
+    
+    run = startAnalyserRun(sc, "test", "/analysers/trials/test.py", "experiment", ["trial1", "trial2"])
+    
+    sc.parallelize(range(10)).count()
+    with analyserStage("read"):
+        sc.parallelize(range(10)).count()
+        sc.parallelize(range(10)).count()
+    computeMode(sc.parallelize([(1, 1), (2, 1), (1, 1)]))
+    assert commons.analyserRun is run, "Current run incorrect"
+    
+    rows = run.summary()
+    assert len(rows) == 2 * 4, "Rows incorrect, expected the run, compute, read and mode stages of 2 trials"
+    stages = dict((r["stage"], r) for r in rows if r["trial_id"] == "trial1")
+    assert stages["run"]["analyser"] == "trials/test", "Analyser incorrect, expected trials/test"
+    assert stages["compute"]["jobs"] == 1, "Compute jobs incorrect, expected 1"
+    assert stages["read"]["jobs"] == 2, "Read jobs incorrect, expected 2"
+    assert stages["mode"]["jobs"] > 0, "Mode jobs incorrect, expected some"
+    assert stages["run"]["jobs"] == stages["compute"]["jobs"] + stages["read"]["jobs"] + stages["mode"]["jobs"], "Run jobs incorrect"
+    assert stages["run"]["wall_time"] >= stages["read"]["wall_time"] + stages["compute"]["wall_time"], "Run wall time incorrect"
+    assert stages["run"]["trials"] == 2, "Trials incorrect, expected 2"
+    assert run.getRowsRead() == stages["run"]["rows_read"], "Rows read incorrect, expected the ones of the run stage"
+
+#Test that stages outside of a run are ignored
+def testNoRun(sc):
+    import commons
+    from commons import analyserStage
+    
+    commons.analyserRun = None
+    with analyserStage("read"):
+        assert sc.parallelize(range(10)).count() == 10, "Count incorrect, expected 10"
+
+def main():
+    # Set configuration for spark context
+    conf = SparkConf() \
+        .setAppName("Test") \
+        .setMaster("local")
+    sc = CassandraSparkContext(conf=conf)
+    
+    testStages(sc)
+    testNoRun(sc)
+    print("All tests passed")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+from pyspark_cassandra import CassandraSparkContext
+from pyspark import SparkConf
+
+#Test that the datasets cached in a scope are unpersisted when it exits, also on errors
+def testScope(sc):
+    from commons import CacheScope, cacheDataset, getCachedBytes
+    
+    outer = sc.parallelize(range(1000))
+    with CacheScope():
+        cacheDataset(outer)
+        try:
+            with CacheScope():
+                inner = cacheDataset(sc.parallelize(range(1000)))
+                assert inner.count() == 1000, "Count incorrect, expected 1000"
+                assert inner.is_cached, "Inner dataset not cached"
+                raise ValueError("test")
+        except ValueError:
+            pass
+        assert not inner.is_cached, "Inner dataset not unpersisted on exit"
+        assert outer.is_cached, "Outer dataset unpersisted by the inner scope"
+        outer.count()
+        assert getCachedBytes(sc) > 0, "Cached bytes incorrect, expected some"
+    assert not outer.is_cached, "Outer dataset not unpersisted on exit"
+    assert getCachedBytes(sc) == 0, "Cached bytes incorrect, expected none"
+
+#Test that the run records the peak of the cached bytes and unpersists what it cached when it finishes
+def testRun(sc):
+    import commons
+    from commons import startAnalyserRun, cacheDataset, uncacheDataset
+    
+    run = startAnalyserRun(sc, "test", "/analysers/trials/test.py", "experiment", ["trial"])
+    first = cacheDataset(sc.parallelize(range(1000)))
+    first.count()
+    uncacheDataset(first)
+    assert not first.is_cached, "Dataset not unpersisted"
+    assert run.peakCachedBytes > 0, "Peak cached bytes incorrect, expected some"
+    
+    second = cacheDataset(sc.parallelize(range(1000)))
+    second.count()
+    run.cacheScope.close()
+    assert not second.is_cached, "Dataset not unpersisted at the end of the run"
+    assert all(r["cached_bytes"] == run.peakCachedBytes for r in run.summary()), "Cached bytes of the rows incorrect"
+    commons.analyserRun = None
+
+#Test that the auto storage level goes to disk once the cached data reaches the memory budget
+def testStorageLevel(sc):
+    import commons
+    from commons import CacheScope, cacheDataset, getStorageLevel
+    from pyspark import StorageLevel
+    
+    commons.analyserConfiguration = dict(commons.analyserConfigurationDefaults, cache_memory_budget=1)
+    assert getStorageLevel() == StorageLevel.MEMORY_ONLY, "Storage level incorrect, expected MEMORY_ONLY"
+    with CacheScope():
+        cacheDataset(sc.parallelize(range(1000))).count()
+        assert getStorageLevel() == StorageLevel.MEMORY_AND_DISK, "Storage level incorrect, expected MEMORY_AND_DISK"
+    commons.analyserConfiguration = dict(commons.analyserConfigurationDefaults)
+
+def main():
+    # Set configuration for spark context
+    conf = SparkConf() \
+        .setAppName("Test") \
+        .setMaster("local")
+    sc = CassandraSparkContext(conf=conf)
+    
+    testScope(sc)
+    testRun(sc)
+    testStorageLevel(sc)
+    print("All tests passed")
+
+if __name__ == '__main__':
+    main()
@@ -102,6 +102,28 @@ def testNullElements(sc):
     assert result["q3_min"] is None, "Experiment metric value incorrect, expected None"
     assert result["q3_max"] is None, "Experiment metric value incorrect, expected None"
     assert result["weighted_avg"] is None, "Experiment metric value incorrect, expected None"
+    
+#Test for data set with a null element in one of the trials: the minimums are None, the maximums skip it
+def testSomeNullElements(sc):
+    from cpu import computeExperimentCoreMetrics
+    
+    data = [{"cpu_mean":[None], "cpu_min":[None], "cpu_max":[None], "cpu_q1":[None], \
+             "cpu_q2":[None], "cpu_q3":[None], "cpu_p95":[None], "cpu_num_data_points":1, \
+             "cpu_p90":[None], "cpu_p99":[None], \
+             "trial_id":"foo_1", "experiment_id":"foo"}, \
+            {"cpu_mean":[2], "cpu_min":[1], "cpu_max":[3], "cpu_q1":[1], \
+             "cpu_q2":[2], "cpu_q3":[3], "cpu_p95":[3], "cpu_num_data_points":1, \
+             "cpu_p90":[3], "cpu_p99":[3], \
+             "trial_id":"foo_2", "experiment_id":"foo"}]
+    
+    dataRDD = sc.parallelize(data)
+        
+    result = computeExperimentCoreMetrics(dataRDD, 0)
+    assert result["min"] is None, "Experiment metric value incorrect, expected None"
+    assert result["max"] == 3, "Experiment metric value incorrect, expected 3"
+    assert result["q1_min"] is None, "Experiment metric value incorrect, expected None"
+    assert result["q1_max"] == 1, "Experiment metric value incorrect, expected 1"
+    assert result["weighted_avg"] is None, "Experiment metric value incorrect, expected None"
            
 def main():
     # Set configuration for spark context
@@ -114,6 +136,7 @@ def main():
     testOneElement(sc)
     testTwoElements(sc)
     testNullElements(sc)
+    testSomeNullElements(sc)
     print("All tests passed")
 
 if __name__ == '__main__':
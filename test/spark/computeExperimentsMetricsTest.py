@@ -221,6 +221,22 @@ def testAllSameElements(sc):
     assert result["worst"] == ["foo_1", "foo_2", "foo_3"], "Experiment metric value incorrect, expected foo_1, foo_2, foo_3"
     assert result["average"] == ["foo_1", "foo_2", "foo_3"], "Experiment metric value incorrect, expected foo_1, foo_2, foo_3"
            
+#Test that the metrics of the collected rows of the trials are the ones computed on the RDD
+def testCollectedTrials(sc):
+    from commons import computeExperimentMetrics, computeCombinedVar, computeTrialsExperimentMetrics, computeTrialsCombinedVar
+    
+    data = [{"data_mean":m, "data_min":m - 1, "data_max":m + 1, "data_q1":m, "data_q2":m, "data_q3":m, "data_p90":m, "data_p95":m, \
+             "data_p99":m, "data_me":me, "data_num_data_points":n, "data_variance":0.5, "trial_id":"foo_%d" % i, "experiment_id":"foo"} \
+            for i, (m, me, n) in enumerate([(1.0, 0.5, 3), (1.0, 0.2, 1), (2.5, 0.0, 2), (4.0, 0.1, 4), (4.0, 0.1, 5)])]
+    
+    dataRDD = sc.parallelize(data, 2)
+    
+    result = computeExperimentMetrics(dataRDD, "data")
+    collected = computeTrialsExperimentMetrics(data, "data")
+    assert all(abs(collected[k] - result[k]) < 1e-9 if isinstance(result[k], float) else collected[k] == result[k] for k in collected), \
+            "Experiment metrics of the collected trials incorrect"
+    assert abs(computeTrialsCombinedVar(data, "data") - computeCombinedVar(dataRDD, "data")) < 1e-9, "Combined variance of the collected trials incorrect"
+
 def main():
     # Set configuration for spark context
     conf = SparkConf() \
@@ -234,6 +250,7 @@ def main():
     testThreeElements(sc)
     testFourElements(sc)
     testAllSameElements(sc)
+    testCollectedTrials(sc)
     print("All tests passed")
 
 if __name__ == '__main__':
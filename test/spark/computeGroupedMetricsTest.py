@@ -0,0 +1,62 @@
+from pyspark_cassandra import CassandraSparkContext
+from pyspark import SparkConf
+
+#Test with no elements
+def testEmpty(sc):
+    from commons import computeGroupedMetrics
+    
+    dataRDD = sc.parallelize([])
+    
+    result = computeGroupedMetrics(dataRDD, lambda r: [None, r["group"]], "value")
+    assert len(result) == 0, "Groups incorrect, expected none"
+
+#Test that every group, and the group of all the rows, gets the mode and the metrics of its values
+def testGroups(sc):
+    from commons import computeGroupedMetrics
+    
+    data = [{"group":"a", "value":1}, {"group":"a", "value":1}, {"group":"a", "value":3}, \
+            {"group":"b", "value":2}, {"group":"b", "value":None}]
+    
+    dataRDD = sc.parallelize(data)
+    
+    result = computeGroupedMetrics(dataRDD, lambda r: [None, r["group"]], "value")
+    assert len(result) == 3, "Groups incorrect, expected None, a and b"
+    
+    mode, metrics = result[None]
+    assert mode[0] == [1], "Mode value incorrect, expected 1"
+    assert mode[1] == 2, "Mode frequency incorrect, expected 2"
+    assert metrics["num_data_points"] == 4, "Number of data points incorrect, expected 4"
+    
+    mode, metrics = result["a"]
+    assert mode[0] == [1], "Mode value incorrect, expected 1"
+    assert metrics["max"] == 3, "Max incorrect, expected 3"
+    
+    mode, metrics = result["b"]
+    assert mode[1] == 1, "Mode frequency incorrect, expected 1"
+    assert metrics["num_data_points"] == 1, "Number of data points incorrect, expected 1"
+
+#Test that a group whose values are all None gets no mode
+def testNoneValues(sc):
+    from commons import computeGroupedMetrics
+    
+    dataRDD = sc.parallelize([{"group":"a", "value":None}])
+    
+    result = computeGroupedMetrics(dataRDD, lambda r: [r["group"]], "value")
+    mode, metrics = result["a"]
+    assert mode[0] is None, "Mode value incorrect, expected None"
+    assert mode[1] is None, "Mode frequency incorrect, expected None"
+           
+def main():
+    # Set configuration for spark context
+    conf = SparkConf() \
+        .setAppName("Test") \
+        .setMaster("local")
+    sc = CassandraSparkContext(conf=conf)
+    
+    testEmpty(sc)
+    testGroups(sc)
+    testNoneValues(sc)
+    print("All tests passed")
+
+if __name__ == '__main__':
+    main()
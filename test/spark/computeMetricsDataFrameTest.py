@@ -0,0 +1,56 @@
+from pyspark_cassandra import CassandraSparkContext
+from pyspark import SparkConf
+
+#Test that the DataFrame metrics match computeMetrics, with approximated percentiles
+def testMatchesComputeMetrics(sc):
+    from commons import computeMetrics, computeMetricsDataFrame, getSQLContext
+    
+    data = [3, 1, 4, 1, 5, 9, 2, 6, 5, 3, 5]
+    
+    df = getSQLContext(sc).createDataFrame([("foo", d) for d in data], ["group", "value"])
+    
+    expected = computeMetrics(data)
+    result = computeMetricsDataFrame(df, "value", ["group"])[("foo",)]
+    
+    for metric in ["num_data_points", "min", "max"]:
+        assert result[metric] == expected[metric], "Wrong " + metric
+    for metric in ["mean", "variance", "sd", "me", "ci095_min", "ci095_max"]:
+        assert abs(result[metric] - expected[metric]) < 1e-9, "Wrong " + metric
+    assert result["q2"] in data, "Approximated median is not a data point"
+    assert len(result["percentiles"]) == 101, "Wrong number of percentiles"
+    
+#Test the integral over the order of the data
+def testIntegral(sc):
+    from commons import computeMetrics, computeMetricsDataFrame, getSQLContext
+    
+    data = [1, 3, 2, 5]
+    
+    df = getSQLContext(sc).createDataFrame([(i, d) for i, d in enumerate(data)], ["time", "value"])
+    
+    result = computeMetricsDataFrame(df, "value", orderBy="time")[()]
+    assert result["integral"] == computeMetrics(data)["integral"], "Wrong integral"
+    
+#Test the mode of each group
+def testMode(sc):
+    from commons import computeModeDataFrame, getSQLContext
+    
+    df = getSQLContext(sc).createDataFrame([("foo", 1), ("foo", 1), ("foo", 2), ("bar", 3), ("bar", 4)], ["group", "value"])
+    
+    result = computeModeDataFrame(df, "value", ["group"])
+    assert result[("foo",)] == ([1], 2), "Wrong mode"
+    assert sorted(result[("bar",)][0]) == [3, 4] and result[("bar",)][1] == 1, "Wrong multiple mode"
+           
+def main():
+    # Set configuration for spark context
+    conf = SparkConf() \
+        .setAppName("Test") \
+        .setMaster("local")
+    sc = CassandraSparkContext(conf=conf)
+    
+    testMatchesComputeMetrics(sc)
+    testIntegral(sc)
+    testMode(sc)
+    print("All tests passed")
+
+if __name__ == '__main__':
+    main()
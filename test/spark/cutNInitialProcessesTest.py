@@ -10,7 +10,7 @@ def testEmpty(sc):
     dataRDD = sc.parallelize(data)
         
     result = cutNInitialProcesses(dataRDD, 1)
-    assert (len(result) == 0), "Wrong number of cut processes"
+    assert (result.count() == 0), "Wrong number of cut processes"
     
 def testOneElement(sc):
     from commons import cutNInitialProcesses
@@ -20,7 +20,7 @@ def testOneElement(sc):
     dataRDD = sc.parallelize(data)
         
     result = cutNInitialProcesses(dataRDD, 2)
-    assert (len(result) == 1), "Wrong number of cut processes, expected 1"
+    assert (result.count() == 1), "Wrong number of cut processes, expected 1"
     
 def testTwoProcessesCutOne(sc):
     from commons import cutNInitialProcesses
@@ -33,7 +33,7 @@ def testTwoProcessesCutOne(sc):
     dataRDD = sc.parallelize(data)
         
     result = cutNInitialProcesses(dataRDD, 1)
-    assert (len(result) == 1), "Wrong number of cut processes, expected 1"
+    assert (result.count() == 1), "Wrong number of cut processes, expected 1"
     
 def testOneProcessCutOne(sc):
     from commons import cutNInitialProcesses
@@ -44,7 +44,7 @@ def testOneProcessCutOne(sc):
     dataRDD = sc.parallelize(data)
     
     result = cutNInitialProcesses(dataRDD, 1)
-    assert (len(result) == 1), "Wrong number of cut processes, expected 1"
+    assert (result.count() == 1), "Wrong number of cut processes, expected 1"
     
 def testOneProcessCutTwo(sc):
     from commons import cutNInitialProcesses
@@ -55,7 +55,69 @@ def testOneProcessCutTwo(sc):
     dataRDD = sc.parallelize(data)
         
     result = cutNInitialProcesses(dataRDD, 2)
-    assert (len(result) == 2), "Wrong number of cut processes, expected 2"
+    assert (result.count() == 2), "Wrong number of cut processes, expected 2"
+    
+def testTwoProcessesCutOneDistinctInstances(sc):
+    from commons import cutNInitialProcesses
+    
+    data = [{"process_definition_id":"foo", "source_process_instance_id":"foo1", "start_time":1, "duration":1}, \
+            {"process_definition_id":"foo", "source_process_instance_id":"foo2", "start_time":3, "duration":1}, \
+            {"process_definition_id":"bar", "source_process_instance_id":"bar1", "start_time":2, "duration":1}, \
+            {"process_definition_id":"bar", "source_process_instance_id":"bar2", "start_time":4, "duration":1}]
+    
+    dataRDD = sc.parallelize(data, 2)
+    
+    result = cutNInitialProcesses(dataRDD, 1)
+    assert ([r["source_process_instance_id"] for r in result.collect()] == ["foo2", "bar2"]), "Wrong remaining processes, expected foo2 and bar2"
+    
+def testMarkTies(sc):
+    from commons import markNInitialProcesses
+    
+    #Instances started at the same time are ordered by source process instance id, and all the ones up to the latest first
+    #instance are warm-up
+    data = [{"process_definition_id":"foo", "source_process_instance_id":"foo1", "start_time":1, "duration":1}, \
+            {"process_definition_id":"bar", "source_process_instance_id":"bar1", "start_time":1, "duration":1}, \
+            {"process_definition_id":"bar", "source_process_instance_id":"bar2", "start_time":1, "duration":1}, \
+            {"process_definition_id":"bar", "source_process_instance_id":"bar3", "start_time":2, "duration":1}]
+    
+    dataRDD = sc.parallelize(data, 2)
+    
+    result = markNInitialProcesses(dataRDD, 1) \
+            .map(lambda r: (r["source_process_instance_id"], r["to_ignore"])) \
+            .collectAsMap()
+    assert result == {"foo1":True, "bar1":True, "bar2":True, "bar3":False}, "Wrong marked processes, expected the ones up to (1, foo1)"
+    
+def testMarkKeepsIgnored(sc):
+    from commons import markNInitialProcesses
+    
+    data = [{"process_definition_id":"foo", "source_process_instance_id":"foo1", "start_time":1, "duration":1, "to_ignore":False}, \
+            {"process_definition_id":"foo", "source_process_instance_id":"foo2", "start_time":2, "duration":1, "to_ignore":False}, \
+            {"process_definition_id":"foo", "source_process_instance_id":"foo3", "start_time":3, "duration":1, "to_ignore":True}]
+    
+    dataRDD = sc.parallelize(data, 2)
+    
+    result = markNInitialProcesses(dataRDD, 1) \
+            .map(lambda r: (r["source_process_instance_id"], r["to_ignore"])) \
+            .collectAsMap()
+    assert result["foo1"] is True, "Warm-up process not marked"
+    assert result["foo2"] is False, "Steady state process marked"
+    assert result["foo3"] is True, "Already ignored process unmarked"
+    
+def testMarkPerTrial(sc):
+    from commons import markNInitialProcesses
+    
+    data = [{"trial_id":"t1", "process_definition_id":"foo", "source_process_instance_id":"foo1", "start_time":1, "duration":1}, \
+            {"trial_id":"t1", "process_definition_id":"foo", "source_process_instance_id":"foo2", "start_time":2, "duration":1}, \
+            {"trial_id":"t2", "process_definition_id":"foo", "source_process_instance_id":"foo3", "start_time":5, "duration":1}, \
+            {"trial_id":"t2", "process_definition_id":"foo", "source_process_instance_id":"foo4", "start_time":6, "duration":1}]
+    
+    dataRDD = sc.parallelize(data, 2)
+    
+    result = markNInitialProcesses(dataRDD, 1, trialField="trial_id") \
+            .map(lambda r: (r["source_process_instance_id"], r["to_ignore"])) \
+            .collectAsMap()
+    assert result["foo1"] is True and result["foo3"] is True, "Warm-up process of a trial not marked"
+    assert result["foo2"] is False and result["foo4"] is False, "Steady state process of a trial marked"
            
 def main():
     # Set configuration for spark context
@@ -69,6 +131,10 @@ def main():
     testTwoProcessesCutOne(sc)
     testOneProcessCutOne(sc)
     testOneProcessCutTwo(sc)
+    testTwoProcessesCutOneDistinctInstances(sc)
+    testMarkTies(sc)
+    testMarkKeepsIgnored(sc)
+    testMarkPerTrial(sc)
     print("All tests passed")
 
 if __name__ == '__main__':
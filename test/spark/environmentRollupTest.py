@@ -0,0 +1,74 @@
+from pyspark_cassandra import CassandraSparkContext
+from pyspark import SparkConf
+
+#Test with no data
+def testEmpty(sc):
+    from environmentRollup import computeRollups
+    
+    data = []
+    
+    dataRDD = sc.parallelize(data)
+        
+    result = computeRollups(dataRDD, [1, 10]).collect()
+    assert len(result) == 0, "Wrong number of rollups, expected 0"
+
+#Test for data in the same window
+def testOneWindow(sc):
+    from environmentRollup import computeRollups
+    
+    data = [{"container_id":"c", "host_id":"h", "read_time":"1970-01-01T00:00:10Z", "cpu_percent_usage":10.0, "memory_usage":None}, \
+            {"container_id":"c", "host_id":"h", "read_time":"1970-01-01T00:00:15Z", "cpu_percent_usage":30.0, "memory_usage":None}]
+    
+    dataRDD = sc.parallelize(data)
+        
+    result = computeRollups(dataRDD, [10]).collect()
+    assert len(result) == 1, "Wrong number of rollups, expected 1"
+    assert result[0]["metric"] == "cpu_percent_usage", "Wrong metric"
+    assert result[0]["min"] == 10.0, "Rollup min incorrect, expected 10"
+    assert result[0]["max"] == 30.0, "Rollup max incorrect, expected 30"
+    assert result[0]["mean"] == 20.0, "Rollup mean incorrect, expected 20"
+    assert result[0]["num_data_points"] == 2, "Rollup count incorrect, expected 2"
+
+#Test for data over many windows and window sizes
+def testManyWindows(sc):
+    from environmentRollup import computeRollups
+    
+    data = []
+    for i in range(120):
+        data.append({"container_id":"c", "host_id":"h", "read_time":"1970-01-01T00:%02d:%02dZ" % (i // 60, i % 60), \
+                     "cpu_percent_usage":float(i), "memory_usage":1.0})
+    
+    dataRDD = sc.parallelize(data, 4)
+        
+    result = computeRollups(dataRDD, [1, 10, 60]).collect()
+    windows = [r for r in result if r["metric"] == "cpu_percent_usage" and r["window_size"] == 60]
+    assert len(windows) == 2, "Wrong number of 60s windows, expected 2"
+    assert len(result) == 2 * (120 + 12 + 2), "Wrong number of rollups"
+
+#Test for the data of many trials rolled up in the same pass
+def testManyTrials(sc):
+    from environmentRollup import computeRollups
+    
+    data = [{"trial_id":"t1", "container_id":"c", "host_id":"h", "read_time":"1970-01-01T00:00:10Z", "cpu_percent_usage":10.0, "memory_usage":None}, \
+            {"trial_id":"t2", "container_id":"c", "host_id":"h", "read_time":"1970-01-01T00:00:15Z", "cpu_percent_usage":30.0, "memory_usage":None}]
+    
+    dataRDD = sc.parallelize(data, 2)
+        
+    result = computeRollups(dataRDD, [10], trialField="trial_id").collect()
+    assert sorted((r["trial_id"], r["mean"]) for r in result) == [("t1", 10.0), ("t2", 30.0)], "Rollups of the trials incorrect"
+           
+def main():
+    # Set configuration for spark context
+    conf = SparkConf() \
+        .setAppName("Test") \
+        .setMaster("local")
+    sc = CassandraSparkContext(conf=conf)
+    
+    testEmpty(sc)
+    testOneWindow(sc)
+    testManyWindows(sc)
+    testManyTrials(sc)
+    print("All tests passed")
+
+if __name__ == '__main__':
+    main()
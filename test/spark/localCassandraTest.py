@@ -0,0 +1,302 @@
+import os
+import tempfile
+
+from pyspark import SparkConf
+
+schema = """
+CREATE TABLE process (
+  experiment_id text,
+  trial_id text,
+  source_process_instance_id text,
+  start_time timestamp,
+  duration bigint,
+  PRIMARY KEY ((experiment_id, trial_id), source_process_instance_id)
+);
+CREATE TABLE process_bucketed (
+  experiment_id text,
+  trial_id text,
+  bucket int,
+  source_process_instance_id text,
+  start_time timestamp,
+  duration bigint,
+  PRIMARY KEY ((experiment_id, trial_id, bucket), source_process_instance_id)
+);
+CREATE TABLE raw_data_buckets (
+  experiment_id text,
+  trial_id text,
+  table_name text,
+  bucket int,
+  rows bigint,
+  source_rows bigint,
+  PRIMARY KEY ((experiment_id, trial_id), table_name, bucket)
+);
+CREATE TABLE trial_steady_state (
+  start_time double,
+  end_time double,
+  warm_up_points int,
+  cool_down_points int,
+  num_data_points bigint,
+  batch_size int,
+  experiment_id text,
+  trial_id text,
+  container_id text,
+  host_id text,
+  metric text,
+  PRIMARY KEY ((experiment_id, trial_id), container_id, host_id, metric)
+);
+CREATE TABLE trial_duration (
+  experiment_id text,
+  trial_id text,
+  duration_max bigint,
+  duration_mean double,
+  PRIMARY KEY ((experiment_id, trial_id))
+);
+CREATE TABLE trial_execution_time (
+  execution_time bigint,
+  process_definition_id text,
+  experiment_id text,
+  trial_id text,
+  PRIMARY KEY (experiment_id, trial_id, process_definition_id)
+);
+CREATE TABLE analyser_runs (
+  wall_time double,
+  jobs int,
+  stages int,
+  tasks int,
+  rows_read bigint,
+  shuffle_read_bytes bigint,
+  shuffle_write_bytes bigint,
+  driver_peak_rss bigint,
+  cached_bytes bigint,
+  rows_unchanged bigint,
+  rows_changed bigint,
+  rows_new bigint,
+  trials int,
+  experiment_id text,
+  trial_id text,
+  analyser text,
+  run_id timeuuid,
+  stage text,
+  PRIMARY KEY ((experiment_id), trial_id, analyser, run_id, stage)
+);
+CREATE TABLE analyser_fingerprints (
+  analyser_version text,
+  fingerprint text,
+  run_id timeuuid,
+  experiment_id text,
+  trial_id text,
+  analyser text,
+  arguments text,
+  PRIMARY KEY ((experiment_id, trial_id), analyser, arguments)
+);
+"""
+
+#Test reading one and many trials, and writing the results, through the local Cassandra stand-in
+def testReadWrite(sc, path):
+    from localCassandra import LocalCassandra
+    from commons import readTrials, ResultsWriter
+    
+    store = LocalCassandra(path)
+    store.keyspace = "test"
+    store.executeScript(schema)
+    store.insert("test", "process", ({"experiment_id":"e", "trial_id":"t" + str(i % 4), "source_process_instance_id":"p%04d" % i, "duration":i} \
+                                     for i in range(1000)))
+    
+    rows = readTrials(sc, "test", "process", ["duration"], "e", ["t0"]).collect()
+    assert len(rows) == 250, "Rows of a trial incorrect, expected 250"
+    assert all(r["trial_id"] == "t0" for r in rows), "Trial incorrect, expected t0"
+    
+    dataRDD = readTrials(sc, "test", "process", ["duration"], "e", ["t1", "t2"])
+    assert dataRDD.count() == 500, "Rows of two trials incorrect, expected 500"
+    
+    queries = dataRDD.map(lambda r: (r["trial_id"], r["duration"])) \
+            .reduceByKey(max) \
+            .map(lambda x: {"experiment_id":"e", "trial_id":x[0], "duration_max":x[1]}) \
+            .collect()
+    writer = ResultsWriter(sc, "test")
+    writer.add("trial_duration", queries)
+    writer.wait()
+    
+    results = sc.cassandraTable("test", "trial_duration").where("experiment_id=? AND trial_id=?", "e", "t2").collect()
+    assert results[0]["duration_max"] == 998, "Saved result incorrect, expected 998"
+    store.close()
+
+#Test that bucketed trials are read from the bucketed table, a task per bucket, while the raw data partition has the rows
+#bucketed, and the others from the raw data table
+def testBucketedRead(sc, path):
+    import commons
+    from datetime import datetime, timedelta
+    from localCassandra import LocalCassandra
+    from commons import readTrials, getRawDataBucket, analyserConfigurationDefaults
+    
+    store = LocalCassandra(path)
+    start = datetime(2017, 1, 1)
+    rows = [{"experiment_id":"e", "trial_id":"t0", "source_process_instance_id":"b%04d" % i, "start_time":start + timedelta(seconds=i), \
+             "duration":i} for i in range(1000)]
+    for row in rows:
+        row["bucket"] = getRawDataBucket("process", row, 300, 16)
+    store.insert("test", "process_bucketed", rows)
+    buckets = sorted(set(r["bucket"] for r in rows))
+    store.insert("test", "raw_data_buckets", [{"experiment_id":"e", "trial_id":"t0", "table_name":"process", "bucket":b, \
+                                               "rows":len([r for r in rows if r["bucket"] == b]), "source_rows":250} for b in buckets])
+    assert len(buckets) == 4, "Buckets incorrect, expected 4 buckets of 300 seconds"
+    
+    commons.analyserConfiguration = dict(analyserConfigurationDefaults, raw_data_bucketed=True)
+    dataRDD = readTrials(sc, "test", "process", ["duration"], "e", ["t0"])
+    assert dataRDD.getNumPartitions() == len(buckets), "Partitions incorrect, expected one per bucket"
+    assert sorted(dataRDD.map(lambda r: r["duration"]).collect()) == range(1000), "Bucketed rows incorrect"
+    
+    #t1 is not bucketed, so both trials are read from the raw data table
+    assert readTrials(sc, "test", "process", ["duration"], "e", ["t0", "t1"]).count() == 500, "Rows incorrect, expected the 250 of each trial"
+    
+    #Rows arrived after bucketing, so t0 is read from the raw data table until it is bucketed again
+    store.insert("test", "process", [{"experiment_id":"e", "trial_id":"t0", "source_process_instance_id":"n0000", "duration":1}])
+    assert readTrials(sc, "test", "process", ["duration"], "e", ["t0"]).count() == 251, "Rows incorrect, expected the ones of the raw data table"
+    store.delete("test", "process", [{"experiment_id":"e", "trial_id":"t0", "source_process_instance_id":"n0000"}])
+    commons.analyserConfiguration = dict(analyserConfigurationDefaults)
+    store.close()
+
+#Test that bucketing a trial again replaces its buckets and their rows of raw_data_buckets
+def testRebucket(sc, path):
+    import commons
+    from bucketRawData import bucketTable
+    from commons import readTrials, getRawDataBuckets, ResultsWriter, analyserConfigurationDefaults
+    
+    for bucketSeconds in [3600, 60]:
+        writer = ResultsWriter(sc, "test")
+        writer.add("raw_data_buckets", bucketTable(sc, "test", "process", "e", "t0", bucketSeconds, 16))
+        writer.wait()
+    
+    buckets = getRawDataBuckets(sc, "test", "process", "e", ["t0"])
+    assert [(b, sourceRows) for t, b, sourceRows in buckets] == [(-1, 250)], "Buckets incorrect, expected only the new bucket of the rows without time"
+    assert sc.cassandraTable("test", "process_bucketed").where("experiment_id=? AND trial_id=?", "e", "t0").count() == 250, \
+            "Bucketed rows incorrect, expected only the ones copied last"
+    commons.analyserConfiguration = dict(analyserConfigurationDefaults, raw_data_bucketed=True)
+    assert readTrials(sc, "test", "process", ["duration"], "e", ["t0"]).count() == 250, "Rows incorrect, expected the bucketed ones"
+    commons.analyserConfiguration = dict(analyserConfigurationDefaults)
+
+#Test that only the changed and new rows are written when writing only the changed rows
+def testChangedOnly(sc, path):
+    from commons import ResultsWriter
+    
+    rows = [{"experiment_id":"e", "trial_id":"d" + str(i), "duration_max":i, "duration_mean":i / 3.0} for i in range(4)]
+    writer = ResultsWriter(sc, "test")
+    writer.add("trial_duration", rows)
+    writer.wait()
+    
+    #d0 is unchanged within the tolerance, d1 changed and d4 new
+    rows[0]["duration_mean"] += 1e-12
+    rows[1]["duration_max"] = 10
+    rows.append({"experiment_id":"e", "trial_id":"d4", "duration_max":4, "duration_mean":4 / 3.0})
+    writer = ResultsWriter(sc, "test", changedOnly=True)
+    writer.add("trial_duration", rows)
+    writer.wait()
+    assert writer.counts == {"unchanged":3, "changed":1, "new":1}, "Counts incorrect, expected 3 unchanged, 1 changed and 1 new"
+    
+    results = sc.cassandraTable("test", "trial_duration").where("experiment_id=? AND trial_id=?", "e", "d1").collect()
+    assert results[0]["duration_max"] == 10, "Changed result incorrect, expected 10"
+    assert sc.cassandraTable("test", "trial_duration").where("experiment_id=? AND trial_id=?", "e", "d4").count() == 1, "New result not written"
+
+#Test that the trials whose inputs, analyser and arguments are unchanged since their last run are skipped
+def testFingerprints(sc, path):
+    import commons
+    from datetime import datetime
+    from localCassandra import LocalCassandra
+    from commons import startAnalyserRun, analyserConfigurationDefaults
+    
+    commons.analyserConfiguration = dict(analyserConfigurationDefaults, skip_unchanged_inputs=True)
+    run = startAnalyserRun(sc, "test", __file__, "e", ["t0", "t1"], args={"steady_state":False}, inputs=["process"])
+    assert run.trialIDs == ["t0", "t1"], "Trials incorrect, expected both trials on the first run"
+    assert run.fingerprints["t0"] == "process:250:None", "Fingerprint incorrect, expected 250 rows without time"
+    run.finish()
+    
+    run = startAnalyserRun(sc, "test", __file__, "e", ["t0", "t1"], args={"steady_state":False}, inputs=["process"])
+    assert run.trialIDs == [], "Trials incorrect, expected both trials skipped"
+    run.finish()
+    
+    #A new row of t1 changes its fingerprint, as other arguments change the ones of both the trials
+    store = LocalCassandra(path)
+    store.insert("test", "process", [{"experiment_id":"e", "trial_id":"t1", "source_process_instance_id":"n0001", "start_time":datetime(2017, 1, 1), "duration":1}])
+    store.close()
+    run = startAnalyserRun(sc, "test", __file__, "e", ["t0", "t1"], args={"steady_state":False}, inputs=["process"])
+    assert run.trialIDs == ["t1"], "Trials incorrect, expected only the changed trial"
+    run.finish()
+    run = startAnalyserRun(sc, "test", __file__, "e", ["t0", "t1"], args={"steady_state":True}, inputs=["process"])
+    assert run.trialIDs == ["t0", "t1"], "Trials incorrect, expected both trials with other arguments"
+    run.finish()
+    
+    #The derived tables are fingerprinted by content, a new value of t0 changes its fingerprint with the same rows
+    store = LocalCassandra(path)
+    store.insert("test", "trial_execution_time", [{"experiment_id":"e", "trial_id":t, "process_definition_id":"all", "execution_time":10} for t in ["t0", "t1"]])
+    store.close()
+    run = startAnalyserRun(sc, "test", __file__, "e", ["t0", "t1"], args={}, inputs=["trial_execution_time"])
+    run.finish()
+    store = LocalCassandra(path)
+    store.insert("test", "trial_execution_time", [{"experiment_id":"e", "trial_id":"t0", "process_definition_id":"all", "execution_time":12}])
+    store.close()
+    run = startAnalyserRun(sc, "test", __file__, "e", ["t0", "t1"], args={}, inputs=["trial_execution_time"])
+    assert run.trialIDs == ["t0"], "Trials incorrect, expected only the trial with a changed result"
+    run.finish()
+    commons.analyserConfiguration = dict(analyserConfigurationDefaults)
+
+#Test that the raw cache is read only while the partition in Cassandra has the fingerprint of the cached rows
+def testRawCacheFingerprint(sc, path):
+    import shutil
+    from localCassandra import LocalCassandra
+    from commons import readTrials, writeRawCache, getInputFingerprints
+    
+    cacheDir = tempfile.mkdtemp()
+    fingerprint = getInputFingerprints(sc, "test", "e", ["t2"], ["process"])["t2"]
+    writeRawCache(cacheDir, "e", "t2", "process", iter([{"trial_id":"t2", "source_process_instance_id":"cached", "duration":0}]), fingerprint=fingerprint)
+    assert readTrials(sc, "test", "process", ["duration"], "e", ["t2"], cacheDir=cacheDir).count() == 1, "Rows incorrect, expected the cached one"
+    
+    store = LocalCassandra(path)
+    store.insert("test", "process", [{"experiment_id":"e", "trial_id":"t2", "source_process_instance_id":"n0002", "duration":1}])
+    store.close()
+    assert readTrials(sc, "test", "process", ["duration"], "e", ["t2"], cacheDir=cacheDir).count() == 251, "Rows incorrect, expected the ones in Cassandra"
+    shutil.rmtree(cacheDir)
+
+#Test that a stored steady state window is reused only if detected with the same batch size on the same number of data points
+def testSteadyStateWindow(sc, path):
+    from localCassandra import LocalCassandra
+    from commons import filterSteadyState, getSteadyStateWindow
+    
+    data = [{"read_time":"1970-01-01T00:%02d:%02dZ" % (i // 60, i % 60), "cpu":1.0} for i in range(100)]
+    dataRDD = sc.parallelize(data, 2)
+    key = {"experiment_id":"e", "trial_id":"s", "container_id":"c", "host_id":"h", "metric":"cpu"}
+    
+    store = LocalCassandra(path)
+    store.insert("test", "trial_steady_state", [dict(key, start_time=0.0, end_time=9.0, num_data_points=100, batch_size=5)])
+    assert filterSteadyState(sc, "test", dataRDD, "e", "s", "c", "h", "cpu").count() == 10, "Rows incorrect, expected the stored window"
+    
+    for numDataPoints, batchSize in [(100, 3), (90, 5)]:
+        store.insert("test", "trial_steady_state", [dict(key, start_time=0.0, end_time=9.0, num_data_points=numDataPoints, batch_size=batchSize)])
+        assert filterSteadyState(sc, "test", dataRDD, "e", "s", "c", "h", "cpu").count() > 10, "Rows incorrect, expected a new window"
+        window = getSteadyStateWindow(sc, "test", "e", "s", "c", "h", "cpu")
+        assert window["num_data_points"] == 100 and window["batch_size"] == 5, "Window incorrect, expected the one detected again"
+    store.close()
+
+def main():
+    from commons import getSparkContext
+    
+    path = tempfile.mktemp(suffix=".db")
+    
+    # Set configuration for spark context
+    conf = SparkConf() \
+        .setAppName("Test") \
+        .setMaster("local[2]") \
+        .set("spark.benchflow.local_cassandra", path)
+    sc = getSparkContext(conf)
+    
+    testReadWrite(sc, path)
+    testBucketedRead(sc, path)
+    testRebucket(sc, path)
+    testChangedOnly(sc, path)
+    testFingerprints(sc, path)
+    testRawCacheFingerprint(sc, path)
+    testSteadyStateWindow(sc, path)
+    os.remove(path)
+    print("All tests passed")
+
+if __name__ == '__main__':
+    main()
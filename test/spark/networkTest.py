@@ -0,0 +1,76 @@
+from pyspark_cassandra import CassandraSparkContext
+from pyspark import SparkConf
+
+#Test with no data
+def testEmpty(sc):
+    from network import computeRates
+    
+    result = computeRates([], [])
+    assert len(result["rx_bytes"]) == 0, "Wrong number of rates, expected 0"
+
+#Test for rates over irregular intervals
+def testIrregularIntervals(sc):
+    from network import computeRates
+    
+    times = [0.0, 1.0, 3.0]
+    counters = [[0, 0, 0, 0, 0, 0, 0, 0], \
+                [100, 10, 1, 1, 0, 0, 0, 0], \
+                [300, 30, 3, 3, 2, 0, 0, 0]]
+    
+    result = computeRates(times, counters)
+    assert list(result["rx_bytes"]) == [100.0, 100.0], "Rx bytes rate incorrect, expected 100"
+    assert list(result["tx_bytes"]) == [10.0, 10.0], "Tx bytes rate incorrect, expected 10"
+    assert list(result["rx_dropped"]) == [0.0, 1.0], "Rx dropped rate incorrect, expected 0 and 1"
+
+#Test for counter resets and null counters
+def testResetsAndNulls(sc):
+    from network import computeRates
+    
+    times = [0.0, 1.0, 2.0]
+    counters = [[100, None, 0, 0, 0, 0, 0, 0], \
+                [200, None, 0, 0, 0, 0, 0, 0], \
+                [50, None, 0, 0, 0, 0, 0, 0]]
+    
+    result = computeRates(times, counters)
+    assert list(result["rx_bytes"]) == [100.0], "Rx bytes rate incorrect, expected only 100"
+    assert len(result["tx_bytes"]) == 0, "Wrong number of tx bytes rates, expected 0"
+
+#Test for the metrics of many interfaces
+def testManyInterfaces(sc):
+    from network import computeInterfaceMetrics
+    import uuid
+    
+    envData = []
+    networkData = []
+    for i in range(10):
+        interfaces = {}
+        for n in range(20):
+            dataID = uuid.uuid4()
+            interfaces["eth%d" % n] = dataID
+            networkData.append({"network_interface_data_id":dataID, "network_rx_bytes":i*n, "network_tx_bytes":i, \
+                                "network_rx_packets":i, "network_tx_packets":i, "network_rx_dropped":0, "network_tx_dropped":0, \
+                                "network_rx_errors":0, "network_tx_errors":0})
+        envData.append({"read_time":"1970-01-01T00:00:%02dZ" % i, "network_interfaces":interfaces})
+    
+    result = computeInterfaceMetrics(sc.parallelize(envData, 3), sc.parallelize(networkData, 3))
+    assert len(result) == 20 * 8, "Wrong number of interface metrics"
+    for interface, (counter, metrics) in result:
+        if interface == "eth5" and counter == "rx_bytes":
+            assert metrics["mean"] == 5.0, "Rx bytes rate incorrect, expected 5"
+            assert metrics["num_data_points"] == 9, "Wrong number of rates, expected 9"
+           
+def main():
+    # Set configuration for spark context
+    conf = SparkConf() \
+        .setAppName("Test") \
+        .setMaster("local")
+    sc = CassandraSparkContext(conf=conf)
+    
+    testEmpty(sc)
+    testIrregularIntervals(sc)
+    testResetsAndNulls(sc)
+    testManyInterfaces(sc)
+    print("All tests passed")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+import json
+import tempfile
+
+from pyspark_cassandra import CassandraSparkContext
+from pyspark import SparkConf
+
+#Test that the commons calls and the Spark actions they run are traced, and that the Spark methods are restored
+def testTrace(sc):
+    import commons
+    from pyspark import RDD
+    from commons import startTracing, computeMode
+    
+    traceFile = tempfile.mktemp(suffix=".json")
+    collect = RDD.__dict__["collect"]
+    
+    tracer = startTracing({"trace_file":traceFile})
+    computeMode(sc.parallelize([(1, 1), (2, 1), (1, 1)]))
+    sc.parallelize(range(10)).count()
+    tracer.save()
+    tracer.stop()
+    commons.tracer = None
+    
+    assert RDD.__dict__["collect"] is collect, "RDD.collect not restored"
+    
+    with open(traceFile) as f:
+        events = json.load(f)["traceEvents"]
+    names = [e["name"] for e in events]
+    assert "computeMode" in names, "computeMode span missing"
+    assert any(n.startswith("count at tracerTest.py") for n in names), "count span missing"
+    
+    mode = [e for e in events if e["name"] == "computeMode"][0]
+    actions = [e for e in events if e["cat"] == "spark" and e["ts"] >= mode["ts"] and e["ts"] + e["dur"] <= mode["ts"] + mode["dur"]]
+    assert len(actions) > 0, "Spark actions of computeMode missing"
+    assert all(" at commons.py:" in a["name"] for a in actions), "Action names incorrect, expected the lines of commons"
+
+#Test that without trace_file nothing is traced
+def testNoTrace(sc):
+    from commons import startTracing
+    
+    assert startTracing({}) is None, "Tracer started without trace_file"
+
+def main():
+    # Set configuration for spark context
+    conf = SparkConf() \
+        .setAppName("Test") \
+        .setMaster("local")
+    sc = CassandraSparkContext(conf=conf)
+    
+    testTrace(sc)
+    testNoTrace(sc)
+    print("All tests passed")
+
+if __name__ == '__main__':
+    main()